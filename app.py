@@ -1,11 +1,17 @@
 import streamlit as st
-import openai
-import re
 import time
-import os
-from googleapiclient.discovery import build
-from google.oauth2.service_account import Credentials
-from googleapiclient.errors import HttpError
+from datetime import datetime
+from rate_limit import AdaptiveRateController, RateLimiter
+from scheduler import DEFAULT_DOCS_RPM, DEFAULT_OPENAI_RPM, DEFAULT_OPENAI_TPM, FairScheduler
+from llm_cache import LLMCache
+from llm_client import LLMClient
+from review_state import ReviewStateStore
+from run_journal import RunJournal
+from instrumentation import RunTrace
+from jobs import ACTIVE_STATUSES, DONE, QUEUED, JobManager
+from google_docs import GoogleClientPool, document_cache, extract_document_id
+from feedback_pipeline import DOCUMENT_TYPES, FEEDBACK_FOCUS, run_document_feedback
+from template_index import load_template, template_cache
 
 # 페이지 설정
 st.set_page_config(
@@ -118,285 +124,74 @@ with st.expander("📖 사용법 안내", expanded=True):
     </div>
     """, unsafe_allow_html=True)
 
-# Google Docs 인증 설정
+# Google API 클라이언트 풀 (모든 세션이 공유, 자격 증명과 discovery 문서는 한 번만 준비)
 @st.cache_resource
-def get_google_service():
-    """Google Docs 서비스 인스턴스 생성"""
+def create_google_client_pool(service_account_info):
+    """작업 스레드마다 전용 연결로 Docs 클라이언트를 만드는 풀 생성"""
+    return GoogleClientPool(service_account_info)
+
+# Google Docs 인증 설정
+def get_google_client_pool():
+    """Streamlit secrets의 서비스 계정으로 만든 클라이언트 풀 (인증 정보가 없거나 잘못되었으면 None)"""
     try:
         # Streamlit secrets에서 가져오기 (Streamlit Cloud 우선)
         if "google_service_account" in st.secrets:
-            service_account_info = st.secrets["google_service_account"]
-            
-            # 문서 편집을 위해 drive.file 권한 추가
-            creds = Credentials.from_service_account_info(
-                service_account_info,
-                scopes=[
-                    'https://www.googleapis.com/auth/documents',
-                    'https://www.googleapis.com/auth/drive.file'
-                ]
-            )
-            
-            service = build('docs', 'v1', credentials=creds)
-            drive_service = build('drive', 'v3', credentials=creds)
-            return service, drive_service
-        else:
-            st.error("⚠️ Google 서비스 계정 인증 정보가 필요합니다. Streamlit Cloud에서 secrets를 설정해주세요.")
-            return None, None
+            return create_google_client_pool(dict(st.secrets["google_service_account"]))
+        st.error("⚠️ Google 서비스 계정 인증 정보가 필요합니다. Streamlit Cloud에서 secrets를 설정해주세요.")
+        return None
     except Exception as e:
+        # 실패한 호출은 cache_resource에 저장되지 않으므로 secrets를 고친 뒤 다시 시도됨
         st.error(f"Google 서비스 초기화 실패: {str(e)}")
-        return None, None
-
-def extract_document_id(url):
-    """Google Docs URL에서 문서 ID 추출"""
-    patterns = [
-        r'/document/d/([a-zA-Z0-9-_]+)',
-        r'/d/([a-zA-Z0-9-_]+)',
-        r'docs\.google\.com/.*[?&]id=([a-zA-Z0-9-_]+)',
-        r'^([a-zA-Z0-9-_]+)$'
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, url)
-        if match:
-            return match.group(1)
-    return None
-
-def get_document_content(service, document_id):
-    """Google Docs 문서 내용과 구조 가져오기"""
-    try:
-        document = service.documents().get(documentId=document_id).execute()
-        
-        title = document.get('title', '제목 없음')
-        content_with_positions = []
-        full_document_text = []
-        
-        for element in document.get('body', {}).get('content', []):
-            if 'paragraph' in element:
-                paragraph_text = []
-                start_index = element.get('startIndex', 0)
-                end_index = element.get('endIndex', 0)
-                
-                for text_element in element['paragraph'].get('elements', []):
-                    if 'textRun' in text_element:
-                        text = text_element['textRun'].get('content', '')
-                        if text.strip():
-                            paragraph_text.append(text)
-                
-                if paragraph_text:
-                    full_text = ''.join(paragraph_text)
-                    content_with_positions.append({
-                        'text': full_text,
-                        'start': start_index,
-                        'end': end_index
-                    })
-                    full_document_text.append(full_text)
-        
-        return title, content_with_positions, '\n'.join(full_document_text)
-    except Exception as e:
-        st.error(f"문서 읽기 오류: {str(e)}")
-        return None, None, None
-
-def analyze_document_structure(full_text):
-    """문서의 구조를 분석하여 주요 섹션을 식별"""
-    sections = []
-    
-    # 제목 패턴 (숫자나 특수 문자로 시작하는 줄)
-    title_patterns = [
-        r'^\d+\.\s+',  # 1. 2. 3. 등
-        r'^\d+\.\d+\.?\s+',  # 1.1, 2.1 등 (세부 섹션)
-        r'^\d+\.\d+\.\d+\.?\s+',  # 1.1.1, 2.1.1 등 (더 세부 섹션)
-        r'^\d+\)\s+',  # 1) 2) 3) 등
-        r'^[IVX]+\.\s+',  # I. II. III. 등
-        r'^\[.+\]\s*',  # [제목] 형식
-        r'^#+\s+',  # # ## ### 마크다운 형식
-        r'^[\-\*]\s+\w+.*:',  # - 제목: 또는 * 제목: 형식
-    ]
-    
-    lines = full_text.split('\n')
-    current_section = {'title': '서론', 'content': [], 'start_line': 0}
-    
-    for i, line in enumerate(lines):
-        is_title = False
-        
-        # 빈 줄은 무시
-        if not line.strip():
-            if current_section['content']:
-                current_section['content'].append(line)
-            continue
-        
-        # 제목 패턴 확인
-        for pattern in title_patterns:
-            if re.match(pattern, line.strip()):
-                is_title = True
-                break
-        
-        # 대문자로만 이루어진 짧은 줄도 제목으로 간주
-        if not is_title and line.strip().isupper() and len(line.strip()) < 50:
-            is_title = True
-        
-        # 콜론으로 끝나는 짧은 줄도 제목으로 간주 (예: "서론:", "결론:" 등)
-        if not is_title and line.strip().endswith(':') and len(line.strip()) < 50:
-            is_title = True
-        
-        # 가로, 대괄호로 시작하는 줄도 제목으로 간주
-        if not is_title and (line.strip().startswith('(') or line.strip().startswith('【')):
-            is_title = True
-        
-        # "목차", "서론", "본론", "결론", "참고문헌", "부록" 등의 키워드로 시작하는 줄
-        keywords = ['목차', '서론', '본론', '결론', '참고문헌', '부록', '요약', '개요', '서문']
-        if not is_title:
-            for keyword in keywords:
-                if line.strip().startswith(keyword):
-                    is_title = True
-                    break
-        
-        if is_title:
-            # 이전 섹션 저장
-            if current_section['content']:
-                sections.append({
-                    'title': current_section['title'],
-                    'content': '\n'.join(current_section['content']),
-                    'start_line': current_section['start_line'],
-                    'end_line': i - 1
-                })
-            
-            # 새 섹션 시작
-            current_section = {
-                'title': line.strip(),
-                'content': [],
-                'start_line': i
-            }
-        else:
-            current_section['content'].append(line)
-    
-    # 마지막 섹션 저장
-    if current_section['content']:
-        sections.append({
-            'title': current_section['title'],
-            'content': '\n'.join(current_section['content']),
-            'start_line': current_section['start_line'],
-            'end_line': len(lines) - 1
-        })
-    
-    # 섹션이 너무 많으면 내용을 기준으로 병합
-    if len(sections) > 20:  # 20개 이상일 때만 병합
-        merged_sections = []
-        current_merged = sections[0]
-        
-        for section in sections[1:]:
-            # 매우 짧은 섹션만 병합 (기준을 100자로 낮춤)
-            if len(section['content'].strip()) < 100:
-                current_merged['content'] += '\n\n' + section['content']
-                current_merged['end_line'] = section['end_line']
-            else:
-                merged_sections.append(current_merged)
-                current_merged = section
-        
-        merged_sections.append(current_merged)
-        sections = merged_sections
-    
-    # 섹션이 너무 적으면 내용을 기준으로 분할
-    if len(sections) < 6:
-        # 각 섹션을 내용 길이를 기준으로 분할
-        new_sections = []
-        for section in sections:
-            content = section['content']
-            paragraphs = content.split('\n\n')
-            
-            # 문단이 충분히 많으면 분할
-            if len(paragraphs) > 3:
-                mid = len(paragraphs) // 2
-                new_sections.append({
-                    'title': section['title'] + ' (전반부)',
-                    'content': '\n\n'.join(paragraphs[:mid]),
-                    'start_line': section['start_line'],
-                    'end_line': section['start_line'] + mid
-                })
-                new_sections.append({
-                    'title': section['title'] + ' (후반부)',
-                    'content': '\n\n'.join(paragraphs[mid:]),
-                    'start_line': section['start_line'] + mid,
-                    'end_line': section['end_line']
-                })
-            else:
-                new_sections.append(section)
-        
-        sections = new_sections
-    
-    return sections
+        return None
 
-def insert_feedback_to_doc(service, document_id, feedback_text, insert_index):
-    """Google Docs에 파란색으로 첨삭 내용 삽입"""
-    try:
-        # 첨삭 내용을 파란색으로 삽입하기 위한 요청
-        requests = [
-            {
-                'insertText': {
-                    'location': {
-                        'index': insert_index
-                    },
-                    'text': f'\n[첨삭: {feedback_text}]\n'
-                }
-            },
-            {
-                'updateTextStyle': {
-                    'range': {
-                        'startIndex': insert_index,
-                        'endIndex': insert_index + len(f'\n[첨삭: {feedback_text}]\n')
-                    },
-                    'textStyle': {
-                        'foregroundColor': {
-                            'color': {
-                                'rgbColor': {
-                                    'red': 0.0,
-                                    'green': 0.0,
-                                    'blue': 1.0
-                                }
-                            }
-                        },
-                        'italic': True,
-                        'fontSize': {
-                            'magnitude': 10,
-                            'unit': 'PT'
-                        }
-                    },
-                    'fields': 'foregroundColor,italic,fontSize'
-                }
-            }
-        ]
-        
-        service.documents().batchUpdate(
-            documentId=document_id,
-            body={'requests': requests}
-        ).execute()
-        
-        return True
-    except HttpError as e:
-        if e.resp.status == 403:
-            st.error("❌ 문서를 편집할 권한이 없습니다. 문서에 '편집자' 권한을 부여해주세요.")
-        else:
-            st.error(f"첨삭 내용 삽입 중 오류 발생: {str(e)}")
-        return False
-    except Exception as e:
-        st.error(f"첨삭 내용 삽입 중 오류 발생: {str(e)}")
-        return False
-
-# 문서 타입과 피드백 초점 옵션
-DOCUMENT_TYPES = {
-    "연구 보고서": "학술적 연구 보고서로서 논리성, 근거의 타당성, 연구 방법론을 중점적으로",
-    "에세이": "에세이로서 주장의 명확성, 논거의 설득력, 문장의 흐름을 중점적으로",
-    "제안서": "비즈니스 제안서로서 목표의 명확성, 실행 가능성, 예상 효과를 중점적으로",
-    "기술 문서": "기술 문서로서 정확성, 명확성, 구조의 체계성을 중점적으로",
-    "창작물": "창작물로서 창의성, 표현력, 독자 몰입도를 중점적으로"
-}
+# LLM 응답 캐시 (모든 세션이 공유)
+@st.cache_resource
+def get_llm_cache():
+    """로컬 SQLite 기반 LLM 응답 캐시 인스턴스 생성"""
+    return LLMCache()
+
+# 문서별 검토 기록 저장소 (모든 세션이 공유)
+@st.cache_resource
+def get_review_state_store():
+    """증분 재검토를 위한 문서별 검토 기록 저장소 생성"""
+    return ReviewStateStore()
+
+# 중단된 실행을 이어서 진행하기 위한 실행 기록 (모든 세션이 공유)
+@st.cache_resource
+def get_run_journal():
+    """문서별로 생성한 피드백과 적용한 삽입을 기록하는 실행 기록 생성"""
+    return RunJournal()
+
+# 첨삭 작업 관리자 (모든 세션이 공유, 스크립트 재실행과 무관하게 백그라운드에서 실행)
+@st.cache_resource
+def get_job_manager():
+    """첨삭 작업을 백그라운드 스레드에서 처리하는 작업 관리자 생성"""
+    return JobManager(max_workers=4)
+
+# OpenAI 동시 호출 제어기 (모든 세션이 공유, 429 응답에 맞춰 동시 요청 수를 자동 조절)
+@st.cache_resource
+def get_openai_controller():
+    """OpenAI 호출이 공유하는 AIMD 동시 호출 제어기 생성"""
+    return AdaptiveRateController(initial_limit=16, max_limit=16)
+
+# 공유 OpenAI 키의 분당 요청/토큰 한도를 사용자별로 공정하게 나누는 스케줄러 (모든 세션이 공유)
+@st.cache_resource
+def get_openai_scheduler():
+    """secrets의 OPENAI_RPM, OPENAI_TPM 한도로 OpenAI 호출 스케줄러 생성"""
+    return FairScheduler(int(st.secrets.get("OPENAI_RPM", DEFAULT_OPENAI_RPM)),
+                         int(st.secrets.get("OPENAI_TPM", DEFAULT_OPENAI_TPM)))
 
-FEEDBACK_FOCUS = {
-    "종합적 피드백": "전반적인 관점에서 균형잡힌",
-    "논리성 및 구조": "논리적 흐름과 구조적 완성도 위주의",
-    "문법 및 표현": "문법적 정확성과 표현의 적절성 위주의",
-    "내용의 깊이": "주제의 심층적 탐구와 분석의 깊이 위주의",
-    "창의성 및 독창성": "새로운 관점과 창의적 접근 위주의",
-    "실용성 및 적용성": "실제 적용 가능성과 실용적 가치 위주의"
+# 서비스 계정의 Docs API 분당 요청 한도를 사용자별로 공정하게 나누는 스케줄러 (모든 세션이 공유)
+@st.cache_resource
+def get_docs_scheduler():
+    """secrets의 GOOGLE_DOCS_RPM 한도로 Docs API 호출 스케줄러 생성"""
+    return FairScheduler(int(st.secrets.get("GOOGLE_DOCS_RPM", DEFAULT_DOCS_RPM)))
+
+# 첨삭 예산 기준별 (예산 항목, 입력 라벨, 기본값, 최솟값, 최댓값, 간격)
+SECTION_BUDGET_OPTIONS = {
+    "요청 수": ('calls', "섹션 요청 수", 12, 1, 200, 1),
+    "토큰": ('tokens', "토큰 (입력 + 출력)", 20000, 1000, 1000000, 1000),
+    "예상 시간": ('seconds', "예상 소요 시간 (초)", 30, 5, 600, 5)
 }
 
 # 사이드바 설정
@@ -405,6 +200,8 @@ with st.sidebar:
     
     # API 키 입력 (Streamlit secrets 우선)
     api_key = st.secrets.get("OPENAI_API_KEY", "")
+    # secrets의 키는 모든 사용자가 함께 쓰므로 공유 스케줄러로 한도를 나눔
+    shared_api_key = bool(api_key)
     
     if not api_key:
         api_key = st.text_input("OpenAI API Key", type="password", help="OpenAI API 키를 입력하세요")
@@ -436,6 +233,74 @@ with st.sidebar:
         help="예: '초등학생도 이해할 수 있는 쉬운 언어로 피드백 부탁해', '영어 표현에 대한 조언도 포함해주세요' 등"
     )
     
+    # 과제 템플릿 문서 (학생들이 같은 양식에서 시작한 경우)
+    template_url = st.text_input(
+        "📐 템플릿 문서 URL (선택)",
+        placeholder="https://docs.google.com/document/d/...",
+        help="학생들에게 나눠준 양식 문서를 지정하면 양식과 같은 안내문, 문항 설명은 분석하지 않고 학생이 쓴 내용에만 첨삭합니다"
+    )
+    
+    # 섹션 피드백 동시 요청 설정
+    with st.expander("⚡ 성능 설정"):
+        max_concurrency = st.slider(
+            "동시 요청 수",
+            min_value=1,
+            max_value=16,
+            value=4,
+            help="섹션 피드백을 동시에 요청할 최대 개수입니다"
+        )
+        rpm_limit = st.number_input(
+            "분당 최대 요청 수 (RPM)",
+            min_value=1,
+            max_value=10000,
+            value=60,
+            step=10,
+            help="OpenAI 계정의 요청 한도에 맞게 조정하세요"
+        )
+        budget_kind = st.selectbox(
+            "🎯 첨삭 예산 기준",
+            list(SECTION_BUDGET_OPTIONS.keys()),
+            help="문서 앞부분부터 자르지 않고, 내용 길이·문장 길이 편차·반복 표현·제목 중요도로 고른 섹션을 이 예산 안에서 첨삭합니다"
+        )
+        budget_key, budget_label, budget_default, budget_min, budget_max, budget_step = SECTION_BUDGET_OPTIONS[budget_kind]
+        budget_value = st.number_input(
+            budget_label,
+            min_value=budget_min,
+            max_value=budget_max,
+            value=budget_default,
+            step=budget_step,
+            help="예산을 넘는 섹션은 이번에 첨삭하지 않으며, '변경된 섹션만 재검토'를 켜 두면 다음 요청 때 첨삭합니다"
+        )
+        use_llm_cache = st.checkbox(
+            "💾 AI 응답 캐시 사용",
+            value=True,
+            help="같은 문서를 다시 요청하면 저장된 응답을 재사용하여 즉시 결과를 보여줍니다"
+        )
+        use_heading_styles = st.checkbox(
+            "🧭 제목 스타일로 섹션 구분",
+            value=True,
+            help="문서에 '제목 1~6' 스타일이 적용되어 있으면 이를 기준으로 섹션을 나누고, 없으면 텍스트 패턴으로 추정합니다"
+        )
+        packed_sections = st.checkbox(
+            "📦 여러 섹션을 한 번에 요청",
+            value=False,
+            help="여러 섹션을 하나의 요청으로 묶어 요청 수를 줄입니다. 응답에서 빠진 섹션만 따로 다시 요청합니다"
+        )
+        incremental_review = st.checkbox(
+            "🔁 변경된 섹션만 재검토",
+            value=True,
+            help="이전에 검토한 문서라면 새로 추가되거나 수정된 섹션에만 첨삭합니다"
+        )
+        replace_feedback = st.checkbox(
+            "♻️ 기존 첨삭 교체",
+            value=False,
+            help="섹션 뒤에 이전에 삽입한 첨삭이 있으면 아래에 새로 쌓지 않고 새 첨삭으로 바꿉니다"
+        )
+        if st.button("🗑️ 캐시 비우기"):
+            get_llm_cache().clear()
+            document_cache.clear()
+            template_cache.clear()
+    
     st.markdown("---")
     st.markdown("### 🔍 시스템 상태")
     
@@ -450,6 +315,21 @@ with st.sidebar:
         st.success("✅ Google API 연결됨")
     else:
         st.warning("⚠️ Google 인증 필요")
+    
+    # 공유 할당량 대기열에서의 내 순서 (실행 후 갱신)
+    queue_status = st.empty()
+    
+    # 응답 캐시 상태 (실행 후 갱신)
+    cache_status = st.empty()
+
+def show_cache_status():
+    """사이드바에 캐시 적중/미적중 횟수 표시"""
+    stats = get_llm_cache().stats()
+    cache_status.caption(
+        f"💾 캐시 적중 {stats['hits']}회 · 미적중 {stats['misses']}회 · "
+        f"{stats['entries']}개 응답 저장됨 ({stats['bytes'] / 1024:.0f}KB)\n\n"
+        f"⚡ 현재 OpenAI 동시 요청 한도 {get_openai_controller().stats()['limit']}개"
+    )
 
 # 메인 컨텐츠
 st.markdown("### 📄 문서 정보 입력")
@@ -478,7 +358,99 @@ with st.expander("💡 테스트용 예시 문서"):
     **주의:** 이 문서에 편집자 권한을 부여해야 첨삭 기능이 작동합니다.
     """)
 
-# 피드백 요청 버튼
+# 작업 소유자 ID는 서버에서 만들어 세션에 보관하고, URL에는 새로 고침이나 재접속 때 같은 작업 목록에
+# 다시 연결하기 위한 일회용 비밀 토큰만 둠 (토큰은 연결할 때마다 바뀌므로 예전 링크로는 작업을 볼 수 없음)
+if "owner_id" not in st.session_state:
+    session = None
+    if st.query_params.get("session"):
+        session = get_job_manager().resume_session(st.query_params["session"])
+    owner_id, token = session or get_job_manager().create_session()
+    st.session_state.owner_id = owner_id
+    st.query_params["session"] = token
+owner_id = st.session_state.owner_id
+
+def show_queue_status():
+    """사이드바에 공유 할당량 대기열에서의 내 대기 순서, 예상 대기 시간, 최근 1분 사용량 표시"""
+    schedulers = [("Google Docs", get_docs_scheduler())]
+    if shared_api_key:
+        schedulers.insert(0, ("OpenAI", get_openai_scheduler()))
+    
+    lines = []
+    for name, scheduler in schedulers:
+        status = scheduler.status(owner_id)
+        if status['position'] is not None:
+            line = (f"🚦 {name} 대기 순서 {status['position'] + 1}번째 (내 요청 {status['waiting']}건) · "
+                    f"예상 대기 약 {status['expected_wait']:.0f}초")
+        else:
+            line = f"🚦 {name} 내 대기 요청 없음 · 전체 대기 {status['queued']}건"
+        line += f"\n\n최근 1분 요청 {status['recent_requests']}/{status['requests_per_minute']}회"
+        if status['tokens_per_minute']:
+            line += f" · 토큰 {status['recent_tokens']:,}/{status['tokens_per_minute']:,}"
+        lines.append(line)
+    queue_status.caption("\n\n".join(lines))
+
+def run_feedback_job(reporter, document_id, client_pool, llm_client, review_store, journal, options, docs_admit):
+    """작업 스레드에서 실행되는 첨삭 작업 (Streamlit 함수는 호출하지 않고 reporter로 진행 상황만 남김)"""
+    # 단계별 소요 시간, API 호출, 토큰 사용량 기록
+    trace = RunTrace(document_id=document_id)
+    
+    # Google API 클라이언트는 스레드 간에 공유할 수 없으므로 작업 스레드 전용 클라이언트 사용
+    docs_service = client_pool.docs()
+    
+    # 템플릿 색인은 템플릿 문서의 리비전별로 한 번만 만들고 여러 제출물에서 재사용
+    template = None
+    if options['template_id']:
+        template_errors = []
+        template = load_template(docs_service, options['template_id'], on_error=template_errors.append, trace=trace,
+                                 admit=docs_admit)
+        if template is None:
+            raise RuntimeError(f"템플릿 문서를 읽을 수 없습니다. {' '.join(template_errors)}")
+    
+    def on_event(kind, value):
+        """파이프라인 진행 상황을 화면에 보여줄 실시간 상태로 기록"""
+        if kind == 'progress':
+            reporter.progress(*value)
+        elif kind == 'loaded':
+            reporter.update(loaded=value)
+        elif kind == 'section':
+            reporter.append('sections', value)
+        elif kind == 'analysis_progress':
+            done, total = value
+            reporter.update(analysis_message=f"📚 문서가 길어 {total}개 부분으로 나누어 요약하는 중... ({done}/{total})")
+        elif kind == 'analysis_delta':
+            reporter.append('analysis', value)
+    
+    result = run_document_feedback(
+        docs_service, llm_client, document_id, options['doc_type'], options['feedback_focus'],
+        custom_instructions=options['custom_instructions'],
+        use_heading_styles=options['use_heading_styles'],
+        review_store=review_store,
+        max_workers=options['max_concurrency'],
+        trace=trace,
+        packed=options['packed'],
+        budget=options['budget'],
+        on_event=on_event,
+        stream_analysis=True,
+        journal=journal,
+        replace_feedback=options['replace_feedback'],
+        template=template,
+        docs_admit=docs_admit
+    )
+    
+    try:
+        trace.save()
+    except OSError:
+        pass
+    result['trace'] = {
+        'run_id': trace.run_id,
+        'totals': trace.totals(),
+        'stages': trace.summary(),
+        'json': trace.to_json(),
+        'prometheus': trace.to_prometheus()
+    }
+    return result
+
+# 피드백 요청 버튼 (작업을 대기열에 넣고 바로 반환)
 if st.button("🚀 피드백 요청", type="primary", use_container_width=True):
     if not api_key:
         st.error("⚠️ API 키를 입력해주세요!")
@@ -487,181 +459,202 @@ if st.button("🚀 피드백 요청", type="primary", use_container_width=True):
     else:
         # 문서 ID 추출
         document_id = extract_document_id(doc_url)
+        template_id = extract_document_id(template_url) if template_url else None
         
         if not document_id:
             st.error("⚠️ 유효한 Google Docs URL이 아닙니다!")
+        elif template_url and not template_id:
+            st.error("⚠️ 템플릿 문서 URL이 유효한 Google Docs URL이 아닙니다!")
         else:
-            # Google 서비스 가져오기
-            docs_service, drive_service = get_google_service()
+            client_pool = get_google_client_pool()
             
-            if docs_service:
-                with st.spinner("📖 문서를 읽어오는 중..."):
-                    title, content_with_positions, full_text = get_document_content(docs_service, document_id)
+            if client_pool:
+                # OpenAI 클라이언트 설정 (API 키는 전역 설정 대신 호출마다 전달)
+                # 공유 키와 서비스 계정 호출은 사용자별 공정 대기열을 거쳐 전역 한도 안에서 실행
+                llm_client = LLMClient(model_choice,
+                                       api_key=api_key,
+                                       cache=get_llm_cache() if use_llm_cache else None,
+                                       limiter=RateLimiter(rpm_limit),
+                                       controller=get_openai_controller(),
+                                       admit=get_openai_scheduler().for_user(owner_id) if shared_api_key else None)
+                docs_admit = get_docs_scheduler().for_user(owner_id)
                 
-                if content_with_positions and full_text:
-                    st.success(f"✅ 문서 로드 완료: **{title}**")
-                    
-                    # 내용 미리보기
-                    with st.expander("📄 문서 내용 미리보기", expanded=False):
-                        st.text(full_text[:1000] + "..." if len(full_text) > 1000 else full_text)
-                    
-                    # 문서 구조 분석
-                    sections = analyze_document_structure(full_text)
-                    
-                    # 전체 문서 분석
-                    with st.spinner("🤖 전체 문서를 분석하고 있습니다..."):
-                        try:
-                            # OpenAI 클라이언트 설정
-                            openai.api_key = api_key
-                            
-                            # 전체 문서에 대한 분석 요청
-                            analysis_prompt = f"""
-                            다음은 {doc_type}의 전체 내용입니다.
-                            {DOCUMENT_TYPES[doc_type]} 평가해주세요.
-                            {FEEDBACK_FOCUS[feedback_focus]} 피드백을 제공해주세요.
-                            
-                            {f"추가 지시사항: {custom_instructions}" if custom_instructions else ""}
-                            
-                            문서 내용:
-                            {full_text}
-                            
-                            위 문서를 분석하여 다음과 같은 형식으로 피드백을 제공해주세요:
-                            
-                            1. 전체적인 평가 (2-3문장)
-                            2. 주요 강점 3가지
-                            3. 개선이 필요한 부분 3-5가지 (각각 해당 섹션명과 함께)
-                            4. 추가 제안사항
-                            
-                            각 항목에 대해 구체적이고 건설적인 피드백을 한국어로 작성해주세요.
-                            """
-                            
-                            response = openai.ChatCompletion.create(
-                                model=model_choice,
-                                messages=[{
-                                    "role": "system",
-                                    "content": "당신은 전문적인 문서 분석가입니다. 구체적이고 건설적인 피드백을 제공합니다."
-                                }, {
-                                    "role": "user",
-                                    "content": analysis_prompt
-                                }],
-                                max_tokens=2000,
-                                temperature=0.7
-                            )
-                            
-                            full_analysis = response.choices[0].message.content
-                            
-                        except Exception as e:
-                            st.error(f"문서 분석 중 오류 발생: {str(e)}")
-                            full_analysis = "분석을 수행할 수 없습니다."
-                    
-                    # 분석 결과 표시
-                    st.markdown("📊 **문서 분석 결과**")
-                    with st.expander("📑 전체 분석 보기", expanded=True):
-                        st.markdown(full_analysis)
-                    
-                    # 진행 상황 표시
-                    progress_bar = st.progress(0)
-                    status_text = st.empty()
-                    
-                    # 첨삭 내용을 삽입할 위치 계산 (역순으로 삽입해야 인덱스가 꼬이지 않음)
-                    feedback_insertions = []
-                    
-                    # 작지만 의미 있는 섹션들을 필터링 (기준을 30자로 더 낮춤)
-                    meaningful_sections = [s for s in sections if len(s['content'].strip()) > 30]
-                    
-                    # 최대 12개 섹션에 피드백 추가 (더 많은 섹션 포함)
-                    sections_to_feedback = meaningful_sections[:min(12, len(meaningful_sections))]
-                    
-                    st.info(f"📋 총 {len(sections)}개 섹션 발견, {len(sections_to_feedback)}개 섹션에 첨삭 예정")
-                    
-                    # 먼저 모든 피드백을 생성하고 위치 파악
-                    for idx, section in enumerate(sections_to_feedback):
-                        progress = (idx + 1) / (len(sections_to_feedback) * 2)  # 분석은 전체의 50%
-                        progress_bar.progress(progress)
-                        status_text.text(f"🤖 '{section['title'][:30]}...' 섹션 분석 중...")
-                        
-                        try:
-                            # 해당 섹션에 대한 구체적인 피드백
-                            section_prompt = f"""
-                            다음은 '{section['title']}' 섹션의 내용입니다:
-                            
-                            {section['content'][:1000]}...
-                            
-                            이 섹션에 대해 긍정적인 측면과 개선할 점을 모두 포함하여 피드백을 제공해주세요.
-                            1) 먼저 잘 쓴 부분을 칭찬하고
-                            2) 개선할 점이 있다면 구체적인 예시나 방향을 제시해주세요.
-                            전체 3-4문장으로 작성하세요.
-                            """
-                            
-                            feedback_response = openai.ChatCompletion.create(
-                                model=model_choice,
-                                messages=[{
-                                    "role": "system",
-                                    "content": "당신은 전문적인 문서 첨삭 전문가입니다. 긍정적인 측면과 개선할 점을 균형 있게 제공하되, 항상 격려하며 건설적인 피드백을 제공합니다. 모든 피드백은 한국어로 작성하세요."
-                                }, {
-                                    "role": "user",
-                                    "content": section_prompt
-                                }],
-                                max_tokens=400,
-                                temperature=0.7
-                            )
-                            
-                            section_feedback = feedback_response.choices[0].message.content
-                            
-                            # 해당 섹션의 위치 찾기
-                            section_start_text = section['content'][:100].strip()
-                            for para in content_with_positions:
-                                if section_start_text in para['text']:
-                                    # 섹션 끝 위치에 피드백 삽입 예약
-                                    feedback_insertions.append({
-                                        'index': para['end'],
-                                        'feedback': section_feedback,
-                                        'section_title': section['title']
-                                    })
-                                    break
-                            
-                            # API 호출 제한을 위한 짧은 대기
-                            time.sleep(1)
-                            
-                        except Exception as e:
-                            st.warning(f"섹션 '{section['title'][:30]}...' 분석 중 오류: {str(e)}")
-                    
-                    # 역순으로 정렬 (뒤에서부터 삽입해야 인덱스가 변하지 않음)
-                    feedback_insertions.sort(key=lambda x: x['index'], reverse=True)
-                    
-                    # 첨삭 내용 삽입
-                    feedback_added = 0
-                    for i, insertion in enumerate(feedback_insertions):
-                        progress = 0.5 + (i + 1) / (len(feedback_insertions) * 2)  # 삽입은 나머지 50%
-                        progress_bar.progress(progress)
-                        status_text.text(f"🖍️ '{insertion['section_title'][:30]}...' 섹션에 첨삭 내용 삽입 중...")
-                        
-                        if insert_feedback_to_doc(docs_service, document_id, 
-                                                insertion['feedback'], 
-                                                insertion['index']):
-                            feedback_added += 1
-                        
-                        # API 호출 제한을 위한 짧은 대기
-                        time.sleep(0.5)
-                    
-                    progress_bar.progress(1.0)
-                    status_text.text("✅ 분석 완료!")
-                    
-                    if feedback_added > 0:
-                        st.markdown(f"""
-                        <div class='success-box'>
-                        <h4>✅ 첨삭 완료!</h4>
-                        <p>총 {len(sections)}개 섹션 중 {feedback_added}개 섹션에 파란색 첨삭 내용이 삽입되었습니다.</p>
-                        <p>Google Docs에서 파란색으로 표시된 첨삭 내용을 확인하세요!</p>
-                        </div>
-                        """, unsafe_allow_html=True)
-                        
-                        # 문서 링크 제공
-                        st.markdown(f"[📄 Google Docs에서 열기](https://docs.google.com/document/d/{document_id}/edit)")
-                    else:
-                        st.warning("⚠️ 첨삭 내용을 추가하지 못했습니다. 문서 권한을 확인해주세요.")
-                else:
-                    st.error("❌ 문서 내용을 가져올 수 없습니다. 문서 권한을 확인해주세요.")
+                # 작업 실행 시점의 설정을 그대로 넘겨 이후 위젯을 바꿔도 영향을 받지 않도록 함
+                options = {
+                    'doc_type': doc_type,
+                    'feedback_focus': feedback_focus,
+                    'custom_instructions': custom_instructions,
+                    'use_heading_styles': use_heading_styles,
+                    'max_concurrency': max_concurrency,
+                    'packed': packed_sections,
+                    'budget': {budget_key: budget_value},
+                    'replace_feedback': replace_feedback,
+                    'template_id': template_id
+                }
+                review_store = get_review_state_store() if incremental_review else None
+                journal = get_run_journal()
+                get_job_manager().submit(
+                    lambda reporter: run_feedback_job(reporter, document_id, client_pool,
+                                                      llm_client, review_store, journal, options, docs_admit),
+                    owner_id,
+                    label=doc_url
+                )
+                st.success("📥 첨삭 작업을 대기열에 추가했습니다. 진행 상황은 아래 작업 목록에서 확인하세요.")
+
+JOB_STATUS_ICONS = {'queued': "⏳", 'running': "🔄", 'done': "✅", 'error': "❌"}
+
+def render_analysis(full_analysis, time_to_first_token, average_ttft):
+    """전체 분석 결과와 첫 응답까지 걸린 시간 표시"""
+    st.markdown("📊 **문서 분석 결과**")
+    with st.expander("📑 전체 분석 보기", expanded=True):
+        st.markdown(full_analysis)
+        if time_to_first_token is not None:
+            st.caption(f"⏱️ 첫 응답까지 {time_to_first_token:.2f}초 (최근 작업 평균 첫 응답 {average_ttft:.2f}초)")
+
+def render_section_previews(section_results):
+    """섹션별 피드백 미리보기"""
+    with st.expander("🔍 섹션별 피드백 미리보기", expanded=False):
+        for section_result in section_results:
+            if section_result['error']:
+                st.warning(f"섹션 '{section_result['title'][:30]}...' 분석 중 오류: {section_result['error']}")
+            else:
+                st.markdown(f"**{section_result['title']}**\n\n{section_result['feedback']}")
+
+def render_performance(job_id, trace):
+    """단계별 성능 기록 표시 및 내려받기"""
+    with st.expander("⏱️ 성능", expanded=False):
+        totals = trace['totals']
+        metric_cols = st.columns(4)
+        metric_cols[0].metric("전체 소요 시간", f"{totals['elapsed_s']:.1f}초")
+        metric_cols[1].metric("OpenAI 호출", f"{totals['openai_calls']}회")
+        metric_cols[2].metric("Docs API 호출", f"{totals['docs_calls']}회")
+        metric_cols[3].metric("토큰 (입력/출력)", f"{totals['prompt_tokens']:,} / {totals['completion_tokens']:,}")
+        st.dataframe(trace['stages'], use_container_width=True)
+        
+        download_cols = st.columns(2)
+        download_cols[0].download_button("📥 JSON 기록", trace['json'],
+                                         file_name=f"trace-{trace['run_id']}.json",
+                                         mime="application/json", key=f"trace-json-{job_id}")
+        download_cols[1].download_button("📥 Prometheus 텍스트", trace['prometheus'],
+                                         file_name=f"trace-{trace['run_id']}.prom",
+                                         mime="text/plain", key=f"trace-prom-{job_id}")
+
+def render_running_job(job):
+    """진행 중인 작업의 진행률과 지금까지 받은 결과 표시"""
+    st.progress(min(max(job['progress'], 0.0), 1.0))
+    st.text(job['message'] or "")
+    
+    live = job['live']
+    loaded = live.get('loaded')
+    if loaded:
+        st.success(f"✅ 문서 로드 완료: **{loaded['title']}**")
+        if loaded['incremental']:
+            st.info(f"🔁 이전 검토 이후 {loaded['changed_sections']}개 섹션이 추가되거나 수정되었습니다 "
+                    f"(변경 비율 {loaded['change_ratio']:.0%})")
+        st.info(f"📋 총 {loaded['sections']}개 섹션 발견, {loaded['reviewed_sections']}개 섹션에 첨삭 예정")
+        if loaded.get('deferred_sections'):
+            st.info(f"🎯 예산을 넘는 {loaded['deferred_sections']}개 섹션은 우선순위가 낮아 이번에는 첨삭하지 않습니다")
+        if loaded.get('template_paragraphs'):
+            st.info(f"📐 템플릿과 같은 문단 {loaded['template_paragraphs']}개는 분석에서 제외했습니다")
+    
+    if live.get('analysis'):
+        # 완료 후와 같은 펼침 영역에 받은 만큼 이어서 표시
+        st.markdown("📊 **문서 분석 결과**")
+        with st.expander("📑 전체 분석 보기", expanded=True):
+            st.markdown(''.join(live['analysis']) + "▌")
+    elif live.get('analysis_message'):
+        st.markdown(live['analysis_message'])
+    
+    if live.get('sections'):
+        render_section_previews(live['sections'])
+
+def render_finished_job(job, average_ttft):
+    """끝난 작업의 저장된 결과 표시"""
+    result = job['result']
+    if result is None:
+        st.error(job['message'])
+        return
+    
+    document_id = result['document_id']
+    if result.get('title'):
+        st.success(f"✅ 문서 로드 완료: **{result['title']}**")
+    if result.get('incremental'):
+        st.info(f"🔁 이전 검토 이후 {result['changed_sections']}개 섹션이 추가되거나 수정되었습니다 "
+                f"(변경 비율 {result['change_ratio']:.0%})")
+    if result.get('title'):
+        st.info(f"📋 총 {result['sections']}개 섹션 발견, {result['reviewed_sections']}개 섹션에 첨삭 예정")
+    if result.get('deferred_sections'):
+        st.info(f"🎯 예산을 넘는 {result['deferred_sections']}개 섹션은 우선순위가 낮아 이번에는 첨삭하지 않았습니다 "
+                f"(예상 사용 토큰 {result['estimated_tokens']:,})")
+    if result.get('template_paragraphs'):
+        st.info(f"📐 템플릿과 같은 문단 {result['template_paragraphs']}개는 분석에서 제외했습니다")
+    if result.get('reused_feedback') or result.get('already_inserted'):
+        st.info(f"♻️ 중단된 이전 실행에서 이어서 진행했습니다: 생성된 피드백 {result['reused_feedback']}개 재사용, "
+                f"이미 삽입된 첨삭 {result['already_inserted']}개 건너뜀")
+    for error in result.get('errors', []):
+        st.error(error)
+    
+    if result.get('full_analysis'):
+        render_analysis(result['full_analysis'], result.get('time_to_first_token'), average_ttft)
+    if result.get('section_results'):
+        render_section_previews(result['section_results'])
+    if result.get('trace'):
+        render_performance(job['id'], result['trace'])
+    
+    if result['feedback_added'] > 0:
+        st.markdown(f"""
+        <div class='success-box'>
+        <h4>✅ 첨삭 완료!</h4>
+        <p>총 {result['sections']}개 섹션 중 {result['feedback_added']}개 섹션에 파란색 첨삭 내용이 삽입되었습니다.</p>
+        {f"<p>그중 {result['feedback_replaced']}개는 이전 첨삭을 새 첨삭으로 교체했습니다.</p>" if result.get('feedback_replaced') else ''}
+        <p>Google Docs에서 파란색으로 표시된 첨삭 내용을 확인하세요!</p>
+        </div>
+        """, unsafe_allow_html=True)
+        
+        # 문서 링크 제공
+        st.markdown(f"[📄 Google Docs에서 열기](https://docs.google.com/document/d/{document_id}/edit)")
+    elif result['status'] == 'unchanged':
+        st.success("✅ 이전 검토 이후 변경된 섹션이 없어 새로 첨삭할 내용이 없습니다.")
+    elif result['status'] == 'ok' and result.get('already_inserted'):
+        st.success("✅ 이전 실행에서 모든 첨삭 내용이 이미 삽입되었습니다.")
+    elif result.get('title'):
+        st.warning("⚠️ 첨삭 내용을 추가하지 못했습니다. 문서 권한을 확인해주세요.")
+    else:
+        st.error("❌ 문서 내용을 가져올 수 없습니다. 문서 권한을 확인해주세요.")
+
+# 작업 목록 (최신순)
+jobs = get_job_manager().list_jobs(owner_id)
+active_jobs = [job for job in jobs if job['status'] in ACTIVE_STATUSES]
+
+if jobs:
+    st.markdown("### 📋 작업 목록")
+    st.checkbox("🔄 진행 중인 작업 자동 새로고침", value=True, key='auto_refresh',
+                help="끄면 다른 설정을 바꾸는 동안 화면이 새로 고쳐지지 않습니다 (작업은 계속 진행됩니다)")
+    
+    # 최근 작업들의 평균 첫 응답 시간
+    ttft_values = [job['result']['time_to_first_token'] for job in jobs
+                   if job['status'] == DONE and job['result'] and job['result'].get('time_to_first_token') is not None]
+    average_ttft = sum(ttft_values) / len(ttft_values) if ttft_values else 0.0
+    
+    for n, job in enumerate(jobs):
+        created = datetime.fromtimestamp(job['created_at']).strftime('%H:%M:%S')
+        title = (job['result'] or {}).get('title') or job['live'].get('loaded', {}).get('title') or job['label']
+        # 결과 안에 펼침 영역이 있으므로 작업마다 테두리 있는 컨테이너로 구분 (펼침 영역은 중첩할 수 없음)
+        with st.container(border=True):
+            st.markdown(f"**{JOB_STATUS_ICONS.get(job['status'], '')} {title}** · {created}")
+            if job['status'] == QUEUED:
+                st.info(job['message'])
+            elif job['status'] in ACTIVE_STATUSES:
+                render_running_job(job)
+            elif n == 0 or st.toggle("결과 보기", key=f"show-job-{job['id']}"):
+                render_finished_job(job, average_ttft)
+    
+    if not active_jobs and st.button("🧹 끝난 작업 기록 지우기"):
+        get_job_manager().delete_finished(owner_id)
+        st.rerun()
+
+show_queue_status()
+show_cache_status()
 
 # 푸터
 st.markdown("---")
@@ -675,4 +668,9 @@ st.markdown(
     </div>
     """,
     unsafe_allow_html=True
-)
\ No newline at end of file
+)
+
+# 진행 중인 작업이 있으면 주기적으로 화면을 새로 고침
+if active_jobs and st.session_state.get('auto_refresh', True):
+    time.sleep(1)
+    st.rerun()
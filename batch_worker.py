@@ -0,0 +1,221 @@
+"""여러 Google Docs 문서를 한 번에 첨삭하는 명령줄 배치 작업기
+
+학급 전체 제출물처럼 많은 문서를 Streamlit 화면 없이 병렬로 처리하고,
+문서별 처리 결과를 CSV 또는 JSON 보고서로 저장합니다.
+
+    python batch_worker.py urls.txt --doc-type 에세이 --workers 4 --report report.csv
+
+인증 정보는 환경 변수(OPENAI_API_KEY, GOOGLE_APPLICATION_CREDENTIALS)를 먼저 사용하고,
+없으면 .streamlit/secrets.toml의 값을 사용합니다.
+"""
+import argparse
+import csv
+import json
+import logging
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from feedback_pipeline import DOCUMENT_TYPES, FEEDBACK_FOCUS, run_document_feedback
+from google_docs import GoogleClientPool, extract_document_id
+from instrumentation import RunTrace
+from llm_cache import LLMCache
+from llm_client import LLMClient
+from rate_limit import AdaptiveRateController, RateLimiter
+from review_state import ReviewStateStore
+from run_journal import RunJournal
+from template_index import load_template
+
+logger = logging.getLogger('batch_worker')
+
+SECRETS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.streamlit', 'secrets.toml')
+
+REPORT_FIELDS = ['url', 'document_id', 'title', 'status', 'sections', 'reviewed_sections', 'deferred_sections', 'template_paragraphs',
+                 'feedback_added', 'feedback_replaced', 'reused_feedback', 'already_inserted', 'elapsed',
+                 'openai_calls', 'prompt_tokens', 'completion_tokens', 'error']
+
+
+def load_secrets():
+    """.streamlit/secrets.toml 내용 (없거나 읽을 수 없으면 빈 dict)"""
+    if not os.path.exists(SECRETS_PATH):
+        return {}
+    try:
+        import tomllib
+    except ImportError:  # Python 3.10 이하
+        return {}
+    with open(SECRETS_PATH, 'rb') as f:
+        return tomllib.load(f)
+
+
+def load_service_account_info(path, secrets):
+    """서비스 계정 키 파일 또는 secrets.toml의 [google_service_account] 정보"""
+    path = path or os.environ.get('GOOGLE_APPLICATION_CREDENTIALS')
+    if path:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    return secrets.get('google_service_account')
+
+
+def read_document_urls(sources):
+    """인자로 받은 URL과 URL 목록 파일('-'는 표준 입력)에서 문서 URL 목록 읽기"""
+    urls = []
+    for source in sources:
+        if source == '-':
+            lines = sys.stdin.read().splitlines()
+        elif os.path.isfile(source):
+            with open(source, encoding='utf-8') as f:
+                lines = f.read().splitlines()
+        else:
+            lines = [source]
+
+        for line in lines:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                urls.append(line)
+    return urls
+
+
+def write_report(path, results):
+    """문서별 결과를 확장자에 따라 JSON 또는 CSV로 저장"""
+    if path.endswith('.json'):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        return
+
+    with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=REPORT_FIELDS, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(results)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="여러 Google Docs 문서에 AI 첨삭을 일괄 삽입합니다.")
+    parser.add_argument('sources', nargs='+', help="문서 URL/ID 또는 URL 목록 파일 (한 줄에 하나, '-'는 표준 입력)")
+    parser.add_argument('--doc-type', default="연구 보고서", choices=list(DOCUMENT_TYPES), help="문서 타입")
+    parser.add_argument('--focus', default="종합적 피드백", choices=list(FEEDBACK_FOCUS), help="피드백 초점")
+    parser.add_argument('--instructions', default='', help="추가 지시사항")
+    parser.add_argument('--workers', type=int, default=4, help="동시에 처리할 문서 수")
+    parser.add_argument('--section-concurrency', type=int, default=4, help="문서 하나에서 동시에 요청할 섹션 수")
+    parser.add_argument('--rpm', type=int, default=60, help="모든 작업이 공유하는 분당 최대 OpenAI 요청 수")
+    parser.add_argument('--model', default="gpt-4o-mini", help="사용할 OpenAI 모델")
+    parser.add_argument('--service-account', help="서비스 계정 키(JSON) 경로 (기본: GOOGLE_APPLICATION_CREDENTIALS)")
+    parser.add_argument('--report', default='batch_report.csv', help="결과 보고서 경로 (.csv 또는 .json)")
+    parser.add_argument('--no-cache', action='store_true', help="AI 응답 캐시를 사용하지 않음")
+    parser.add_argument('--full-review', action='store_true', help="이전 검토 기록을 무시하고 모든 섹션을 다시 검토")
+    parser.add_argument('--no-heading-styles', action='store_true', help="제목 스타일 대신 텍스트 패턴으로만 섹션 구분")
+    parser.add_argument('--packed', action='store_true', help="여러 섹션을 한 요청으로 묶어 OpenAI 요청 수를 줄임")
+    parser.add_argument('--budget-calls', type=int, help="문서당 섹션 피드백 요청 수 예산 (기본: 12, 우선순위가 높은 섹션부터)")
+    parser.add_argument('--budget-tokens', type=int, help="문서당 섹션 피드백 토큰 예산 (입력 + 최대 출력)")
+    parser.add_argument('--budget-seconds', type=float, help="문서당 섹션 피드백 예상 소요 시간 예산(초)")
+    parser.add_argument('--replace-feedback', action='store_true',
+                        help="섹션 뒤에 이전에 삽입한 첨삭이 있으면 새 첨삭으로 교체 (기본: 아래에 추가)")
+    parser.add_argument('--template', help="과제 템플릿 문서 URL/ID (템플릿과 같은 문단은 분석하지 않음)")
+    parser.add_argument('--no-resume', action='store_true',
+                        help="중단된 이전 실행을 이어받지 않고 처음부터 다시 실행 (실행 기록을 남기지 않음)")
+    parser.add_argument('--trace-dir', help="문서별 성능 기록(JSON, Prometheus 텍스트)을 저장할 디렉터리")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+
+    secrets = load_secrets()
+    api_key = os.environ.get('OPENAI_API_KEY') or secrets.get('OPENAI_API_KEY')
+    service_account_info = load_service_account_info(args.service_account, secrets)
+    if not api_key:
+        logger.error("OPENAI_API_KEY가 필요합니다.")
+        return 2
+    if not service_account_info:
+        logger.error("Google 서비스 계정 인증 정보가 필요합니다. --service-account 또는 GOOGLE_APPLICATION_CREDENTIALS를 지정하세요.")
+        return 2
+
+    urls = read_document_urls(args.sources)
+    if not urls:
+        logger.error("처리할 문서가 없습니다.")
+        return 2
+
+    # 설정한 동시 실행 수(문서별 섹션 요청 + 전체 분석)에서 시작해 429 응답을 받으면 줄임
+    max_concurrency = max(1, args.workers) * (args.section_concurrency + 1)
+    # 모든 작업 스레드가 같은 속도 제한기와 동시 호출 제어기, 캐시, 검토 기록을 공유
+    llm_client = LLMClient(args.model,
+                           api_key=api_key,
+                           cache=None if args.no_cache else LLMCache(),
+                           limiter=RateLimiter(args.rpm),
+                           controller=AdaptiveRateController(initial_limit=max_concurrency, max_limit=max_concurrency))
+    review_store = None if args.full_review else ReviewStateStore()
+    # 도중에 중단되었던 문서는 생성한 피드백과 삽입한 첨삭을 이어받아 남은 작업만 진행
+    journal = None if args.no_resume else RunJournal()
+
+    # Google API 클라이언트(httplib2)는 스레드 간에 공유할 수 없으므로 풀에서 스레드마다 하나씩 사용
+    client_pool = GoogleClientPool(service_account_info)
+
+    # 첨삭할 섹션을 고를 예산 (지정하지 않은 항목은 제한 없음, 모두 없으면 기본 12개 요청)
+    budget = {'calls': args.budget_calls, 'tokens': args.budget_tokens, 'seconds': args.budget_seconds}
+    budget = {kind: value for kind, value in budget.items() if value} or None
+
+    # 템플릿 색인은 한 번만 만들어 모든 문서가 읽기 전용으로 공유
+    template = None
+    if args.template:
+        template_id = extract_document_id(args.template)
+        if not template_id:
+            logger.error("템플릿 문서 URL이 유효한 Google Docs URL이 아닙니다: %s", args.template)
+            return 2
+        template = load_template(client_pool.docs(), template_id)
+        if template is None:
+            logger.error("템플릿 문서를 읽을 수 없습니다: %s", args.template)
+            return 2
+        logger.info("템플릿 문단 %d개를 색인했습니다.", len(template))
+
+    def process(url):
+        document_id = extract_document_id(url)
+        if not document_id:
+            return {'url': url, 'document_id': None, 'status': 'error', 'error': "유효한 Google Docs URL이 아닙니다."}
+
+        trace = RunTrace(document_id=document_id)
+        result = run_document_feedback(
+            client_pool.docs(), llm_client, document_id, args.doc_type, args.focus,
+            custom_instructions=args.instructions,
+            use_heading_styles=not args.no_heading_styles,
+            review_store=review_store,
+            max_workers=args.section_concurrency,
+            trace=trace,
+            packed=args.packed,
+            budget=budget,
+            journal=journal,
+            replace_feedback=args.replace_feedback,
+            template=template
+        )
+        totals = trace.totals()
+        result.update({
+            'url': url,
+            'openai_calls': totals['openai_calls'],
+            'prompt_tokens': totals['prompt_tokens'],
+            'completion_tokens': totals['completion_tokens']
+        })
+        if args.trace_dir:
+            trace.save(args.trace_dir)
+        return result
+
+    results = [None] * len(urls)
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as executor:
+        futures = {executor.submit(process, url): idx for idx, url in enumerate(urls)}
+        for done, future in enumerate(as_completed(futures), start=1):
+            idx = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {'url': urls[idx], 'document_id': None, 'status': 'error', 'error': str(e)}
+            results[idx] = result
+            logger.info("[%d/%d] %s %s (첨삭 %s개, %s초)%s", done, len(urls), result['status'],
+                        result.get('title') or result['url'], result.get('feedback_added', 0),
+                        result.get('elapsed', 0), f" - {result['error']}" if result.get('error') else '')
+
+    write_report(args.report, results)
+    failed = sum(1 for result in results if result['status'] == 'error')
+    logger.info("완료: %d개 문서 중 %d개 실패, 보고서: %s", len(results), failed, args.report)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
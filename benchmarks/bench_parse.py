@@ -0,0 +1,136 @@
+"""대용량 문서 파싱 벤치마크 (소요 시간, 최대 메모리, 파싱 결과가 차지하는 메모리)
+
+benchmarks/fakes.py로 수백 쪽 분량의 documents().get 응답을 만들어, 이전 방식(문단마다 dict와 문자열,
+텍스트 목록을 만든 뒤 다시 이어 붙임, body만 읽음)과 현재 parse_document(생성기로 body, 표, 탭을 훑어
+ParagraphStore에 보관)를 비교합니다. 메모리는 tracemalloc으로 측정하며 입력 JSON 자체는 제외합니다.
+thesis 시나리오는 테스트 픽스처의 논문 크기 문서로, 파싱 뒤 섹션 분석과 첨삭 위치 계획(plan_insertions)까지 잽니다.
+
+    python benchmarks/bench_parse.py
+    python benchmarks/bench_parse.py --pages 600 --tabs 3 --table-cells 6
+"""
+import argparse
+import gc
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fakes import FIXTURE_SIZES, make_document, make_tabbed_document  # noqa: E402
+
+from document_structure import analyze_document_sections  # noqa: E402
+from feedback_pipeline import plan_insertions  # noqa: E402
+from google_docs import FEEDBACK_MARKER, is_feedback_style, parse_document  # noqa: E402
+
+# 한 쪽에 들어가는 대략적인 글자 수와, 생성 문서의 섹션당 문단 수
+CHARS_PER_PAGE = 1500
+PARAGRAPHS_PER_SECTION = 20
+
+
+def parse_document_dicts(document):
+    """이전 방식의 파서 (문단마다 dict, 텍스트 목록과 이어 붙인 전체 텍스트, body만 읽음)"""
+    content_with_positions = []
+    texts = []
+    line_index = []
+    in_feedback = False
+    for element in document.get('body', {}).get('content', []):
+        if 'paragraph' not in element:
+            continue
+        paragraph_text = []
+        feedback_styled = True
+        for text_element in element['paragraph'].get('elements', []):
+            if 'textRun' in text_element:
+                text = text_element['textRun'].get('content', '')
+                if text.strip():
+                    paragraph_text.append(text)
+                    feedback_styled = feedback_styled and is_feedback_style(
+                        text_element['textRun'].get('textStyle', {}))
+        if not paragraph_text:
+            continue
+        text = ''.join(paragraph_text)
+        if feedback_styled and (in_feedback or text.lstrip().startswith(FEEDBACK_MARKER)):
+            in_feedback = not text.rstrip().endswith(']')
+            if content_with_positions:
+                content_with_positions[-1].setdefault('feedback', {'start': element.get('startIndex', 0)})['end'] = (
+                    element.get('endIndex', 0) - 1)
+            continue
+        in_feedback = False
+        line = len(line_index)
+        line_index.extend([len(content_with_positions)] * (text.count('\n') + 1))
+        content_with_positions.append({
+            'text': text,
+            'start': element.get('startIndex', 0),
+            'end': element.get('endIndex', 0),
+            'style': element['paragraph'].get('paragraphStyle', {}).get('namedStyleType'),
+            'line': line
+        })
+        texts.append(text)
+    return document.get('title'), content_with_positions, '\n'.join(texts), document.get('revisionId'), line_index
+
+
+def median_ms(func, repeat):
+    """func를 repeat번 실행한 시간의 중앙값(ms)과 마지막 결과"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), result
+
+
+def measure(parser, document, repeat):
+    """(문단 수, 글자 수, 파싱 시간(ms), 최대 메모리(MB), 결과 메모리(MB), 섹션 분석 시간(ms), 계획 시간(ms))
+
+    시간은 모두 repeat번 실행한 중앙값
+    """
+    parse_ms, parsed = median_ms(lambda: parser(document), repeat)
+    del parsed
+
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    parsed = parser(document)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    sections_ms, sections = median_ms(lambda: analyze_document_sections(parsed[1], parsed[2]), repeat)
+    feedbacks = ['첨삭'] * len(sections)
+    plan_ms, _ = median_ms(lambda: plan_insertions(sections, feedbacks, parsed[1], parsed[4]), repeat)
+
+    mb = 1024 * 1024
+    return (len(parsed[1]), len(parsed[2]), parse_ms, (peak - baseline) / mb,
+            (retained - baseline) / mb, sections_ms, plan_ms)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, default=300, help="생성할 문서 분량(쪽, 탭마다)")
+    parser.add_argument('--tabs', type=int, default=2, help="탭 문서 시나리오의 탭 수")
+    parser.add_argument('--table-cells', type=int, default=4, help="탭 문서 시나리오에서 섹션마다 넣을 표의 셀 수")
+    parser.add_argument('--repeat', type=int, default=5, help="시간 측정 반복 횟수 (중앙값을 출력)")
+    args = parser.parse_args()
+
+    # 문단 하나는 평균 약 140자
+    sections = max(1, args.pages * CHARS_PER_PAGE // (140 * PARAGRAPHS_PER_SECTION))
+    scenarios = {
+        'thesis': make_document(*FIXTURE_SIZES['thesis']),
+        'body': make_document(sections, PARAGRAPHS_PER_SECTION),
+        'tabs+tables': make_tabbed_document(args.tabs, sections, PARAGRAPHS_PER_SECTION,
+                                            table_cells=args.table_cells),
+    }
+    parsers = {'dicts (before)': parse_document_dicts, 'store (after)': parse_document}
+
+    print(f"{'scenario':>12} {'parser':>15} {'paragraphs':>11} {'pages':>6} {'parse(ms)':>10} "
+          f"{'peak(MB)':>9} {'retained(MB)':>13} {'sections(ms)':>13} {'plan(ms)':>9}")
+    for scenario, document in scenarios.items():
+        for name, parse in parsers.items():
+            paragraphs, chars, parse_ms, peak_mb, retained_mb, sections_ms, plan_ms = measure(parse, document,
+                                                                                              args.repeat)
+            print(f"{scenario:>12} {name:>15} {paragraphs:>11} {chars / CHARS_PER_PAGE:>6.0f} {parse_ms:>10.1f} "
+                  f"{peak_mb:>9.1f} {retained_mb:>13.1f} {sections_ms:>13.1f} {plan_ms:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""첨삭 파이프라인 전체 벤치마크 (오프라인)
+
+benchmarks/fakes.py의 가짜 Docs 서비스와 가짜 ChatCompletion을 주입해
+get_document_content부터 insert_feedbacks_to_doc까지 실제 API 없이 실행하고,
+문서 크기별 전체 소요 시간, API 호출 수, 문서당 호출 수를 출력합니다. 가짜 Docs는 삽입 요청을 문서에 실제로
+적용하므로, 실행 뒤 문서를 다시 파싱해 첨삭이 섹션 뒤에 자리 잡은 수(placed)와 첨삭을 뺀 본문이 원래와
+달라진 문서 수(drift)도 함께 출력합니다.
+
+    python benchmarks/bench_pipeline.py
+    python benchmarks/bench_pipeline.py --sizes small thesis --documents 8 --latency 0.5 --rate-limit-ratio 0.05
+    python benchmarks/bench_pipeline.py --fixture recorded_doc.json
+    python benchmarks/bench_pipeline.py --template-paragraphs 2 --use-template
+"""
+import argparse
+import copy
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fakes import FIXTURE_SIZES, FakeChatCompletion, FakeDocsService, load_document, make_document  # noqa: E402
+
+from feedback_pipeline import run_document_feedback  # noqa: E402
+from google_docs import parse_document  # noqa: E402
+from llm_client import LLMClient  # noqa: E402
+from rate_limit import AdaptiveRateController, RateLimiter  # noqa: E402
+from template_index import load_template  # noqa: E402
+
+
+def run_benchmark(documents, args, template_document=None):
+    """문서 묶음을 파이프라인에 통과시키고 (결과 목록, 소요 시간, 가짜 Docs, 가짜 OpenAI) 반환
+
+    template_document를 넘기면 그 문서로 만든 템플릿 색인으로 양식 안내문을 분석에서 제외함
+    """
+    docs_service = FakeDocsService(dict(documents, template=template_document) if template_document else documents,
+                                   latency=args.docs_latency)
+    template = load_template(docs_service, 'template') if template_document else None
+    completion = FakeChatCompletion(latency=args.latency,
+                                    tokens_per_second=args.tokens_per_second,
+                                    rate_limit_ratio=args.rate_limit_ratio)
+    max_concurrency = max(1, args.workers) * (args.section_concurrency + 1)
+    llm_client = LLMClient("gpt-4o-mini",
+                           limiter=RateLimiter(args.rpm) if args.rpm else None,
+                           create_completion=completion,
+                           controller=AdaptiveRateController(initial_limit=max_concurrency, max_limit=max_concurrency))
+
+    def process(document_id):
+        return run_document_feedback(docs_service, llm_client, document_id, "연구 보고서", "종합적 피드백",
+                                     max_workers=args.section_concurrency, packed=args.packed, template=template)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as executor:
+        results = list(executor.map(process, documents))
+    elapsed = time.perf_counter() - started
+    return results, elapsed, docs_service, completion, llm_client.controller
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', nargs='+', default=list(FIXTURE_SIZES), choices=list(FIXTURE_SIZES),
+                        help="측정할 문서 크기")
+    parser.add_argument('--fixture', help="크기별 생성 문서 대신 사용할 documents().get 응답 JSON 파일")
+    parser.add_argument('--documents', type=int, default=4, help="크기별로 처리할 문서 수")
+    parser.add_argument('--workers', type=int, default=4, help="동시에 처리할 문서 수")
+    parser.add_argument('--section-concurrency', type=int, default=4, help="문서 하나에서 동시에 요청할 섹션 수")
+    parser.add_argument('--latency', type=float, default=0.2, help="가짜 OpenAI 응답의 기본 지연 시간(초)")
+    parser.add_argument('--tokens-per-second', type=float, default=500.0, help="가짜 OpenAI의 토큰 생성 속도")
+    parser.add_argument('--rate-limit-ratio', type=float, default=0.0, help="429 오류를 낼 요청 비율 (0~1)")
+    parser.add_argument('--docs-latency', type=float, default=0.05, help="가짜 Docs API의 호출당 지연 시간(초)")
+    parser.add_argument('--packed', action='store_true', help="여러 섹션을 한 요청으로 묶어서 요청")
+    parser.add_argument('--rpm', type=int, default=0, help="분당 최대 OpenAI 요청 수 (0이면 제한 없음)")
+    parser.add_argument('--template-paragraphs', type=int, default=0,
+                        help="생성 문서의 섹션마다 넣을 과제 양식 안내문 수")
+    parser.add_argument('--use-template', action='store_true',
+                        help="양식 문서로 템플릿 색인을 만들어 안내문을 분석에서 제외")
+    args = parser.parse_args()
+
+    if args.fixture:
+        fixtures = {os.path.basename(args.fixture): load_document(args.fixture)}
+    else:
+        fixtures = {size: make_document(*FIXTURE_SIZES[size], seed=n, template_paragraphs=args.template_paragraphs)
+                    for n, size in enumerate(args.sizes)}
+
+    print(f"{'fixture':>12} {'docs':>5} {'wall(s)':>8} {'doc/s':>6} {'get':>5} {'batch':>6} "
+          f"{'llm':>6} {'429':>5} {'llm/doc':>8} {'tok/doc':>8} {'limit':>6} {'failed':>6} {'placed':>9} "
+          f"{'drift':>6}")
+    for name, fixture in fixtures.items():
+        documents = {f"{name}-{n}": copy.deepcopy(fixture) for n in range(args.documents)}
+        template_document = None
+        if args.use_template and not args.fixture:
+            template_document = make_document(*FIXTURE_SIZES[name], template_paragraphs=args.template_paragraphs,
+                                              student_text=False)
+        results, elapsed, docs_service, completion, controller = run_benchmark(documents, args, template_document)
+        failed = sum(1 for result in results if result['status'] == 'error')
+        # 첨삭을 쓴 뒤 다시 읽은 문서: 첨삭이 달린 문단 수와, 첨삭을 뺀 본문이 원래 문서와 같은지
+        original_text = parse_document(fixture)[2]
+        reparsed = [parse_document(document) for document in documents.values()]
+        placed = sum(1 for parsed in reparsed for para in parsed[1] if para.get('feedback'))
+        added = sum(result['feedback_added'] for result in results)
+        drift = sum(1 for parsed in reparsed if parsed[2] != original_text)
+        print(f"{name:>12} {len(results):>5} {elapsed:>8.2f} {len(results) / elapsed:>6.2f} "
+              f"{docs_service.get_calls:>5} {docs_service.batch_calls:>6} {completion.calls:>6} "
+              f"{completion.rate_limited:>5} {completion.calls / len(results):>8.1f} "
+              f"{completion.prompt_tokens / len(results):>8.0f} {controller.stats()['limit']:>6} {failed:>6} "
+              f"{f'{placed}/{added}':>9} {drift:>6}")
+
+
+if __name__ == '__main__':
+    main()
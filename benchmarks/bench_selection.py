@@ -0,0 +1,76 @@
+"""첨삭할 섹션 선택 벤치마크 (오프라인, API 호출 없음)
+
+benchmarks/fakes.py로 만든 문서를 실제 파서와 섹션 분석기로 나눈 뒤, 이전 방식(의미 있는 섹션의 앞 12개)과
+예산 기반 선택을 같은 예산으로 비교해 선택한 섹션 수, 예상 토큰, 문서를 다섯 구간으로 나눴을 때
+첨삭이 들어가는 구간 비율, 문서 뒤쪽 1/3 섹션의 첨삭 비율, 선택 시간을 출력합니다.
+
+    python benchmarks/bench_selection.py
+    python benchmarks/bench_selection.py --sizes thesis --calls 12 --tokens 20000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fakes import FIXTURE_SIZES, make_document  # noqa: E402
+
+from document_structure import analyze_document_sections  # noqa: E402
+from feedback_pipeline import (MAX_FEEDBACK_SECTIONS, MIN_SECTION_LENGTH, section_request_tokens,  # noqa: E402
+                               select_sections_to_feedback)
+from google_docs import parse_document  # noqa: E402
+
+# 문서 위치별 첨삭 분포를 볼 구간 수
+POSITION_BINS = 5
+
+
+def coverage(sections, selected):
+    """(선택한 섹션이 하나 이상 있는 위치 구간의 비율, 문서 뒤쪽 1/3 섹션 중 선택한 비율)"""
+    selected_ids = {id(section) for section in selected}
+    bins = min(POSITION_BINS, len(sections))
+    covered = {idx * bins // len(sections) for idx, section in enumerate(sections) if id(section) in selected_ids}
+    tail = sections[len(sections) * 2 // 3:]
+    tail_covered = sum(1 for section in tail if id(section) in selected_ids)
+    return len(covered) / bins, tail_covered / len(tail) if tail else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', nargs='+', default=list(FIXTURE_SIZES), choices=list(FIXTURE_SIZES),
+                        help="측정할 문서 크기")
+    parser.add_argument('--calls', type=int, default=MAX_FEEDBACK_SECTIONS, help="비교할 요청 수 예산")
+    parser.add_argument('--tokens', type=int, help="토큰 예산도 함께 비교 (입력 + 최대 출력)")
+    parser.add_argument('--seconds', type=float, help="예상 시간 예산도 함께 비교(초)")
+    parser.add_argument('--workers', type=int, default=4, help="섹션 동시 요청 수 (예상 시간 계산용)")
+    args = parser.parse_args()
+
+    budgets = [('calls', {'calls': args.calls})]
+    if args.tokens:
+        budgets.append(('tokens', {'tokens': args.tokens}))
+    if args.seconds:
+        budgets.append(('seconds', {'seconds': args.seconds}))
+
+    print(f"{'fixture':>8} {'method':>14} {'sections':>9} {'tokens':>8} {'fifths':>9} {'last 1/3':>9} "
+          f"{'select(ms)':>11}")
+    for n, size in enumerate(args.sizes):
+        _, content_with_positions, full_text, _, _ = parse_document(make_document(*FIXTURE_SIZES[size], seed=n))
+        sections = analyze_document_sections(content_with_positions, full_text)
+        meaningful = [s for s in sections if len(s['content'].strip()) > MIN_SECTION_LENGTH]
+
+        # 이전 방식: 앞에서부터 요청 수 예산만큼
+        first = meaningful[:args.calls]
+        rows = [('first-n', first, sum(section_request_tokens(s) for s in first), 0.0)]
+        for name, budget in budgets:
+            started = time.perf_counter()
+            _, selected, spent = select_sections_to_feedback(sections, budget, args.workers)
+            rows.append((f"budget:{name}", selected, spent['tokens'], (time.perf_counter() - started) * 1000))
+
+        for method, selected, tokens, elapsed_ms in rows:
+            spread, tail_ratio = coverage(meaningful, selected)
+            print(f"{size:>8} {method:>14} {len(selected):>9} {tokens:>8} {spread:>9.0%} {tail_ratio:>9.0%} "
+                  f"{elapsed_ms:>11.1f}")
+
+
+if __name__ == '__main__':
+    main()
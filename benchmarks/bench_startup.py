@@ -0,0 +1,92 @@
+"""콜드 스타트 벤치마크 (모듈 불러오기와 첫 Google API 클라이언트 생성 비용)
+
+측정마다 새 파이썬 프로세스를 띄워, 컨테이너가 새로 뜬 직후의 첫 요청과 같은 조건에서
+이전 방식(무거운 라이브러리를 처음부터 불러오고 build()로 클라이언트 생성)과
+현재 방식(앱 모듈만 불러오고, 버튼을 누른 뒤 openai와 Google 라이브러리를 불러와 정적 discovery 문서로
+클라이언트 생성)의 소요 시간을 비교합니다. import는 첫 화면까지, first build는 첫 요청이 추가로 기다리는 시간입니다.
+
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --repeat 10
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 화면을 그리는 데 필요한 앱 모듈 (app.py가 불러오는 모듈에서 streamlit만 뺀 목록)
+APP_MODULES = ('rate_limit, llm_cache, llm_client, review_state, run_journal, instrumentation, jobs, '
+               'google_docs, feedback_pipeline, template_index')
+
+# 이전에 app.py가 시작할 때 함께 불러오던 라이브러리
+HEAVY_MODULES = ('openai, googleapiclient.discovery, googleapiclient.errors, google.oauth2.service_account, '
+                 'google_auth_httplib2, httplib2')
+
+# 각 시나리오는 새 프로세스에서 실행되어 {단계: 소요 시간(ms)}를 JSON으로 출력
+SCENARIOS = {
+    'before': f"""
+import time
+started = time.perf_counter()
+import {HEAVY_MODULES}
+import {APP_MODULES}
+imported = time.perf_counter()
+from googleapiclient.discovery import build
+build('docs', 'v1', http=httplib2.Http(), static_discovery=True)
+build('drive', 'v3', http=httplib2.Http(), static_discovery=True)
+first_build = time.perf_counter()
+build('docs', 'v1', http=httplib2.Http(), static_discovery=True)
+build('drive', 'v3', http=httplib2.Http(), static_discovery=True)
+second_build = time.perf_counter()
+""",
+    'after': f"""
+import sys, time
+started = time.perf_counter()
+import {APP_MODULES}
+imported = time.perf_counter()
+assert not any(name in sys.modules for name in ('openai', 'googleapiclient', 'httplib2')), '무거운 모듈이 미리 불러와짐'
+import openai
+import httplib2
+from googleapiclient.discovery import build_from_document
+build_from_document(google_docs.load_discovery_document('docs', 'v1'), http=httplib2.Http())
+build_from_document(google_docs.load_discovery_document('drive', 'v3'), http=httplib2.Http())
+first_build = time.perf_counter()
+build_from_document(google_docs.load_discovery_document('docs', 'v1'), http=httplib2.Http())
+build_from_document(google_docs.load_discovery_document('drive', 'v3'), http=httplib2.Http())
+second_build = time.perf_counter()
+""",
+}
+
+REPORT = """
+import json
+print(json.dumps({'import_ms': (imported - started) * 1000,
+                  'first_build_ms': (first_build - imported) * 1000,
+                  'second_build_ms': (second_build - first_build) * 1000}))
+"""
+
+
+def run_scenario(code):
+    """새 프로세스에서 시나리오를 실행하고 단계별 소요 시간(ms)을 반환"""
+    output = subprocess.run([sys.executable, '-c', code + REPORT], cwd=ROOT, check=True,
+                            capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5, help="시나리오별 반복 횟수 (중앙값을 출력)")
+    args = parser.parse_args()
+
+    print(f"{'scenario':>10} {'import(ms)':>11} {'first build(ms)':>16} {'next build(ms)':>15} {'total(ms)':>10}")
+    for name, code in SCENARIOS.items():
+        runs = [run_scenario(code) for _ in range(args.repeat)]
+        median = {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+        total = median['import_ms'] + median['first_build_ms']
+        print(f"{name:>10} {median['import_ms']:>11.1f} {median['first_build_ms']:>16.1f} "
+              f"{median['second_build_ms']:>15.1f} {total:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
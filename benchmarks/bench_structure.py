@@ -0,0 +1,241 @@
+"""문서 구조 분석기 벤치마크
+
+1천~10만 줄 규모의 합성 한국어/영어 보고서를 만들어 기존 구현과 현재
+analyze_document_structure의 실행 시간을 비교하고, 두 결과가 완전히 같은지 확인합니다.
+
+    python benchmarks/bench_structure.py
+    python benchmarks/bench_structure.py --sizes 1000 50000 --repeat 5
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from document_structure import analyze_document_structure  # noqa: E402
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000]
+
+KOREAN_SENTENCES = [
+    "이 연구는 생성형 인공지능이 학생들의 글쓰기 과정에 미치는 영향을 분석한다.",
+    "설문 결과 응답자의 68%가 피드백을 받은 뒤 글을 다시 고쳐 썼다고 답하였다.",
+    "선행 연구에서는 교사의 즉각적인 피드백이 학습 동기를 높인다고 보고하였다.",
+    "따라서 본 보고서는 수업 현장에서 적용 가능한 방안을 제안하고자 한다.",
+    "다만 표본의 크기가 작아 결과를 일반화하기에는 한계가 있다.",
+]
+
+ENGLISH_SENTENCES = [
+    "The experiment was repeated three times to reduce measurement error.",
+    "Results indicate a strong correlation between revision count and final score.",
+    "Further work should examine long-term effects across multiple semesters.",
+    "Participants were recruited from two public high schools in Seoul.",
+]
+
+HEADINGS = [
+    "{n}. 연구 배경",
+    "{n}.1 연구 목적",
+    "{n}.1.1 세부 내용",
+    "{n}) 분석 방법",
+    "IV. Discussion",
+    "[{n}장 결과]",
+    "## Section {n}",
+    "- 주요 발견: 요약",
+    "RESULTS",
+    "실험 설계:",
+    "(참고) 자료 출처",
+    "【부록 {n}】",
+    "결론 및 제언",
+    "참고문헌",
+]
+
+
+def generate_report(num_lines, heading_every, seed=0):
+    """heading_every 줄마다 제목이 등장하는 합성 보고서 텍스트 생성 (get_document_content 형식)"""
+    rng = random.Random(seed)
+    lines = []
+    n = 1
+
+    while len(lines) < num_lines:
+        if len(lines) % heading_every == 0:
+            lines.append(rng.choice(HEADINGS).format(n=n))
+            n += 1
+        else:
+            sentences = KOREAN_SENTENCES if rng.random() < 0.7 else ENGLISH_SENTENCES
+            # 아주 짧은 문단도 섞어 병합 경로를 함께 검증
+            count = rng.choice([1, 1, 2, 3, 5])
+            lines.append(' '.join(rng.choice(sentences) for _ in range(count)))
+        # Docs 문단은 줄바꿈으로 끝나므로 빈 줄이 사이사이 생김
+        lines.append('')
+
+    return '\n'.join(lines[:num_lines])
+
+
+def best_time(func, text, repeat):
+    """repeat번 실행한 것 중 가장 짧은 시간과 결과"""
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(text)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def legacy_analyze_document_structure(full_text):
+    """기존 구현 (정규식 8개를 줄마다 순회, 문자열 += 병합) - 결과 비교 기준"""
+    sections = []
+    
+    # 제목 패턴 (숫자나 특수 문자로 시작하는 줄)
+    title_patterns = [
+        r'^\d+\.\s+',  # 1. 2. 3. 등
+        r'^\d+\.\d+\.?\s+',  # 1.1, 2.1 등 (세부 섹션)
+        r'^\d+\.\d+\.\d+\.?\s+',  # 1.1.1, 2.1.1 등 (더 세부 섹션)
+        r'^\d+\)\s+',  # 1) 2) 3) 등
+        r'^[IVX]+\.\s+',  # I. II. III. 등
+        r'^\[.+\]\s*',  # [제목] 형식
+        r'^#+\s+',  # # ## ### 마크다운 형식
+        r'^[\-\*]\s+\w+.*:',  # - 제목: 또는 * 제목: 형식
+    ]
+    
+    lines = full_text.split('\n')
+    current_section = {'title': '서론', 'content': [], 'start_line': 0}
+    
+    for i, line in enumerate(lines):
+        is_title = False
+        
+        # 빈 줄은 무시
+        if not line.strip():
+            if current_section['content']:
+                current_section['content'].append(line)
+            continue
+        
+        # 제목 패턴 확인
+        for pattern in title_patterns:
+            if re.match(pattern, line.strip()):
+                is_title = True
+                break
+        
+        # 대문자로만 이루어진 짧은 줄도 제목으로 간주
+        if not is_title and line.strip().isupper() and len(line.strip()) < 50:
+            is_title = True
+        
+        # 콜론으로 끝나는 짧은 줄도 제목으로 간주 (예: "서론:", "결론:" 등)
+        if not is_title and line.strip().endswith(':') and len(line.strip()) < 50:
+            is_title = True
+        
+        # 가로, 대괄호로 시작하는 줄도 제목으로 간주
+        if not is_title and (line.strip().startswith('(') or line.strip().startswith('【')):
+            is_title = True
+        
+        # "목차", "서론", "본론", "결론", "참고문헌", "부록" 등의 키워드로 시작하는 줄
+        keywords = ['목차', '서론', '본론', '결론', '참고문헌', '부록', '요약', '개요', '서문']
+        if not is_title:
+            for keyword in keywords:
+                if line.strip().startswith(keyword):
+                    is_title = True
+                    break
+        
+        if is_title:
+            # 이전 섹션 저장
+            if current_section['content']:
+                sections.append({
+                    'title': current_section['title'],
+                    'content': '\n'.join(current_section['content']),
+                    'start_line': current_section['start_line'],
+                    'end_line': i - 1
+                })
+            
+            # 새 섹션 시작
+            current_section = {
+                'title': line.strip(),
+                'content': [],
+                'start_line': i
+            }
+        else:
+            current_section['content'].append(line)
+    
+    # 마지막 섹션 저장
+    if current_section['content']:
+        sections.append({
+            'title': current_section['title'],
+            'content': '\n'.join(current_section['content']),
+            'start_line': current_section['start_line'],
+            'end_line': len(lines) - 1
+        })
+    
+    # 섹션이 너무 많으면 내용을 기준으로 병합
+    if len(sections) > 20:  # 20개 이상일 때만 병합
+        merged_sections = []
+        current_merged = sections[0]
+        
+        for section in sections[1:]:
+            # 매우 짧은 섹션만 병합 (기준을 100자로 낮춤)
+            if len(section['content'].strip()) < 100:
+                current_merged['content'] += '\n\n' + section['content']
+                current_merged['end_line'] = section['end_line']
+            else:
+                merged_sections.append(current_merged)
+                current_merged = section
+        
+        merged_sections.append(current_merged)
+        sections = merged_sections
+    
+    # 섹션이 너무 적으면 내용을 기준으로 분할
+    if len(sections) < 6:
+        # 각 섹션을 내용 길이를 기준으로 분할
+        new_sections = []
+        for section in sections:
+            content = section['content']
+            paragraphs = content.split('\n\n')
+            
+            # 문단이 충분히 많으면 분할
+            if len(paragraphs) > 3:
+                mid = len(paragraphs) // 2
+                second_half = '\n\n'.join(paragraphs[mid:])
+                # 섹션 내용은 end_line에서 끝나므로 후반부가 시작하는 실제 줄 번호를 역산
+                split_line = max(section['start_line'], section['end_line'] - second_half.count('\n'))
+                new_sections.append({
+                    'title': section['title'] + ' (전반부)',
+                    'content': '\n\n'.join(paragraphs[:mid]),
+                    'start_line': section['start_line'],
+                    'end_line': split_line - 1
+                })
+                new_sections.append({
+                    'title': section['title'] + ' (후반부)',
+                    'content': second_half,
+                    'start_line': split_line,
+                    'end_line': section['end_line']
+                })
+            else:
+                new_sections.append(section)
+        
+        sections = new_sections
+    
+    return sections
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="생성할 문서의 줄 수")
+    parser.add_argument('--repeat', type=int, default=3, help="크기별 반복 측정 횟수")
+    args = parser.parse_args()
+
+    print(f"{'lines':>8} {'shape':>7} {'sections':>8} {'legacy(s)':>10} {'current(s)':>10} {'speedup':>8}")
+    for size in args.sizes:
+        # 제목이 촘촘한 문서(병합 경로)와 드문 문서(분할 경로)를 모두 측정
+        for shape, heading_every in (('dense', 12), ('sparse', max(size // 4, 12))):
+            text = generate_report(size, heading_every, seed=size)
+            legacy_time, expected = best_time(legacy_analyze_document_structure, text, args.repeat)
+            current_time, actual = best_time(analyze_document_structure, text, args.repeat)
+
+            assert actual == expected, f"{size}줄 {shape} 문서에서 분석 결과가 기존 구현과 다릅니다"
+            print(f"{size:>8} {shape:>7} {len(actual):>8} {legacy_time:>10.4f} {current_time:>10.4f} "
+                  f"{legacy_time / current_time:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
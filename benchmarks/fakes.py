@@ -0,0 +1,384 @@
+"""벤치마크용 Google Docs / OpenAI 가짜 구현
+
+실제 API 할당량을 쓰거나 실제 문서를 건드리지 않고 파이프라인 전체를 측정하기 위한 대역입니다.
+FakeDocsService는 documents().get 형식의 JSON을 돌려주고 batchUpdate의 삽입, 삭제, 스타일 요청을
+문서에 실제로 적용한 뒤 리비전을 올리며, FakeChatCompletion은 지연 시간, 토큰 생성 속도, 429 오류 비율을 설정할 수 있습니다.
+"""
+import copy
+import json
+import random
+import re
+import threading
+import time
+
+import httplib2
+from googleapiclient.errors import HttpError
+from openai.error import RateLimitError
+from openai.openai_object import OpenAIObject
+
+HEADINGS = ["연구 배경", "연구 방법", "실험 결과", "논의", "결론", "참고문헌"]
+
+SENTENCES = [
+    "이 연구는 생성형 인공지능이 학생들의 글쓰기 과정에 미치는 영향을 분석한다.",
+    "설문 결과 응답자의 68%가 피드백을 받은 뒤 글을 다시 고쳐 썼다고 답하였다.",
+    "선행 연구에서는 교사의 즉각적인 피드백이 학습 동기를 높인다고 보고하였다.",
+    "Results indicate a strong correlation between revision count and final score.",
+    "다만 표본의 크기가 작아 결과를 일반화하기에는 한계가 있다.",
+]
+
+# 벤치마크 문서 크기 (섹션 수, 섹션당 문단 수)
+FIXTURE_SIZES = {
+    'small': (4, 3),
+    'medium': (12, 8),
+    'thesis': (60, 25),
+}
+
+
+# 과제 양식에 들어 있는 안내문 (모든 제출물에 똑같이 들어감)
+TEMPLATE_INSTRUCTIONS = [
+    "※ 작성 안내: 이 항목에서는 {heading}에 대해 본인의 생각을 500자 이상 서술하세요. 표와 그림은 반드시 출처를 밝혀야 합니다.",
+    "※ 평가 기준: 주장과 근거의 연결, 자료 해석의 정확성, 문장 표현의 명료성을 각각 5점 척도로 평가합니다.",
+    "※ 유의 사항: 다른 학생의 글이나 인터넷 자료를 그대로 옮겨 적은 경우 해당 항목은 0점 처리됩니다.",
+]
+
+
+def make_document(num_sections, paragraphs_per_section, title="벤치마크 문서", seed=0, template_paragraphs=0,
+                  student_text=True, table_cells=0):
+    """제목 1 스타일 섹션으로 구성된 documents().get 형식의 문서 JSON 생성
+
+    template_paragraphs만큼 섹션마다 양식 안내문을 먼저 넣고, student_text가 False이면 안내문만 있는
+    양식 문서를 만듦. table_cells를 넘기면 섹션 끝마다 그 수만큼 셀이 있는 2열 표를 넣음
+    (실제 문서처럼 본문은 표로 끝나지 않고 빈 문단이 하나 뒤따름)
+    """
+    rng = random.Random(seed)
+    content = [{'startIndex': 0, 'endIndex': 1, 'sectionBreak': {}}]
+    index = 1
+
+    def add_paragraph(text, style, target=content):
+        nonlocal index
+        text += '\n'
+        end = index + len(text.encode('utf-16-le')) // 2
+        target.append({
+            'startIndex': index,
+            'endIndex': end,
+            'paragraph': {
+                'elements': [{'startIndex': index, 'endIndex': end, 'textRun': {'content': text, 'textStyle': {}}}],
+                'paragraphStyle': {'namedStyleType': style}
+            }
+        })
+        index = end
+
+    def add_table(cells):
+        nonlocal index
+        table = {'startIndex': index, 'table': {'tableRows': []}}
+        index += 1
+        for row_start in range(0, cells, 2):
+            row = {'tableCells': []}
+            for _ in range(min(2, cells - row_start)):
+                cell = {'content': []}
+                index += 1
+                add_paragraph(rng.choice(SENTENCES), 'NORMAL_TEXT', cell['content'])
+                row['tableCells'].append(cell)
+            table['table']['tableRows'].append(row)
+            index += 1
+        index += 1
+        table['endIndex'] = index
+        content.append(table)
+
+    add_paragraph(title, 'TITLE')
+    for n in range(num_sections):
+        heading = HEADINGS[n % len(HEADINGS)]
+        add_paragraph(f"{n + 1}. {heading}", 'HEADING_1')
+        for k in range(template_paragraphs):
+            add_paragraph(TEMPLATE_INSTRUCTIONS[k % len(TEMPLATE_INSTRUCTIONS)].format(heading=heading), 'NORMAL_TEXT')
+        for _ in range(paragraphs_per_section if student_text else 0):
+            add_paragraph(' '.join(rng.choice(SENTENCES) for _ in range(rng.randint(2, 5))), 'NORMAL_TEXT')
+        if table_cells:
+            add_table(table_cells)
+    if table_cells:
+        add_paragraph('', 'NORMAL_TEXT')
+
+    return {'documentId': None, 'title': title, 'revisionId': 'rev-0', 'body': {'content': content}}
+
+
+def make_tabbed_document(tabs, *args, **kwargs):
+    """make_document로 만든 문서 여러 개를 탭으로 담은 includeTabsContent=True 형식의 문서 JSON 생성"""
+    documents = [make_document(*args, seed=n, **kwargs) for n in range(tabs)]
+    return {
+        'documentId': None,
+        'title': documents[0]['title'],
+        'revisionId': 'rev-0',
+        'tabs': [{'tabProperties': {'tabId': f't.{n}', 'index': n}, 'documentTab': {'body': document['body']}}
+                 for n, document in enumerate(documents)]
+    }
+
+
+def load_document(path):
+    """녹화해 둔 documents().get 응답 JSON 파일 읽기"""
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _shift_indices(element, delta):
+    """구조 요소(표 등)와 그 안의 모든 startIndex/endIndex를 delta만큼 이동"""
+    if isinstance(element, dict):
+        for key, value in element.items():
+            if key in ('startIndex', 'endIndex'):
+                element[key] = value + delta
+            else:
+                _shift_indices(value, delta)
+    elif isinstance(element, list):
+        for item in element:
+            _shift_indices(item, delta)
+
+
+def _flatten_content(content):
+    """body content를 Docs 인덱스 하나(UTF-16 코드 단위)당 하나의 [글자, 글자 스타일, 문단 스타일, 구조 요소] 목록으로 펼침
+
+    문단이 아닌 요소(구역 나누기, 표)는 첫 칸에만 요소를 담고 나머지 칸은 자리만 차지함
+    """
+    units = []
+    for element in content:
+        if 'paragraph' not in element:
+            size = element['endIndex'] - element.get('startIndex', 0)
+            units.append([None, None, None, element])
+            units.extend([None, None, None, None] for _ in range(size - 1))
+            continue
+        paragraph_style = element['paragraph'].get('paragraphStyle', {})
+        for run in element['paragraph'].get('elements', []):
+            text_run = run.get('textRun', {})
+            for char in text_run.get('content', ''):
+                units.append([char, text_run.get('textStyle', {}), paragraph_style, None])
+                # BMP 밖의 글자는 UTF-16 코드 단위 두 개를 차지
+                if ord(char) > 0xFFFF:
+                    units.append(['', text_run.get('textStyle', {}), paragraph_style, None])
+    return units
+
+
+def _build_content(units):
+    """_flatten_content 목록을 다시 content(문단, 글자 스타일이 같은 글자끼리 묶은 textRun)로 만듦"""
+    content = []
+    runs = []
+    paragraph_start = None
+    for index, (char, text_style, paragraph_style, element) in enumerate(units):
+        if element is not None:
+            _shift_indices(element, index - element.get('startIndex', 0))
+            content.append(element)
+            continue
+        if char is None:
+            continue
+        if paragraph_start is None:
+            paragraph_start = index
+        if runs and runs[-1]['textRun']['textStyle'] == text_style:
+            runs[-1]['textRun']['content'] += char
+            runs[-1]['endIndex'] = index + 1
+        else:
+            runs.append({'startIndex': index, 'endIndex': index + 1,
+                         'textRun': {'content': char, 'textStyle': text_style}})
+        if char == '\n':
+            content.append({'startIndex': paragraph_start, 'endIndex': index + 1,
+                            'paragraph': {'elements': runs, 'paragraphStyle': paragraph_style}})
+            runs = []
+            paragraph_start = None
+    return content
+
+
+def _find_tab(tabs, tab_id):
+    for tab in tabs:
+        if tab.get('tabProperties', {}).get('tabId') == tab_id:
+            return tab
+        found = _find_tab(tab.get('childTabs', []), tab_id)
+        if found is not None:
+            return found
+    return None
+
+
+def _target_body(document, location):
+    """요청 위치(tabId 포함)가 가리키는 body (탭 ID가 없으면 첫 탭 또는 body)"""
+    if 'tabs' not in document:
+        return document['body']
+    tab = _find_tab(document['tabs'], location['tabId']) if location.get('tabId') else document['tabs'][0]
+    return tab['documentTab']['body']
+
+
+def document_text(document, tab_id=None):
+    """문서(또는 탭) 본문 텍스트 - i번째 글자가 Docs 인덱스 i에 있는 글자
+
+    문단이 아닌 요소와 BMP 밖 글자의 두 번째 코드 단위 자리는 \\0으로 채움
+    """
+    body = _target_body(document, {'tabId': tab_id})
+    return ''.join(char or '\0' for char, _, _, _ in _flatten_content(body['content']))
+
+
+def apply_document_requests(document, requests):
+    """batchUpdate의 insertText / deleteContentRange / updateTextStyle / updateParagraphStyle 요청을
+    문서 JSON에 실제 API처럼 차례로 적용
+
+    삽입한 글자는 바로 앞 글자의 스타일을, 삽입한 줄바꿈은 들어간 문단의 문단 스타일을 이어받음.
+    표 바로 뒤(다음 문단의 시작)에는 삽입할 수 있지만 표 안을 고치는 요청은 지원하지 않음
+    """
+    # 요청마다 다시 펼치지 않도록 body(탭)별로 한 번만 펼쳐 모든 요청을 적용한 뒤 다시 만듦
+    flattened = {}
+    for request in requests:
+        kind, params = next(iter(request.items()))
+        location = params.get('location') or params.get('range')
+        body = _target_body(document, location)
+        if id(body) not in flattened:
+            flattened[id(body)] = (body, _flatten_content(body['content']))
+        units = flattened[id(body)][1]
+
+        if kind == 'insertText':
+            index = location['index']
+            if units[index][0] is None:
+                raise ValueError(f"문단 밖의 위치에는 글자를 넣을 수 없습니다: {index}")
+            text_style = units[index - 1][1] if units[index - 1][0] is not None else {}
+            paragraph_style = units[index][2]
+            units[index:index] = [[char, text_style, paragraph_style, None] for char in params['text']]
+        elif kind == 'deleteContentRange':
+            del units[location['startIndex']:location['endIndex']]
+        elif kind == 'updateTextStyle':
+            fields = params['fields'].split(',')
+            for unit in units[location['startIndex']:location['endIndex']]:
+                if unit[0] is None:
+                    continue
+                text_style = {key: value for key, value in unit[1].items() if key not in fields}
+                text_style.update((key, params['textStyle'][key]) for key in fields if key in params['textStyle'])
+                unit[1] = text_style
+        elif kind == 'updateParagraphStyle':
+            # 범위에 걸친 문단 전체의 문단 스타일을 바꿈
+            start, end = location['startIndex'], location['endIndex']
+            while start > 0 and units[start - 1][0] not in (None, '\n'):
+                start -= 1
+            while end < len(units) and units[end - 1][0] != '\n':
+                end += 1
+            fields = params['fields'].split(',')
+            for unit in units[start:end]:
+                if unit[0] is None:
+                    continue
+                paragraph_style = {key: value for key, value in unit[2].items() if key not in fields}
+                paragraph_style.update((key, params['paragraphStyle'][key])
+                                       for key in fields if key in params['paragraphStyle'])
+                unit[2] = paragraph_style
+        else:
+            raise ValueError(f"지원하지 않는 요청입니다: {kind}")
+
+    for body, units in flattened.values():
+        body['content'] = _build_content(units)
+
+
+class _Call:
+    def __init__(self, func):
+        self._func = func
+
+    def execute(self, *args, **kwargs):
+        return self._func()
+
+
+class FakeDocsService:
+    """documents().get / batchUpdate만 흉내 내는 Google Docs 서비스 대역"""
+
+    def __init__(self, documents, latency=0.0):
+        self._documents = documents
+        self.latency = latency
+        self.get_calls = 0
+        self.batch_calls = 0
+        self.batch_requests = 0
+        self._lock = threading.Lock()
+
+    def documents(self):
+        return self
+
+    def get(self, documentId, fields=None, **kwargs):
+        def call():
+            time.sleep(self.latency)
+            with self._lock:
+                self.get_calls += 1
+                # 리비전 ID만 요청하면 본문 없이 응답
+                if fields == 'revisionId':
+                    return {'revisionId': self._documents[documentId]['revisionId']}
+                document = copy.deepcopy(self._documents[documentId])
+            document['documentId'] = documentId
+            return document
+        return _Call(call)
+
+    def batchUpdate(self, documentId, body):
+        def call():
+            time.sleep(self.latency)
+            with self._lock:
+                self.batch_calls += 1
+                self.batch_requests += len(body['requests'])
+                document = self._documents[documentId]
+                required = body.get('writeControl', {}).get('requiredRevisionId')
+                if required and required != document['revisionId']:
+                    raise HttpError(httplib2.Response({'status': 400}),
+                                    b'{"error": {"message": "The required revision ID does not match"}}')
+                apply_document_requests(document, body['requests'])
+                # 실제 API처럼 리비전을 올려 다음 요청의 requiredRevisionId를 돌려줌
+                revision = int(document['revisionId'].split('-')[1]) + 1
+                document['revisionId'] = f"rev-{revision}"
+            return {'documentId': documentId, 'replies': [{} for _ in body['requests']],
+                    'writeControl': {'requiredRevisionId': document['revisionId']}}
+        return _Call(call)
+
+
+class FakeChatCompletion:
+    """openai.ChatCompletion.create 대역 (지연 시간, 토큰 생성 속도, 429 오류 주입)"""
+
+    def __init__(self, latency=0.3, tokens_per_second=200.0, completion_tokens=150,
+                 rate_limit_ratio=0.0, seed=0):
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.completion_tokens = completion_tokens
+        self.rate_limit_ratio = rate_limit_ratio
+        self.calls = 0
+        self.rate_limited = 0
+        self.prompt_tokens = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def __call__(self, model, messages, max_tokens, temperature, stream=False, **kwargs):
+        with self._lock:
+            self.calls += 1
+            limited = self._rng.random() < self.rate_limit_ratio
+            if limited:
+                self.rate_limited += 1
+
+        if limited:
+            time.sleep(self.latency / 10)
+            raise RateLimitError("Rate limit reached (fake)", http_status=429, headers={'retry-after': '1'})
+
+        prompt_tokens = sum(len(message['content']) for message in messages) // 2
+        completion_tokens = min(max_tokens, self.completion_tokens)
+        with self._lock:
+            self.prompt_tokens += prompt_tokens
+
+        text = "피드백 " * completion_tokens
+        # 여러 섹션을 묶은 요청에는 섹션 번호별 JSON 배열로 응답
+        section_ids = re.findall(r'### 섹션 (\d+):', messages[-1]['content'])
+        if section_ids:
+            text = json.dumps([{'section_id': int(section_id), 'feedback': text.strip()} for section_id in section_ids],
+                              ensure_ascii=False)
+        usage = {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+                 'total_tokens': prompt_tokens + completion_tokens}
+
+        if stream:
+            include_usage = (kwargs.get('stream_options') or {}).get('include_usage', False)
+            return self._stream(text, usage if include_usage else None)
+
+        time.sleep(self.latency + completion_tokens / self.tokens_per_second)
+        return OpenAIObject.construct_from({
+            'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': text}, 'finish_reason': 'stop'}],
+            'usage': usage
+        })
+
+    def _stream(self, text, usage):
+        time.sleep(self.latency)
+        pieces = text.split(' ')
+        for piece in pieces:
+            time.sleep(1 / self.tokens_per_second)
+            yield OpenAIObject.construct_from({
+                'choices': [{'index': 0, 'delta': {'content': piece + ' '}, 'finish_reason': None}]
+            })
+        if usage:
+            # stream_options.include_usage를 요청하면 마지막 조각에 choices 없이 사용량만 옴
+            yield OpenAIObject.construct_from({'choices': [], 'usage': usage})
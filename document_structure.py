@@ -0,0 +1,249 @@
+import re
+
+from paragraph_store import paragraph_values
+
+# 제목으로 간주하는 줄의 시작 패턴을 하나로 합친 정규식
+#   1. / 1.1 / 1.1.1 / 1) / I. 번호, [제목], # 마크다운, "- 제목:" 형식,
+#   괄호로 시작하는 줄, 주요 키워드(목차, 서론, 본론 ...)로 시작하는 줄
+TITLE_PATTERN = re.compile(
+    r'(?:'
+    r'\d+\.\s'
+    r'|\d+\.\d+\.?\s'
+    r'|\d+\.\d+\.\d+\.?\s'
+    r'|\d+\)\s'
+    r'|[IVX]+\.\s'
+    r'|\[.+\]'
+    r'|#+\s'
+    r'|[\-\*]\s+\w+.*:'
+    r'|[(【]'
+    r'|목차|서론|본론|결론|참고문헌|부록|요약|개요|서문'
+    r')'
+)
+
+# 대문자로만 이루어졌거나 콜론으로 끝나는 줄을 제목으로 볼 최대 길이
+SHORT_TITLE_LENGTH = 50
+
+# 섹션 수가 이보다 많으면 짧은 섹션을 병합하고, 적으면 긴 섹션을 분할
+MAX_SECTIONS_BEFORE_MERGE = 20
+MIN_SECTIONS_BEFORE_SPLIT = 6
+MERGE_CONTENT_LENGTH = 100
+
+# 긴 섹션을 나눌 때의 문단 구분 (공백만 있는 줄을 포함해 빈 줄이 하나 이상)
+_PARAGRAPH_BREAK_PATTERN = re.compile(r'\n[ \t]*\n\s*')
+
+# Google Docs 문단 스타일(namedStyleType)별 제목 수준
+HEADING_STYLES = {
+    'TITLE': 0,
+    'HEADING_1': 1,
+    'HEADING_2': 2,
+    'HEADING_3': 3,
+    'HEADING_4': 4,
+    'HEADING_5': 5,
+    'HEADING_6': 6,
+}
+
+
+def is_title_line(stripped):
+    """앞뒤 공백을 제거한 줄이 섹션 제목인지 판단"""
+    if TITLE_PATTERN.match(stripped):
+        return True
+    # 대문자로만 이루어진 짧은 줄, 콜론으로 끝나는 짧은 줄 (예: "서론:", "결론:" 등)
+    return len(stripped) < SHORT_TITLE_LENGTH and (stripped.endswith(':') or stripped.isupper())
+
+
+def iter_lines(text):
+    """줄 목록을 만들지 않고 텍스트의 (줄 번호, 시작 위치, 끝 위치)를 생성"""
+    line = 0
+    start = 0
+    while True:
+        end = text.find('\n', start)
+        if end == -1:
+            yield line, start, len(text)
+            return
+        yield line, start, end
+        line += 1
+        start = end + 1
+
+
+def analyze_document_structure(full_text):
+    """문서의 구조를 분석하여 주요 섹션을 식별
+
+    섹션 내용은 연속된 줄이므로 줄을 모았다가 다시 잇지 않고 전체 텍스트에서 한 번에 잘라 냄
+    """
+    sections = []
+
+    title = '서론'
+    content_start = None
+    content_end = 0
+    start_line = 0
+    last_line = 0
+
+    for i, line_start, line_end in iter_lines(full_text):
+        last_line = i
+        stripped = full_text[line_start:line_end].strip()
+
+        # 빈 줄은 섹션 내용이 시작된 뒤에만 포함
+        if not stripped:
+            if content_start is not None:
+                content_end = line_end
+            continue
+
+        if is_title_line(stripped):
+            # 이전 섹션 저장 후 새 섹션 시작
+            if content_start is not None:
+                sections.append({
+                    'title': title,
+                    'content': full_text[content_start:content_end],
+                    'start_line': start_line,
+                    'end_line': i - 1
+                })
+            title = stripped
+            content_start = None
+            start_line = i
+        else:
+            if content_start is None:
+                content_start = line_start
+            content_end = line_end
+
+    # 마지막 섹션 저장
+    if content_start is not None:
+        sections.append({
+            'title': title,
+            'content': full_text[content_start:content_end],
+            'start_line': start_line,
+            'end_line': last_line
+        })
+
+    if len(sections) > MAX_SECTIONS_BEFORE_MERGE:
+        sections = _merge_short_sections(sections)
+
+    if len(sections) < MIN_SECTIONS_BEFORE_SPLIT:
+        sections = _split_long_sections(sections)
+
+    return sections
+
+
+def build_sections_from_headings(content_with_positions):
+    """Docs 제목 스타일(TITLE, HEADING_1~6)이 적용된 문단을 기준으로 섹션을 구성
+
+    get_document_content가 기록한 문단별 스타일과 시작 줄 번호만 사용하므로 텍스트를 다시 훑지 않음.
+    제목 스타일 문단이 하나도 없으면 None을 반환
+    """
+    styles = paragraph_values(content_with_positions, 'style')
+    if not any(style in HEADING_STYLES for style in styles):
+        return None
+
+    sections = []
+    title = '서론'
+    level = None
+    content = []
+    start_line = 0
+
+    texts = paragraph_values(content_with_positions, 'text')
+    lines = paragraph_values(content_with_positions, 'line')
+    for style, text, line in zip(styles, texts, lines):
+        heading_level = HEADING_STYLES.get(style)
+
+        if heading_level is None:
+            content.append(text)
+            continue
+
+        # 이전 섹션 저장 후 새 섹션 시작
+        if content:
+            sections.append({
+                'title': title,
+                'content': '\n'.join(content),
+                'start_line': start_line,
+                'end_line': line - 1,
+                'level': level
+            })
+        title = text.strip()
+        level = heading_level
+        content = []
+        start_line = line
+
+    # 마지막 섹션 저장
+    if content:
+        sections.append({
+            'title': title,
+            'content': '\n'.join(content),
+            'start_line': start_line,
+            'end_line': lines[-1] + texts[-1].count('\n'),
+            'level': level
+        })
+
+    if len(sections) > MAX_SECTIONS_BEFORE_MERGE:
+        sections = _merge_short_sections(sections)
+
+    if len(sections) < MIN_SECTIONS_BEFORE_SPLIT:
+        sections = _split_long_sections(sections)
+
+    return sections
+
+
+def analyze_document_sections(content_with_positions, full_text, use_heading_styles=True):
+    """제목 스타일이 있는 문서는 스타일로, 스타일이 없는 문서는 텍스트 패턴으로 섹션 식별"""
+    if use_heading_styles:
+        sections = build_sections_from_headings(content_with_positions)
+        if sections is not None:
+            return sections
+    return analyze_document_structure(full_text)
+
+
+def _merge_short_sections(sections):
+    """매우 짧은 섹션을 앞 섹션에 병합 (내용은 리스트에 모았다가 한 번에 결합)"""
+    merged_sections = []
+    current = sections[0]
+    parts = [current['content']]
+
+    for section in sections[1:]:
+        if len(section['content'].strip()) < MERGE_CONTENT_LENGTH:
+            parts.append(section['content'])
+            current['end_line'] = section['end_line']
+        else:
+            current['content'] = '\n\n'.join(parts)
+            merged_sections.append(current)
+            current = section
+            parts = [current['content']]
+
+    current['content'] = '\n\n'.join(parts)
+    merged_sections.append(current)
+    return merged_sections
+
+
+def _split_long_sections(sections):
+    """문단이 충분히 많은 섹션을 전반부/후반부로 분할
+
+    문단 구분은 빈 줄 수와 관계없이 찾아 원래 내용에서 잘라 내므로, 빈 줄 모양이 달라도 같은 위치에서 나뉨
+    """
+    new_sections = []
+
+    for section in sections:
+        content = section['content']
+        # 내용 앞뒤의 빈 줄은 문단 구분으로 세지 않음
+        separators = [match for match in _PARAGRAPH_BREAK_PATTERN.finditer(content)
+                      if 0 < match.start() and match.end() < len(content)]
+
+        if len(separators) < 3:
+            new_sections.append(section)
+            continue
+
+        middle = separators[(len(separators) + 1) // 2 - 1]
+        second_half = content[middle.end():]
+        # 섹션 내용은 end_line에서 끝나므로 후반부가 시작하는 실제 줄 번호를 역산
+        split_line = max(section['start_line'], section['end_line'] - second_half.count('\n'))
+        # 제목 수준 등 나머지 속성은 그대로 유지
+        new_sections.append(dict(
+            section,
+            title=section['title'] + ' (전반부)',
+            content=content[:middle.start()],
+            end_line=split_line - 1
+        ))
+        new_sections.append(dict(
+            section,
+            title=section['title'] + ' (후반부)',
+            content=second_half,
+            start_line=split_line
+        ))
+
+    return new_sections
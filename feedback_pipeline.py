@@ -0,0 +1,667 @@
+import hashlib
+import json
+import queue
+import re
+import threading
+import time
+
+from rate_limit import run_in_parallel
+from document_structure import analyze_document_sections
+from google_docs import get_document_content, insert_feedbacks_to_doc, section_last_paragraph
+from instrumentation import FIRST_TOKEN_SPAN, trace_span
+from review_state import ANALYSIS_REUSE_THRESHOLD, diff_sections, section_fingerprint, stable_text
+from section_selection import select_within_budget
+from template_index import strip_template_paragraphs
+from token_budget import chunk_sections, estimate_tokens, truncate_to_tokens
+
+# 문서 타입과 피드백 초점 옵션
+DOCUMENT_TYPES = {
+    "연구 보고서": "학술적 연구 보고서로서 논리성, 근거의 타당성, 연구 방법론을 중점적으로",
+    "에세이": "에세이로서 주장의 명확성, 논거의 설득력, 문장의 흐름을 중점적으로",
+    "제안서": "비즈니스 제안서로서 목표의 명확성, 실행 가능성, 예상 효과를 중점적으로",
+    "기술 문서": "기술 문서로서 정확성, 명확성, 구조의 체계성을 중점적으로",
+    "창작물": "창작물로서 창의성, 표현력, 독자 몰입도를 중점적으로"
+}
+
+FEEDBACK_FOCUS = {
+    "종합적 피드백": "전반적인 관점에서 균형잡힌",
+    "논리성 및 구조": "논리적 흐름과 구조적 완성도 위주의",
+    "문법 및 표현": "문법적 정확성과 표현의 적절성 위주의",
+    "내용의 깊이": "주제의 심층적 탐구와 분석의 깊이 위주의",
+    "창의성 및 독창성": "새로운 관점과 창의적 접근 위주의",
+    "실용성 및 적용성": "실제 적용 가능성과 실용적 가치 위주의"
+}
+
+# AI 역할 지시 (시스템 프롬프트)
+ANALYSIS_SYSTEM_PROMPT = "당신은 전문적인 문서 분석가입니다. 구체적이고 건설적인 피드백을 제공합니다."
+
+SECTION_SYSTEM_PROMPT = "당신은 전문적인 문서 첨삭 전문가입니다. 긍정적인 측면과 개선할 점을 균형 있게 제공하되, 항상 격려하며 건설적인 피드백을 제공합니다. 모든 피드백은 한국어로 작성하세요."
+
+PACKED_SYSTEM_PROMPT = SECTION_SYSTEM_PROMPT + " 응답은 설명 없이 JSON 배열로만 작성하세요."
+
+# 입력 토큰 예산 (전체 분석 입력이 예산을 넘으면 부분 요약 후 분석)
+ANALYSIS_INPUT_TOKEN_BUDGET = 12000
+ANALYSIS_CHUNK_TOKEN_BUDGET = 6000
+SECTION_INPUT_TOKEN_BUDGET = 1000
+
+# 섹션 피드백 하나의 최대 출력 토큰
+SECTION_FEEDBACK_MAX_TOKENS = 400
+
+# 여러 섹션을 한 번에 요청할 때 요청 하나의 입력 토큰 예산과 최대 섹션 수
+PACKED_INPUT_TOKEN_BUDGET = 3000
+MAX_SECTIONS_PER_REQUEST = 6
+
+# 작지만 의미 있는 섹션 기준(글자 수)과 예산을 정하지 않았을 때 한 번에 첨삭할 최대 섹션 수
+MIN_SECTION_LENGTH = 30
+MAX_FEEDBACK_SECTIONS = 12
+DEFAULT_SECTION_BUDGET = {'calls': MAX_FEEDBACK_SECTIONS}
+
+ANALYSIS_FAILED_MESSAGE = "분석을 수행할 수 없습니다."
+
+
+def select_review_sections(sections, previous_review):
+    """이전 검토 기록과 비교하여 (다시 검토할 섹션, 변경 비율) 반환"""
+    if not previous_review:
+        return sections, 1.0
+    # 리비전이 같아도 이전 실행에서 첨삭하지 못한 섹션은 검토 기록에 없으므로 다시 검토 대상이 됨
+    return diff_sections(sections, previous_review)
+
+
+def reusable_analysis(previous_review, change_ratio):
+    """변경이 적으면 이전 전체 분석을 반환 (재사용할 수 없으면 None)"""
+    if previous_review and previous_review['full_analysis'] and change_ratio < ANALYSIS_REUSE_THRESHOLD:
+        return previous_review['full_analysis']
+    return None
+
+
+def analysis_fingerprint(full_text, doc_type, feedback_focus, custom_instructions):
+    """실행 기록에서 전체 분석을 찾기 위한 키 (문서 내용과 분석 설정이 같으면 같은 값)
+
+    앱이 써 넣은 첨삭과 빈 줄 차이는 무시하므로, 첨삭을 일부 삽입하다 중단된 문서도 같은 키가 됨
+    """
+    payload = json.dumps([stable_text(full_text), doc_type, feedback_focus, custom_instructions], ensure_ascii=False)
+    return 'analysis:' + hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def section_request_tokens(section):
+    """섹션 피드백 요청 하나가 쓰는 토큰 추정치 (입력 + 최대 출력)"""
+    return (estimate_tokens(SECTION_SYSTEM_PROMPT) + estimate_tokens(build_section_prompt(section))
+            + SECTION_FEEDBACK_MAX_TOKENS)
+
+
+def select_sections_to_feedback(review_sections, budget=None, max_workers=4):
+    """(의미 있는 섹션 전체, 이번에 첨삭할 섹션, 선택한 섹션의 예상 비용) 반환
+
+    문서 앞에서부터 자르지 않고 길이, 문장 길이 편차, 단어 반복, 제목 중요도로 매긴 점수가 비용 대비 높은
+    섹션을 예산(budget: 요청 수, 토큰, 예상 시간) 안에서 고름. 예산이 없으면 최대 12개 요청
+    """
+    # 작지만 의미 있는 섹션들을 필터링 (기준을 30자로 더 낮춤)
+    meaningful_sections = [s for s in review_sections if len(s['content'].strip()) > MIN_SECTION_LENGTH]
+
+    sections_to_feedback, spent = select_within_budget(
+        meaningful_sections, budget or DEFAULT_SECTION_BUDGET, section_request_tokens,
+        SECTION_FEEDBACK_MAX_TOKENS, max_workers
+    )
+    return meaningful_sections, sections_to_feedback, spent
+
+
+def prepare_analysis_input(llm_client, sections, full_text, doc_type, max_workers=4, on_progress=None):
+    """전체 분석에 넣을 (문서 소개 문장, 문서 내용) 반환
+
+    문서가 토큰 예산보다 길면 섹션 경계로 나눈 부분을 병렬로 요약(map)하여 요약문을 대신 사용.
+    on_progress(완료 수, 전체 수)는 호출한 스레드에서 실행됨
+    """
+    if estimate_tokens(full_text) <= ANALYSIS_INPUT_TOKEN_BUDGET:
+        return f"다음은 {doc_type}의 전체 내용입니다.", full_text
+
+    chunks = chunk_sections(sections, ANALYSIS_CHUNK_TOKEN_BUDGET)
+    chunk_summaries = [None] * len(chunks)
+
+    def summarize_chunk(chunk):
+        """문서 일부에 대한 요약 생성 (작업 스레드에서 실행)"""
+        summary_prompt = f"""
+        다음은 {doc_type}의 일부입니다. [대괄호] 안은 섹션 제목입니다.
+
+        {chunk}
+
+        이 부분의 핵심 내용, 강점, 개선이 필요한 부분을 섹션 제목과 함께 10문장 이내로 요약해주세요.
+        """
+        return llm_client.complete(ANALYSIS_SYSTEM_PROMPT, summary_prompt,
+                                   max_tokens=600, temperature=0.3)
+
+    summarized = 0
+    for idx, summary, error in run_in_parallel(summarize_chunk, chunks, max_workers=max_workers):
+        if error is not None:
+            raise error
+        chunk_summaries[idx] = summary
+        summarized += 1
+        if on_progress is not None:
+            on_progress(summarized, len(chunks))
+
+    document_text = '\n\n'.join(
+        f"[부분 {i + 1}/{len(chunks)}]\n{summary}" for i, summary in enumerate(chunk_summaries)
+    )
+    return f"다음은 {doc_type}을(를) {len(chunks)}개 부분으로 나누어 순서대로 요약한 내용입니다.", document_text
+
+
+def build_analysis_prompt(doc_type, feedback_focus, custom_instructions, document_intro, document_text):
+    """전체 문서 분석 요청 프롬프트"""
+    return f"""
+    {document_intro}
+    {DOCUMENT_TYPES[doc_type]} 평가해주세요.
+    {FEEDBACK_FOCUS[feedback_focus]} 피드백을 제공해주세요.
+
+    {f"추가 지시사항: {custom_instructions}" if custom_instructions else ""}
+
+    문서 내용:
+    {document_text}
+
+    위 문서를 분석하여 다음과 같은 형식으로 피드백을 제공해주세요:
+
+    1. 전체적인 평가 (2-3문장)
+    2. 주요 강점 3가지
+    3. 개선이 필요한 부분 3-5가지 (각각 해당 섹션명과 함께)
+    4. 추가 제안사항
+
+    각 항목에 대해 구체적이고 건설적인 피드백을 한국어로 작성해주세요.
+    """
+
+
+class BackgroundAnalysis:
+    """전체 문서 분석을 별도 스레드에서 실행하는 작업
+
+    섹션 피드백은 전체 분석 결과와 무관하므로 두 작업을 동시에 진행함.
+    작업 스레드는 화면을 직접 그리지 않고 ('progress', (완료 수, 전체 수)), ('delta', 응답 조각),
+    ('done', None) 이벤트를 큐에 넣으며, 호출한 스레드가 poll()로 꺼내 표시함
+    """
+
+    def __init__(self, llm_client, sections, full_text, doc_type, feedback_focus, custom_instructions='',
+                 max_workers=4, stream=False):
+        self.llm_client = llm_client
+        self.sections = sections
+        self.full_text = full_text
+        self.doc_type = doc_type
+        self.feedback_focus = feedback_focus
+        self.custom_instructions = custom_instructions
+        self.max_workers = max_workers
+        self.stream = stream
+        self.result = None
+        self.error = None
+        self.time_to_first_token = None
+        self.events = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='document-analysis', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        try:
+            with trace_span(self.llm_client.trace, 'stage.analysis'):
+                # 문서가 길면 부분 요약 후 분석
+                document_intro, document_text = prepare_analysis_input(
+                    self.llm_client, self.sections, self.full_text, self.doc_type, self.max_workers,
+                    on_progress=lambda done, total: self.events.put(('progress', (done, total)))
+                )
+                analysis_prompt = build_analysis_prompt(self.doc_type, self.feedback_focus,
+                                                        self.custom_instructions, document_intro, document_text)
+
+                if not self.stream:
+                    self.result = self.llm_client.complete(ANALYSIS_SYSTEM_PROMPT, analysis_prompt,
+                                                           max_tokens=2000, temperature=0.7)
+                    return
+
+                chunks = []
+                request_started = time.perf_counter()
+                for chunk in self.llm_client.stream(ANALYSIS_SYSTEM_PROMPT, analysis_prompt,
+                                                    max_tokens=2000, temperature=0.7):
+                    if self.time_to_first_token is None:
+                        self.time_to_first_token = time.perf_counter() - request_started
+                        # 다른 단계 시간과 함께 볼 수 있도록 첫 응답까지의 시간도 구간으로 기록
+                        if self.llm_client.trace is not None:
+                            self.llm_client.trace.record(FIRST_TOKEN_SPAN, self.time_to_first_token,
+                                                         started=request_started)
+                    chunks.append(chunk)
+                    self.events.put(('delta', chunk))
+                self.result = ''.join(chunks)
+        except Exception as e:
+            self.error = e
+        finally:
+            self.events.put(('done', None))
+
+    def poll(self, timeout=None):
+        """쌓인 이벤트를 모두 꺼내 반환 (timeout을 주면 첫 이벤트를 그 시간까지 기다림)"""
+        events = []
+        try:
+            events.append(self.events.get(timeout=timeout) if timeout else self.events.get_nowait())
+            while True:
+                events.append(self.events.get_nowait())
+        except queue.Empty:
+            pass
+        return events
+
+    def done(self):
+        return not self._thread.is_alive()
+
+    def join(self):
+        """분석이 끝날 때까지 기다린 뒤 결과를 반환 (실패했으면 예외를 다시 발생)"""
+        self._thread.join()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+def section_excerpt(section):
+    """프롬프트에 넣을 섹션 내용 (토큰 예산을 넘으면 잘라서 말줄임표를 붙임)"""
+    section_content = truncate_to_tokens(section['content'], SECTION_INPUT_TOKEN_BUDGET)
+    if len(section_content) < len(section['content']):
+        section_content += "..."
+    return section_content
+
+
+def build_section_prompt(section):
+    """섹션 하나에 대한 피드백 요청 프롬프트 (입력은 토큰 예산 안에서 자름)"""
+    section_content = section_excerpt(section)
+
+    return f"""
+    다음은 '{section['title']}' 섹션의 내용입니다:
+
+    {section_content}
+
+    이 섹션에 대해 긍정적인 측면과 개선할 점을 모두 포함하여 피드백을 제공해주세요.
+    1) 먼저 잘 쓴 부분을 칭찬하고
+    2) 개선할 점이 있다면 구체적인 예시나 방향을 제시해주세요.
+    전체 3-4문장으로 작성하세요.
+    """
+
+
+def pack_sections(sections, budget=PACKED_INPUT_TOKEN_BUDGET, max_sections=MAX_SECTIONS_PER_REQUEST):
+    """섹션을 순서대로 입력 토큰 예산과 최대 섹션 수에 맞춰 묶은 인덱스 목록들을 반환"""
+    groups = []
+    current = []
+    current_tokens = 0
+
+    for idx, section in enumerate(sections):
+        tokens = estimate_tokens(section['title']) + min(estimate_tokens(section['content']),
+                                                         SECTION_INPUT_TOKEN_BUDGET)
+        if current and (current_tokens + tokens > budget or len(current) >= max_sections):
+            groups.append(current)
+            current, current_tokens = [], 0
+        current.append(idx)
+        current_tokens += tokens
+
+    if current:
+        groups.append(current)
+    return groups
+
+
+def build_packed_prompt(sections):
+    """여러 섹션을 한 번에 첨삭하는 프롬프트 (섹션 번호는 1부터)"""
+    section_blocks = '\n\n'.join(
+        f"### 섹션 {n}: {section['title']}\n{section_excerpt(section)}"
+        for n, section in enumerate(sections, start=1)
+    )
+
+    return f"""
+    다음은 한 문서의 {len(sections)}개 섹션입니다:
+
+    {section_blocks}
+
+    각 섹션에 대해 긍정적인 측면과 개선할 점을 모두 포함하여 피드백을 제공해주세요.
+    1) 먼저 잘 쓴 부분을 칭찬하고
+    2) 개선할 점이 있다면 구체적인 예시나 방향을 제시해주세요.
+    섹션마다 3-4문장으로 작성하세요.
+
+    응답 형식 (JSON 배열만 출력):
+    [{{"section_id": 1, "feedback": "..."}}, {{"section_id": 2, "feedback": "..."}}]
+    """
+
+
+def parse_packed_feedback(text, section_ids):
+    """JSON 배열 응답에서 {섹션 번호: 피드백}을 추출 (형식이 맞지 않는 항목은 제외)"""
+    match = re.search(r'\[.*\]', text or '', re.DOTALL)
+    if not match:
+        return {}
+    try:
+        items = json.loads(match.group(0))
+    except ValueError:
+        return {}
+    if not isinstance(items, list):
+        return {}
+
+    feedbacks = {}
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        try:
+            section_id = int(item.get('section_id'))
+        except (TypeError, ValueError):
+            continue
+        feedback = item.get('feedback')
+        if section_id in section_ids and isinstance(feedback, str) and feedback.strip():
+            feedbacks[section_id] = feedback.strip()
+    return feedbacks
+
+
+def generate_section_feedbacks(llm_client, sections, max_workers=4, on_result=None, on_tick=None, packed=False):
+    """모든 섹션 피드백을 병렬로 생성하여 섹션 순서대로 반환 (실패한 섹션은 None)
+
+    packed이면 여러 섹션을 한 요청에 묶고, 응답에서 찾지 못한 섹션만 개별 요청으로 다시 생성.
+    on_result(인덱스, 피드백, 오류)는 완료되는 순서대로, on_tick()은 기다리는 동안 주기적으로
+    호출한 스레드에서 실행됨
+    """
+    def request_section_feedback(section):
+        """섹션 하나에 대한 피드백 생성 (작업 스레드에서 실행)"""
+        return llm_client.complete(SECTION_SYSTEM_PROMPT, build_section_prompt(section),
+                                   max_tokens=SECTION_FEEDBACK_MAX_TOKENS, temperature=0.7)
+
+    section_feedbacks = [None] * len(sections)
+
+    if packed:
+        def request_packed_feedback(group):
+            """섹션 묶음에 대한 [(인덱스, 피드백, 오류)] 생성 (작업 스레드에서 실행)"""
+            group_sections = [sections[idx] for idx in group]
+            response = llm_client.complete(PACKED_SYSTEM_PROMPT, build_packed_prompt(group_sections),
+                                           max_tokens=SECTION_FEEDBACK_MAX_TOKENS * len(group), temperature=0.7)
+            feedbacks = parse_packed_feedback(response, range(1, len(group) + 1))
+
+            results = []
+            for n, idx in enumerate(group, start=1):
+                if n in feedbacks:
+                    results.append((idx, feedbacks[n], None))
+                    continue
+                try:
+                    results.append((idx, request_section_feedback(sections[idx]), None))
+                except Exception as e:
+                    results.append((idx, None, e))
+            return results
+
+        groups = pack_sections(sections)
+        for group_idx, results, error in run_in_parallel(request_packed_feedback, groups,
+                                                         max_workers=max_workers, on_tick=on_tick):
+            if error is not None:
+                results = [(idx, None, error) for idx in groups[group_idx]]
+            for idx, section_feedback, section_error in results:
+                if section_error is None:
+                    section_feedbacks[idx] = section_feedback
+                if on_result is not None:
+                    on_result(idx, section_feedback, section_error)
+        return section_feedbacks
+
+    for idx, section_feedback, error in run_in_parallel(request_section_feedback, sections,
+                                                        max_workers=max_workers, on_tick=on_tick):
+        if error is None:
+            section_feedbacks[idx] = section_feedback
+        if on_result is not None:
+            on_result(idx, section_feedback, error)
+    return section_feedbacks
+
+
+def has_inserted_feedback(section, content_with_positions, line_index):
+    """섹션 바로 뒤에 앱이 삽입한 첨삭이 문서에 이미 있는지 확인
+
+    응답을 받지 못해 실행 기록에 남지 않은 batchUpdate도 문서에는 적용되었을 수 있으므로,
+    이어서 실행할 때는 읽어 온 문서의 첨삭 위치로도 삽입 여부를 판단함
+    """
+    para = section_last_paragraph(section, content_with_positions, line_index)
+    return para is not None and para.get('feedback') is not None
+
+
+def plan_insertions(sections_to_feedback, section_feedbacks, content_with_positions, line_index,
+                    replace_existing=False):
+    """섹션 끝 위치에 삽입할 첨삭 목록과 삽입 위치를 찾은 섹션 id 집합 반환
+
+    replace_existing이면 섹션 뒤에 이전 첨삭이 있을 때 아래에 쌓지 않고 그 자리에서 교체
+    """
+    feedback_insertions = []
+    placed_section_ids = set()
+
+    for section, section_feedback in zip(sections_to_feedback, section_feedbacks):
+        if section_feedback is None:
+            continue
+
+        # 섹션이 끝나는 문단을 한 번만 찾아 삽입 위치, 탭, 이전 첨삭을 함께 읽음
+        para = section_last_paragraph(section, content_with_positions, line_index)
+        if para is not None:
+            insertion = {
+                # 문단의 줄바꿈 앞에 삽입해야 문서 마지막 문단에서도 유효한 인덱스가 됨
+                'index': para['end'] - 1,
+                'feedback': section_feedback,
+                'section_title': section['title'],
+                'fingerprint': section_fingerprint(section),
+                # 여러 탭이 있는 문서는 섹션이 끝나는 문단의 탭에 삽입
+                'tab_id': para.get('tab')
+            }
+            # 표로 끝나는 섹션은 마지막 셀이 아니라 표 바로 뒤에 삽입
+            table_end = para.get('table_end')
+            if table_end is not None:
+                insertion.update(index=table_end, after_table=True)
+            existing = para.get('feedback') if replace_existing else None
+            if existing is not None:
+                insertion.update(index=existing['start'], replace=existing)
+            feedback_insertions.append(insertion)
+            placed_section_ids.add(id(section))
+
+    return feedback_insertions, placed_section_ids
+
+
+def reviewed_sections_after_write(sections, meaningful_sections, placed_section_ids):
+    """검토 기록에 남길 섹션 (첨삭하지 못한 섹션은 빼서 다음 실행에서 다시 검토)"""
+    pending_ids = {id(s) for s in meaningful_sections if id(s) not in placed_section_ids}
+    return [s for s in sections if id(s) not in pending_ids]
+
+
+def run_document_feedback(docs_service, llm_client, document_id, doc_type, feedback_focus,
+                          custom_instructions='', use_heading_styles=True, review_store=None,
+                          max_workers=4, trace=None, packed=False, on_event=None, stream_analysis=False,
+                          journal=None, replace_feedback=False, template=None, docs_admit=None, budget=None):
+    """문서 하나에 대해 읽기 → 분석 → 섹션 피드백 → 삽입까지 UI 없이 실행하고 결과 요약을 반환
+
+    trace(RunTrace)를 넘기면 단계별 소요 시간과 API 호출, 토큰 사용량이 기록됨.
+    journal(RunJournal)을 넘기면 생성한 피드백과 적용한 삽입을 기록하고, 중단된 이전 실행이 있으면
+    이미 생성한 피드백은 재사용하고 이미 삽입한 섹션은 건너뜀.
+    replace_feedback이면 섹션 뒤의 이전 첨삭을 새 첨삭으로 교체함.
+    template(TemplateIndex)을 넘기면 템플릿과 같은 본문 문단은 분석과 섹션 선택에서 제외함.
+    budget({'calls', 'tokens', 'seconds'} 중 하나 이상)을 넘기면 그 예산 안에서 우선순위가 높은 섹션을 골라 첨삭함.
+    docs_admit은 Docs API 호출마다 서비스 계정 할당량의 공정 대기열을 통과시키는 함수 (FairScheduler.for_user).
+    on_event(종류, 값)는 진행 상황을 화면에 보여주기 위한 콜백으로 호출한 스레드에서 실행됨:
+    ('loaded', 문서 정보 dict), ('progress', (진행률, 메시지)), ('section', 섹션 결과 dict),
+    ('analysis_progress', (완료 수, 전체 수)), ('analysis_delta', 응답 조각 - stream_analysis일 때)
+    """
+    started = time.perf_counter()
+    llm_client = llm_client.with_trace(trace)
+    errors = []
+    result = {
+        'document_id': document_id,
+        'title': None,
+        'status': 'error',
+        'sections': 0,
+        'reviewed_sections': 0,
+        'deferred_sections': 0,
+        'feedback_added': 0,
+        'elapsed': 0.0,
+        'error': None,
+        'errors': errors,
+        'reused_feedback': 0,
+        'already_inserted': 0,
+        'feedback_replaced': 0,
+        'template_paragraphs': 0
+    }
+
+    def emit(kind, value):
+        if on_event is not None:
+            on_event(kind, value)
+
+    try:
+        emit('progress', (0.0, "📖 문서를 읽어오는 중..."))
+        title, content_with_positions, full_text, revision_id, line_index = get_document_content(
+            docs_service, document_id, on_error=errors.append, trace=trace, admit=docs_admit
+        )
+        if not content_with_positions or not full_text:
+            raise RuntimeError(errors[-1] if errors else "문서 내용을 가져올 수 없습니다.")
+        result['title'] = title
+
+        # 템플릿에서 그대로 가져온 안내문, 문항 설명 등은 빼고 작성자가 쓴 내용만 분석
+        if template is not None:
+            with trace_span(trace, 'template.strip') as span:
+                content_with_positions, full_text, line_index, result['template_paragraphs'] = \
+                    strip_template_paragraphs(content_with_positions, template)
+                span['removed'] = result['template_paragraphs']
+
+        with trace_span(trace, 'structure.analyze'):
+            sections = analyze_document_sections(content_with_positions, full_text, use_heading_styles)
+        previous_review = review_store.load(document_id) if review_store is not None else None
+        review_sections, change_ratio = select_review_sections(sections, previous_review)
+
+        # 중단된 이전 실행에서 이미 삽입한 섹션은 건너뛰고, 생성해 둔 피드백과 분석은 다시 요청하지 않음
+        journal_run = journal.begin(document_id, revision_id) if journal is not None else None
+        analysis_key = analysis_fingerprint(full_text, doc_type, feedback_focus, custom_instructions)
+
+        # 전체 분석은 섹션 피드백 생성, 삽입과 동시에 진행
+        full_analysis = reusable_analysis(previous_review, change_ratio)
+        if full_analysis is None and journal_run is not None:
+            full_analysis = journal_run.feedbacks.get(analysis_key)
+        analysis_task = None
+        if full_analysis is None:
+            analysis_task = BackgroundAnalysis(llm_client, sections, full_text, doc_type, feedback_focus,
+                                               custom_instructions, max_workers, stream=stream_analysis).start()
+
+        with trace_span(trace, 'structure.select') as span:
+            meaningful_sections, sections_to_feedback, spent = select_sections_to_feedback(review_sections, budget,
+                                                                                           max_workers)
+            span.update(selected=len(sections_to_feedback), candidates=len(meaningful_sections))
+        result.update({
+            'sections': len(sections),
+            'reviewed_sections': len(sections_to_feedback),
+            'deferred_sections': len(meaningful_sections) - len(sections_to_feedback),
+            'estimated_tokens': spent['tokens'],
+            'incremental': previous_review is not None,
+            'changed_sections': len(review_sections),
+            'change_ratio': change_ratio
+        })
+        emit('loaded', {
+            'title': title,
+            'preview': full_text[:1000],
+            'sections': len(sections),
+            'reviewed_sections': len(sections_to_feedback),
+            'deferred_sections': len(meaningful_sections) - len(sections_to_feedback),
+            'incremental': previous_review is not None,
+            'changed_sections': len(review_sections),
+            'change_ratio': change_ratio,
+            'template_paragraphs': result['template_paragraphs']
+        })
+
+        def forward_analysis_events(timeout=None):
+            """백그라운드 분석의 이벤트를 on_event로 전달"""
+            if analysis_task is None or on_event is None:
+                return
+            for kind, value in analysis_task.poll(timeout):
+                if kind != 'done':
+                    emit(f'analysis_{kind}', value)
+
+        fingerprints = {id(s): section_fingerprint(s) for s in sections_to_feedback}
+        inserted_section_ids = set()
+        feedback_by_section = {}
+        if journal_run is not None:
+            for section in sections_to_feedback:
+                fingerprint = fingerprints[id(section)]
+                # 이전 실행이 피드백을 만든 섹션 뒤에 첨삭이 이미 있으면, 응답을 받지 못해 기록되지 않은 삽입으로 봄
+                if fingerprint in journal_run.applied or (
+                        fingerprint in journal_run.feedbacks and
+                        has_inserted_feedback(section, content_with_positions, line_index)):
+                    inserted_section_ids.add(id(section))
+                elif fingerprint in journal_run.feedbacks:
+                    feedback_by_section[id(section)] = journal_run.feedbacks[fingerprint]
+        sections_to_generate = [s for s in sections_to_feedback
+                                if id(s) not in inserted_section_ids and id(s) not in feedback_by_section]
+        result['reused_feedback'] = len(feedback_by_section)
+        result['already_inserted'] = len(inserted_section_ids)
+
+        completed = []
+        section_results = []
+        for section in sections_to_feedback:
+            if id(section) in feedback_by_section:
+                section_results.append({'title': section['title'], 'feedback': feedback_by_section[id(section)],
+                                        'error': None})
+                emit('section', section_results[-1])
+
+        def record_result(idx, section_feedback, error):
+            section = sections_to_generate[idx]
+            completed.append(idx)
+            if error is not None:
+                errors.append(f"섹션 '{section['title'][:30]}...' 분석 중 오류: {str(error)}")
+            elif journal_run is not None:
+                journal_run.record_feedback(fingerprints[id(section)], section_feedback)
+            section_results.append({'title': section['title'], 'feedback': section_feedback,
+                                    'error': str(error) if error is not None else None})
+            emit('section', section_results[-1])
+            emit('progress', (0.8 * len(completed) / len(sections_to_generate),
+                              f"🤖 '{section['title'][:30]}...' 섹션 분석 완료 "
+                              f"({len(completed)}/{len(sections_to_generate)})"))
+
+        emit('progress', (0.0, f"🤖 {len(sections_to_generate)}개 섹션 분석 중..."))
+        with trace_span(trace, 'stage.sections', sections=len(sections_to_generate)):
+            section_feedbacks = generate_section_feedbacks(llm_client, sections_to_generate,
+                                                           max_workers, on_result=record_result,
+                                                           on_tick=forward_analysis_events, packed=packed)
+        result['section_results'] = section_results
+        feedback_by_section.update(
+            (id(section), section_feedback) for section, section_feedback in zip(sections_to_generate, section_feedbacks)
+        )
+        pending_sections = [s for s in sections_to_feedback if id(s) not in inserted_section_ids]
+        feedback_insertions, placed_section_ids = plan_insertions(
+            pending_sections, [feedback_by_section.get(id(s)) for s in pending_sections],
+            content_with_positions, line_index, replace_existing=replace_feedback
+        )
+        placed_section_ids |= inserted_section_ids
+        result['feedback_replaced'] = sum(1 for insertion in feedback_insertions if insertion.get('replace'))
+
+        def record_batch(insertions, applied_revision_id):
+            if journal_run is not None:
+                journal_run.record_applied([insertion['fingerprint'] for insertion in insertions],
+                                           applied_revision_id)
+
+        # 섹션 피드백이 모두 준비되면 전체 분석을 기다리지 않고 바로 삽입
+        emit('progress', (0.8, f"🖍️ {len(feedback_insertions)}개 섹션에 첨삭 내용 삽입 중..."))
+        with trace_span(trace, 'stage.write_back', insertions=len(feedback_insertions)):
+            feedback_added, new_revision_id = insert_feedbacks_to_doc(
+                docs_service, document_id, feedback_insertions, revision_id, on_error=errors.append,
+                trace=trace, on_batch=record_batch, admit=docs_admit
+            )
+        result['feedback_added'] = feedback_added
+
+        analysis_ok = True
+        if analysis_task is not None:
+            if not analysis_task.done():
+                emit('progress', (0.9, "🤖 전체 문서 분석을 마무리하는 중..."))
+            while not analysis_task.done():
+                forward_analysis_events(timeout=0.1)
+            forward_analysis_events()
+            try:
+                full_analysis = analysis_task.join()
+                if journal_run is not None:
+                    journal_run.record_feedback(analysis_key, full_analysis)
+            except Exception as e:
+                errors.append(f"문서 분석 중 오류 발생: {str(e)}")
+                full_analysis = ANALYSIS_FAILED_MESSAGE
+                analysis_ok = False
+            result['time_to_first_token'] = analysis_task.time_to_first_token
+        result['full_analysis'] = full_analysis
+
+        if review_store is not None and new_revision_id and feedback_added == len(feedback_insertions):
+            review_store.save(document_id, new_revision_id,
+                              reviewed_sections_after_write(sections, meaningful_sections, placed_section_ids),
+                              full_analysis if analysis_ok else None)
+
+        if feedback_added == len(feedback_insertions):
+            result['status'] = 'ok' if sections_to_feedback else 'unchanged'
+            # 섹션 피드백이 모두 생성되고 삽입까지 끝났을 때만 실행 기록을 닫음
+            if journal_run is not None and all(feedback_by_section.get(id(s)) for s in pending_sections):
+                journal_run.complete()
+    except Exception as e:
+        errors.append(str(e))
+
+    emit('progress', (1.0, "✅ 분석 완료!"))
+    result['elapsed'] = round(time.perf_counter() - started, 2)
+    result['error'] = ' | '.join(errors) or None
+    return result
@@ -0,0 +1,464 @@
+import json
+import logging
+import re
+import threading
+from collections import OrderedDict
+
+from instrumentation import trace_span
+from paragraph_store import ParagraphStore
+from rate_limit import AdaptiveRateController, call_with_backoff
+
+logger = logging.getLogger(__name__)
+
+# googleapiclient, google-auth, httplib2는 불러오는 데 수백 ms가 걸리므로 클라이언트를 처음 만들 때 불러옴
+# (화면을 처음 그리거나 문서 URL을 확인할 때는 필요 없음)
+
+# 문서 편집을 위해 drive.file 권한 추가
+SCOPES = [
+    'https://www.googleapis.com/auth/documents',
+    'https://www.googleapis.com/auth/drive.file'
+]
+
+def report_error(on_error, message):
+    """오류 메시지를 on_error 콜백(예: st.error)으로 전달하고, 없으면 로그로 남김"""
+    if on_error is not None:
+        on_error(message)
+    else:
+        logger.error(message)
+
+# Google API 호출 시간 제한(초)
+HTTP_TIMEOUT = 60
+
+# 서비스별 discovery 문서 (라이브러리에 포함된 정적 문서를 프로세스당 한 번만 읽어 파싱)
+_discovery_documents = {}
+_discovery_lock = threading.Lock()
+
+def load_discovery_document(service_name, version):
+    """파싱한 discovery 문서 (여러 클라이언트가 읽기 전용으로 공유)
+    
+    라이브러리에 포함된 정적 문서만 사용하므로 discovery API를 호출하지 않음
+    """
+    from googleapiclient import discovery_cache
+    
+    with _discovery_lock:
+        key = (service_name, version)
+        if key not in _discovery_documents:
+            _discovery_documents[key] = json.loads(discovery_cache.get_static_doc(service_name, version))
+        return _discovery_documents[key]
+
+class GoogleClientPool:
+    """서비스 계정 자격 증명 하나를 공유하고 스레드마다 전용 HTTP 연결로 Docs / Drive 클라이언트를 만드는 풀
+    
+    httplib2 연결은 스레드 간에 공유할 수 없으므로 스레드별로 만들되, 한 번 만든 클라이언트는 그 스레드에서
+    계속 재사용해 연결(keep-alive)과 discovery 문서 파싱 결과를 다시 쓰도록 함
+    """
+    
+    def __init__(self, service_account_info):
+        from google.oauth2.service_account import Credentials
+        
+        self.credentials = Credentials.from_service_account_info(service_account_info, scopes=SCOPES)
+        self._local = threading.local()
+    
+    def _client(self, service_name, version):
+        clients = self._local.__dict__.setdefault('clients', {})
+        if service_name not in clients:
+            import httplib2
+            from google_auth_httplib2 import AuthorizedHttp
+            from googleapiclient.discovery import build_from_document
+            
+            http = AuthorizedHttp(self.credentials, http=httplib2.Http(timeout=HTTP_TIMEOUT))
+            clients[service_name] = build_from_document(load_discovery_document(service_name, version), http=http)
+        return clients[service_name]
+    
+    def docs(self):
+        """현재 스레드의 Google Docs 클라이언트"""
+        return self._client('docs', 'v1')
+    
+    def drive(self):
+        """현재 스레드의 Google Drive 클라이언트"""
+        return self._client('drive', 'v3')
+
+def extract_document_id(url):
+    """Google Docs URL에서 문서 ID 추출"""
+    patterns = [
+        r'/document/d/([a-zA-Z0-9-_]+)',
+        r'/d/([a-zA-Z0-9-_]+)',
+        r'docs\.google\.com/.*[?&]id=([a-zA-Z0-9-_]+)',
+        r'^([a-zA-Z0-9-_]+)$'
+    ]
+    
+    for pattern in patterns:
+        match = re.search(pattern, url)
+        if match:
+            return match.group(1)
+    return None
+
+# 파서가 사용하는 필드만 요청 (이미지, 목록, 제안 사항 등 나머지 리소스는 받지 않음)
+# 이전에 삽입한 첨삭을 알아보기 위해 글자 스타일 중 색상, 기울임, 크기만 함께 받음
+PARAGRAPH_FIELDS = (
+    'paragraph(elements(textRun(content,textStyle(foregroundColor,italic,fontSize))),'
+    'paragraphStyle(namedStyleType))'
+)
+
+# 표 안의 표, 하위 탭을 몇 단계까지 받을지 (필드 마스크는 재귀를 표현할 수 없음)
+TABLE_NESTING_DEPTH = 2
+TAB_NESTING_DEPTH = 3
+
+def content_fields(depth=TABLE_NESTING_DEPTH):
+    """본문 content 필드 마스크 (문단과 depth 단계까지의 표 셀 안 문단)"""
+    fields = f'startIndex,endIndex,{PARAGRAPH_FIELDS}'
+    if depth:
+        fields += f',table(tableRows(tableCells(content({content_fields(depth - 1)}))))'
+    return fields
+
+def tab_fields(depth=TAB_NESTING_DEPTH):
+    """탭 필드 마스크 (탭 ID, 탭 본문, depth 단계까지의 하위 탭)"""
+    fields = f'tabProperties(tabId),documentTab(body(content({content_fields()})))'
+    if depth:
+        fields += f',childTabs({tab_fields(depth - 1)})'
+    return fields
+
+# includeTabsContent=True로 요청하면 본문은 body 대신 탭별 documentTab.body에 들어 있음
+DOCUMENT_FIELDS = f'title,revisionId,tabs({tab_fields()})'
+
+# 앱이 삽입하는 첨삭 문단의 시작 표시
+FEEDBACK_MARKER = '[첨삭:'
+
+# 첨삭 내용에 적용할 스타일 (파란색, 기울임, 10pt)
+FEEDBACK_TEXT_STYLE = {
+    'foregroundColor': {
+        'color': {
+            'rgbColor': {
+                'red': 0.0,
+                'green': 0.0,
+                'blue': 1.0
+            }
+        }
+    },
+    'italic': True,
+    'fontSize': {
+        'magnitude': 10,
+        'unit': 'PT'
+    }
+}
+
+# 파싱한 문서를 보관할 최대 개수
+MAX_CACHED_DOCUMENTS = 32
+
+class ParsedDocumentCache:
+    """(문서 ID, 리비전 ID)별 파싱 결과를 보관하는 스레드 안전 LRU 캐시"""
+    
+    def __init__(self, max_entries=MAX_CACHED_DOCUMENTS):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, document_id, revision_id):
+        with self._lock:
+            key = (document_id, revision_id)
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            return self._entries[key]
+    
+    def set(self, document_id, revision_id, parsed):
+        with self._lock:
+            self._entries[(document_id, revision_id)] = parsed
+            self._entries.move_to_end((document_id, revision_id))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+# Streamlit 재실행과 배치 작업 스레드가 함께 사용하는 캐시
+document_cache = ParsedDocumentCache()
+
+# 모든 Docs API 호출이 공유하는 동시 호출 제어기 (429/5xx는 백오프 후 재시도)
+docs_controller = AdaptiveRateController(initial_limit=4, max_limit=16)
+
+def execute_request(request, span=None, admit=None):
+    """Docs API 요청을 공유 제어기 아래에서 실행 (재시도 횟수와 대기열에서 기다린 시간은 span에 기록)
+    
+    admit을 넘기면 시도마다 먼저 서비스 계정 할당량의 공정 대기열을 통과함 (FairScheduler.for_user)
+    """
+    def count_retry(attempt, error, delay):
+        if span is not None:
+            span['retries'] = attempt
+    
+    def wait_turn():
+        waited = admit()
+        if span is not None:
+            span['queue_wait'] = span.get('queue_wait', 0.0) + waited
+    
+    return call_with_backoff(request.execute, docs_controller, on_retry=count_retry,
+                             admit=wait_turn if admit is not None else None)
+
+def is_feedback_style(text_style):
+    """글자 스타일이 앱이 삽입한 첨삭 스타일(파란색, 기울임, 10pt)인지 확인"""
+    rgb = text_style.get('foregroundColor', {}).get('color', {}).get('rgbColor', {})
+    expected_rgb = FEEDBACK_TEXT_STYLE['foregroundColor']['color']['rgbColor']
+    return (bool(text_style.get('italic')) and
+            text_style.get('fontSize', {}).get('magnitude') == FEEDBACK_TEXT_STYLE['fontSize']['magnitude'] and
+            all(rgb.get(channel, 0.0) == value for channel, value in expected_rgb.items()))
+
+def iter_content_paragraphs(content, tab_id=None, table_end=None):
+    """본문(또는 표 셀) content의 문단 요소를 문서 순서대로 (탭 ID, 문단 요소, 표 끝 인덱스)로 생성
+    
+    표 셀 안의 문단도 포함하며, 표 끝 인덱스는 문단을 감싼 가장 바깥 표의 endIndex (본문 문단은 None)
+    """
+    for element in content:
+        if 'paragraph' in element:
+            yield tab_id, element, table_end
+        elif 'table' in element:
+            outer_end = table_end if table_end is not None else element.get('endIndex')
+            for row in element['table'].get('tableRows', []):
+                for cell in row.get('tableCells', []):
+                    yield from iter_content_paragraphs(cell.get('content', []), tab_id, outer_end)
+
+def iter_tab_paragraphs(tabs):
+    """탭과 하위 탭의 문단 요소를 탭 순서대로 생성"""
+    for tab in tabs:
+        tab_id = tab.get('tabProperties', {}).get('tabId')
+        yield from iter_content_paragraphs(tab.get('documentTab', {}).get('body', {}).get('content', []), tab_id)
+        yield from iter_tab_paragraphs(tab.get('childTabs', []))
+
+def iter_document_paragraphs(document):
+    """documents().get 응답의 모든 문단 요소를 (탭 ID, 문단 요소, 표 끝 인덱스)로 생성
+    
+    includeTabsContent로 받은 응답은 모든 탭을, 탭 없이 받은 응답(녹화해 둔 응답 등)은 body를 순서대로 훑음
+    """
+    if 'tabs' in document:
+        return iter_tab_paragraphs(document['tabs'])
+    return iter_content_paragraphs(document.get('body', {}).get('content', []))
+
+def parse_document(document):
+    """documents().get 응답을 (제목, 문단 목록, 전체 텍스트, 리비전 ID, 줄 번호 → 문단 인덱스)로 변환
+    
+    문단 목록은 ParagraphStore로, 각 문단에는 Docs 문단 스타일(style), 탭 ID(tab), full_text에서의 시작 줄 번호(line),
+    표 셀 안의 문단이면 가장 바깥 표의 끝 인덱스(table_end)가 기록되고, line_index[i]는 full_text의 i번째 줄이 속한 문단 인덱스. 문서를 생성기로 한 번만 훑으며
+    문단 텍스트는 전체 텍스트 하나에만 보관함.
+    이전 실행에서 삽입한 첨삭([첨삭: 표시 + 첨삭 스타일)은 내용에서 제외하고, 바로 앞 문단의 feedback에
+    첨삭 글자 범위({'start', 'end'}, 마지막 줄바꿈 제외)로 기록
+    """
+    title = document.get('title', '제목 없음')
+    revision_id = document.get('revisionId')
+    paragraphs = ParagraphStore()
+    in_feedback = False
+    last_tab = None
+    previous = None
+    
+    for tab_id, element, table_end in iter_document_paragraphs(document):
+        paragraph = element['paragraph']
+        runs = [text_element['textRun'] for text_element in paragraph.get('elements', []) if 'textRun' in text_element]
+        full_text = ''.join([run.get('content', '') for run in runs])
+        if not full_text.strip():
+            continue
+        start_index = element.get('startIndex', 0)
+        end_index = element.get('endIndex', 0)
+        
+        # 탭마다 인덱스가 따로 매겨지므로 첨삭은 같은 탭의 앞 문단에만 연결
+        if tab_id != last_tab:
+            in_feedback = False
+            last_tab = tab_id
+            previous = None
+        
+        # 표시와 스타일이 모두 맞는 문단만 앱이 삽입한 첨삭으로 보고 문서 내용에서 제외
+        # (사용자가 직접 쓴 "[첨삭:" 문단은 스타일이 달라 내용으로 남음). 스타일은 표시로 시작하거나 이어지는
+        # 문단에서만 확인하며, 공백뿐인 조각(예: 첨삭 스타일이 입혀진 문단 끝 줄바꿈)은 스타일 판단에서 제외
+        if ((in_feedback or full_text.lstrip().startswith(FEEDBACK_MARKER)) and
+                all(is_feedback_style(run.get('textStyle', {})) for run in runs if run.get('content', '').strip())):
+            in_feedback = not full_text.rstrip().endswith(']')
+            if previous is not None:
+                paragraphs.extend_feedback(previous, start_index, end_index - 1)
+            continue
+        in_feedback = False
+        
+        previous = paragraphs.append(full_text, start_index, end_index,
+                                     paragraph.get('paragraphStyle', {}).get('namedStyleType'), tab_id, table_end)
+    
+    return title, paragraphs, paragraphs.full_text, revision_id, paragraphs.line_index
+
+def get_document_content(service, document_id, on_error=None, trace=None, use_cache=True, admit=None):
+    """Google Docs 문서 내용과 구조 가져오기 (parse_document 형식으로 반환)
+    
+    리비전 ID만 먼저 조회해 이전에 파싱한 리비전이면 본문을 다시 내려받지 않음
+    """
+    try:
+        if use_cache:
+            with trace_span(trace, 'docs.get_revision') as span:
+                revision = execute_request(service.documents().get(documentId=document_id, fields='revisionId'), span,
+                                           admit)
+                cached = document_cache.get(document_id, revision.get('revisionId'))
+                span['cached'] = cached is not None
+            if cached is not None:
+                return cached
+        
+        with trace_span(trace, 'docs.get') as span:
+            document = execute_request(service.documents().get(documentId=document_id, includeTabsContent=True,
+                                                               fields=DOCUMENT_FIELDS), span, admit)
+        
+        with trace_span(trace, 'docs.parse') as span:
+            parsed = parse_document(document)
+            del document
+            span['paragraphs'] = len(parsed[1])
+        if use_cache and parsed[3]:
+            document_cache.set(document_id, parsed[3], parsed)
+        return parsed
+    except Exception as e:
+        report_error(on_error, f"문서 읽기 오류: {str(e)}")
+        return None, None, None, None, None
+
+# batchUpdate 한 번에 보낼 최대 삽입 건수와 요청 본문 크기
+MAX_INSERTIONS_PER_BATCH = 200
+MAX_BATCH_PAYLOAD_BYTES = 1_000_000
+
+def utf16_length(text):
+    """Google Docs 인덱스 기준(UTF-16 코드 단위)의 문자열 길이"""
+    return len(text.encode('utf-16-le')) // 2
+
+def build_feedback_requests(insertion):
+    """첨삭 삽입 하나에 대한 insertText + updateTextStyle 요청 생성
+    
+    insertion에 replace 범위가 있으면 기존 첨삭 글자를 지우고 그 자리에 새 첨삭을 씀 (문단 구성은 유지).
+    after_table이면 index는 표 바로 뒤 문단의 시작이므로 그 앞에 첨삭 문단을 새로 만들고 본문 스타일로 지정.
+    tab_id가 있으면 위치와 범위를 그 탭 기준으로 지정 (탭마다 인덱스가 따로 매겨짐)
+    """
+    tab = {'tabId': insertion['tab_id']} if insertion.get('tab_id') else {}
+    if insertion.get('replace'):
+        feedback_text = f'{FEEDBACK_MARKER} {insertion["feedback"]}]'
+        insert_index = insertion['replace']['start']
+        requests = [{
+            'deleteContentRange': {
+                'range': {
+                    'startIndex': insert_index,
+                    'endIndex': insertion['replace']['end'],
+                    **tab
+                }
+            }
+        }]
+    elif insertion.get('after_table'):
+        feedback_text = f'{FEEDBACK_MARKER} {insertion["feedback"]}]\n'
+        insert_index = insertion['index']
+        requests = []
+    else:
+        feedback_text = f'\n{FEEDBACK_MARKER} {insertion["feedback"]}]\n'
+        insert_index = insertion['index']
+        requests = []
+    
+    # 앞 줄바꿈은 섹션 마지막 문단의 끝이 되므로 스타일은 그 뒤의 첨삭 문단에만 적용
+    style_start = insert_index + (1 if feedback_text.startswith('\n') else 0)
+    requests = requests + [
+        {
+            'insertText': {
+                'location': {
+                    'index': insert_index,
+                    **tab
+                },
+                'text': feedback_text
+            }
+        },
+        {
+            'updateTextStyle': {
+                'range': {
+                    'startIndex': style_start,
+                    'endIndex': insert_index + utf16_length(feedback_text),
+                    **tab
+                },
+                'textStyle': FEEDBACK_TEXT_STYLE,
+                'fields': 'foregroundColor,italic,fontSize'
+            }
+        }
+    ]
+    if insertion.get('after_table') and not insertion.get('replace'):
+        # 새 문단은 표 뒤 문단(다음 섹션 제목 등)의 문단 스타일을 이어받으므로 본문 스타일로 되돌림
+        requests.append({
+            'updateParagraphStyle': {
+                'range': {
+                    'startIndex': insert_index,
+                    'endIndex': insert_index + utf16_length(feedback_text),
+                    **tab
+                },
+                'paragraphStyle': {'namedStyleType': 'NORMAL_TEXT'},
+                'fields': 'namedStyleType'
+            }
+        })
+    return requests
+
+def plan_feedback_batches(feedback_insertions):
+    """삽입 목록을 뒤에서부터 적용되는 순서로 정렬하고 요청 크기 제한에 맞춰 batch로 나눔"""
+    batches = []
+    current_batch = []
+    current_size = 0
+    
+    # 역순으로 정렬 (뒤에서부터 삽입/교체해야 앞쪽 인덱스가 변하지 않음, 교체의 index는 기존 첨삭 시작 위치)
+    # 탭마다 인덱스가 따로 매겨지므로 탭 안에서의 순서만 지키면 됨
+    for insertion in sorted(feedback_insertions, key=lambda x: (x.get('tab_id') or '', x['index']), reverse=True):
+        requests = build_feedback_requests(insertion)
+        size = len(json.dumps(requests, ensure_ascii=False).encode('utf-8'))
+        
+        if current_batch and (len(current_batch) >= MAX_INSERTIONS_PER_BATCH or
+                              current_size + size > MAX_BATCH_PAYLOAD_BYTES):
+            batches.append(current_batch)
+            current_batch = []
+            current_size = 0
+        
+        current_batch.append((insertion, requests))
+        current_size += size
+    
+    if current_batch:
+        batches.append(current_batch)
+    
+    return batches
+
+def section_last_paragraph(section, content_with_positions, line_index):
+    """섹션 마지막 줄이 속한 문단 (문서가 비어 있으면 None)"""
+    if not line_index:
+        return None
+    return content_with_positions[line_index[min(section['end_line'], len(line_index) - 1)]]
+
+def insert_feedbacks_to_doc(service, document_id, feedback_insertions, revision_id=None, on_error=None,
+                            trace=None, on_batch=None, admit=None):
+    """모든 첨삭 내용을 가능한 한 적은 batchUpdate 호출로 삽입하고 (삽입된 개수, 최종 리비전 ID)를 반환
+
+    on_batch(삽입 목록, 결과 리비전 ID)는 batchUpdate 하나가 적용될 때마다 호출됨
+    """
+    from googleapiclient.errors import HttpError
+    
+    inserted = 0
+    
+    try:
+        for batch in plan_feedback_batches(feedback_insertions):
+            body = {'requests': [request for _, requests in batch for request in requests]}
+            
+            # 읽어온 이후 문서가 수정되었다면 잘못된 위치에 삽입하지 않고 실패하도록 함
+            if revision_id:
+                body['writeControl'] = {'requiredRevisionId': revision_id}
+            
+            # 쓰기 도중 오류가 나서 재시도하더라도 requiredRevisionId 덕분에 중복 삽입되지 않음
+            with trace_span(trace, 'docs.batchUpdate', requests=len(body['requests']),
+                            payload_bytes=len(json.dumps(body, ensure_ascii=False).encode('utf-8'))) as span:
+                response = execute_request(service.documents().batchUpdate(
+                    documentId=document_id,
+                    body=body
+                ), span, admit)
+            
+            inserted += len(batch)
+            # 다음 batch는 방금 적용한 결과 리비전을 기준으로 함
+            revision_id = response.get('writeControl', {}).get('requiredRevisionId', revision_id)
+            if on_batch is not None:
+                on_batch([insertion for insertion, _ in batch], revision_id)
+        
+        return inserted, revision_id
+    except HttpError as e:
+        if e.resp.status == 403:
+            report_error(on_error, "❌ 문서를 편집할 권한이 없습니다. 문서에 '편집자' 권한을 부여해주세요.")
+        elif e.resp.status == 400 and revision_id and 'revision' in str(e).lower():
+            report_error(on_error, "❌ 문서를 읽어온 뒤 내용이 수정되어 첨삭을 삽입하지 않았습니다. 다시 시도해주세요.")
+        else:
+            report_error(on_error, f"첨삭 내용 삽입 중 오류 발생: {str(e)}")
+        return inserted, None
+    except Exception as e:
+        report_error(on_error, f"첨삭 내용 삽입 중 오류 발생: {str(e)}")
+        return inserted, None
@@ -0,0 +1,159 @@
+import contextlib
+import json
+import math
+import os
+import threading
+import time
+import uuid
+
+from llm_cache import CACHE_DIR
+
+# 실행별 성능 기록(JSON, Prometheus 텍스트)을 저장할 디렉터리
+TRACE_DIR = os.path.join(CACHE_DIR, 'traces')
+
+# 스트리밍 분석 요청부터 첫 응답 조각까지의 시간을 기록하는 구간 이름
+FIRST_TOKEN_SPAN = 'analysis.first_token'
+
+
+def percentile(values, q):
+    """정렬 후 최근접 순위 방식으로 구한 백분위수 (값이 없으면 0)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered), math.ceil(q * len(ordered))) - 1)
+    return ordered[rank]
+
+
+def trace_span(trace, name, **attrs):
+    """trace가 있으면 구간을 기록하고, 없으면 아무것도 기록하지 않는 컨텍스트 매니저
+
+    with 블록 안에서 반환된 dict에 값을 넣으면 구간 속성(토큰 수, 요청 크기 등)으로 함께 기록됨
+    """
+    if trace is None:
+        return contextlib.nullcontext(attrs)
+    return trace.span(name, **attrs)
+
+
+class RunTrace:
+    """한 번의 첨삭 실행에서 단계별 소요 시간, 토큰 사용량, API 호출을 모으는 스레드 안전 기록기"""
+
+    def __init__(self, **labels):
+        self.run_id = time.strftime('%Y%m%d-%H%M%S-') + uuid.uuid4().hex[:6]
+        self.labels = labels
+        self.started_at = time.time()
+        self._origin = time.perf_counter()
+        self.spans = []
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def span(self, name, **attrs):
+        """with 블록 실행 시간을 name 구간으로 기록 (예외가 나면 error 속성에 남기고 다시 발생)"""
+        started = time.perf_counter()
+        try:
+            yield attrs
+        except Exception as e:
+            attrs['error'] = type(e).__name__
+            raise
+        finally:
+            self.record(name, time.perf_counter() - started, started=started, **attrs)
+
+    def record(self, name, duration, started=None, **attrs):
+        """이미 측정한 구간 하나를 추가"""
+        started = time.perf_counter() - duration if started is None else started
+        span = dict(attrs, name=name, start=round(started - self._origin, 4), duration=round(duration, 4),
+                    thread=threading.current_thread().name)
+        with self._lock:
+            self.spans.append(span)
+
+    def summary(self):
+        """구간 이름별 호출 수, 합계/p50/p95/최대 소요 시간과 토큰 합계"""
+        with self._lock:
+            spans = list(self.spans)
+
+        stages = {}
+        for span in spans:
+            stages.setdefault(span['name'], []).append(span)
+
+        rows = []
+        for name, items in stages.items():
+            durations = [span['duration'] for span in items]
+            rows.append({
+                'stage': name,
+                'count': len(items),
+                'total_s': round(sum(durations), 3),
+                'p50_s': round(percentile(durations, 0.5), 3),
+                'p95_s': round(percentile(durations, 0.95), 3),
+                'max_s': round(max(durations), 3),
+                'prompt_tokens': sum(span.get('prompt_tokens', 0) for span in items),
+                'completion_tokens': sum(span.get('completion_tokens', 0) for span in items),
+                'retries': sum(span.get('retries', 0) for span in items),
+                'errors': sum(1 for span in items if span.get('error')),
+            })
+        return rows
+
+    def totals(self):
+        """실행 전체의 소요 시간, 토큰 수, 실제 API 호출 수, 분석 첫 응답까지의 시간(스트리밍하지 않았으면 None)"""
+        with self._lock:
+            spans = list(self.spans)
+        return {
+            'elapsed_s': round(time.perf_counter() - self._origin, 3),
+            'prompt_tokens': sum(span.get('prompt_tokens', 0) for span in spans),
+            'completion_tokens': sum(span.get('completion_tokens', 0) for span in spans),
+            'openai_calls': sum(1 for span in spans if span['name'].startswith('openai.') and not span.get('cached')),
+            'docs_calls': sum(1 for span in spans if span['name'].startswith('docs.')),
+            'time_to_first_token_s': next((span['duration'] for span in spans if span['name'] == FIRST_TOKEN_SPAN),
+                                          None),
+        }
+
+    def to_json(self):
+        with self._lock:
+            spans = list(self.spans)
+        return json.dumps({
+            'run_id': self.run_id,
+            'started_at': self.started_at,
+            'labels': self.labels,
+            'totals': self.totals(),
+            'stages': self.summary(),
+            'spans': spans
+        }, ensure_ascii=False, indent=2)
+
+    def to_prometheus(self):
+        """Prometheus 텍스트 형식 (단계별 요약 분위수와 토큰/호출 카운터)"""
+        base = ','.join(f'{key}="{value}"' for key, value in self.labels.items())
+        base = f"{base}," if base else ''
+        totals = self.totals()
+
+        lines = [
+            '# HELP feedback_stage_duration_seconds 첨삭 실행 단계별 소요 시간',
+            '# TYPE feedback_stage_duration_seconds summary',
+        ]
+        for row in self.summary():
+            stage = f'{base}stage="{row["stage"]}"'
+            lines.append(f'feedback_stage_duration_seconds{{{stage},quantile="0.5"}} {row["p50_s"]}')
+            lines.append(f'feedback_stage_duration_seconds{{{stage},quantile="0.95"}} {row["p95_s"]}')
+            lines.append(f'feedback_stage_duration_seconds_sum{{{stage}}} {row["total_s"]}')
+            lines.append(f'feedback_stage_duration_seconds_count{{{stage}}} {row["count"]}')
+
+        lines += [
+            '# HELP feedback_llm_tokens_total OpenAI 토큰 사용량',
+            '# TYPE feedback_llm_tokens_total counter',
+            f'feedback_llm_tokens_total{{{base}kind="prompt"}} {totals["prompt_tokens"]}',
+            f'feedback_llm_tokens_total{{{base}kind="completion"}} {totals["completion_tokens"]}',
+            '# HELP feedback_api_calls_total 실제 API 호출 수',
+            '# TYPE feedback_api_calls_total counter',
+            f'feedback_api_calls_total{{{base}api="openai"}} {totals["openai_calls"]}',
+            f'feedback_api_calls_total{{{base}api="docs"}} {totals["docs_calls"]}',
+        ]
+        return '\n'.join(lines) + '\n'
+
+    def save(self, directory=None):
+        """JSON 기록과 Prometheus 텍스트 파일을 저장하고 두 경로를 반환"""
+        directory = directory or TRACE_DIR
+        os.makedirs(directory, exist_ok=True)
+        json_path = os.path.join(directory, f"{self.run_id}.json")
+        prom_path = os.path.join(directory, f"{self.run_id}.prom")
+        with open(json_path, 'w', encoding='utf-8') as f:
+            f.write(self.to_json())
+        with open(prom_path, 'w', encoding='utf-8') as f:
+            f.write(self.to_prometheus())
+        return json_path, prom_path
@@ -0,0 +1,245 @@
+import hashlib
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from llm_cache import CACHE_DIR
+
+# 작업 상태
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'error'
+
+ACTIVE_STATUSES = (QUEUED, RUNNING)
+
+# 진행률/메시지를 SQLite에 기록하는 최소 간격(초) - 화면용 실시간 상태는 메모리에서 바로 갱신
+PROGRESS_WRITE_INTERVAL = 0.5
+
+# 다시 접속할 때 쓰는 토큰의 유효 기간 (이보다 오래 접속하지 않으면 새 사용자로 시작)
+SESSION_TTL_SECONDS = 30 * 24 * 60 * 60
+
+
+def _token_hash(token):
+    """DB에는 재접속 토큰 대신 해시만 보관"""
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+class JobReporter:
+    """작업 함수가 진행 상황과 화면에 보여줄 중간 결과를 남기는 통로"""
+
+    def __init__(self, manager, job_id):
+        self._manager = manager
+        self.job_id = job_id
+        self._last_write = 0.0
+
+    def progress(self, fraction, message=None):
+        """진행률(0~1)과 상태 메시지 갱신"""
+        self.update(progress=fraction, message=message)
+        now = time.monotonic()
+        if fraction >= 1.0 or now - self._last_write >= PROGRESS_WRITE_INTERVAL:
+            self._last_write = now
+            self._manager._write_progress(self.job_id, fraction, message)
+
+    def update(self, **values):
+        """메모리에 보관되는 실시간 상태(분석 응답 조각, 섹션 미리보기 등) 갱신"""
+        self._manager._update_live(self.job_id, values)
+
+    def append(self, key, value):
+        """실시간 상태의 목록(key)에 값을 추가"""
+        self._manager._append_live(self.job_id, key, value)
+
+
+class JobManager:
+    """첨삭 실행을 백그라운드 스레드에서 처리하고 상태와 결과를 SQLite에 보관하는 작업 관리자
+
+    Streamlit 스크립트는 작업을 제출한 뒤 상태만 조회하므로, 재실행이나 브라우저 재접속이 있어도
+    진행 중인 작업이 중단되지 않음
+    """
+
+    def __init__(self, path=None, max_workers=2):
+        if path is None:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            path = os.path.join(CACHE_DIR, 'jobs.sqlite3')
+
+        self._lock = threading.Lock()
+        self._live = {}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='feedback-job')
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                owner TEXT NOT NULL,
+                label TEXT,
+                status TEXT NOT NULL,
+                progress REAL NOT NULL DEFAULT 0,
+                message TEXT,
+                result TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_owner ON jobs (owner, created_at)")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS sessions (
+                token_hash TEXT PRIMARY KEY,
+                owner TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+        # 이전 프로세스에서 끝나지 못한 작업은 실패로 표시 (다시 요청하면 실행 기록으로 이어서 진행)
+        self._conn.execute(
+            "UPDATE jobs SET status = ?, message = ?, updated_at = ? WHERE status IN (?, ?)",
+            (FAILED, "서버가 다시 시작되어 작업이 중단되었습니다. 다시 요청하면 중단된 지점부터 이어서 진행합니다.", time.time(), *ACTIVE_STATUSES)
+        )
+        self._conn.commit()
+
+    def create_session(self):
+        """서버에서 새 사용자 ID를 만들고 (사용자 ID, 재접속 토큰)을 반환"""
+        owner = uuid.uuid4().hex
+        return owner, self._issue_token(owner)
+
+    def resume_session(self, token):
+        """재접속 토큰의 (사용자 ID, 새 토큰) - 토큰이 없거나 만료되었으면 None
+
+        토큰은 한 번만 쓸 수 있으므로 다시 접속할 때마다 새 토큰으로 바뀌어, 예전 링크로는 작업을 볼 수 없음
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT owner FROM sessions WHERE token_hash = ? AND created_at > ?",
+                (_token_hash(token), time.time() - SESSION_TTL_SECONDS)
+            ).fetchone()
+            self._conn.execute(
+                "DELETE FROM sessions WHERE token_hash = ? OR created_at <= ?",
+                (_token_hash(token), time.time() - SESSION_TTL_SECONDS)
+            )
+            self._conn.commit()
+        if row is None:
+            return None
+        return row[0], self._issue_token(row[0])
+
+    def _issue_token(self, owner):
+        token = secrets.token_urlsafe(24)
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO sessions (token_hash, owner, created_at) VALUES (?, ?, ?)",
+                (_token_hash(token), owner, time.time())
+            )
+            self._conn.commit()
+        return token
+
+    def submit(self, func, owner, label=''):
+        """func(reporter)를 백그라운드에서 실행하도록 제출하고 작업 ID를 반환
+
+        func의 반환값(JSON으로 저장 가능한 dict)이 작업 결과로 보관됨
+        """
+        job_id = uuid.uuid4().hex[:12]
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, owner, label, status, progress, message, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, 0, ?, ?, ?)",
+                (job_id, owner, label, QUEUED, "⏳ 대기 중...", now, now)
+            )
+            self._conn.commit()
+            self._live[job_id] = {}
+
+        self._executor.submit(self._run, job_id, func)
+        return job_id
+
+    def _run(self, job_id, func):
+        self._set_status(job_id, RUNNING, "🚀 작업을 시작했습니다.")
+        try:
+            result = func(JobReporter(self, job_id))
+        except Exception as e:
+            self._finish(job_id, FAILED, f"작업 중 오류 발생: {str(e)}", None)
+            return
+        self._finish(job_id, DONE, "✅ 완료", result)
+
+    def _set_status(self, job_id, status, message):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, message = ?, updated_at = ? WHERE id = ?",
+                (status, message, time.time(), job_id)
+            )
+            self._conn.commit()
+
+    def _finish(self, job_id, status, message, result):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, progress = 1, message = ?, result = ?, updated_at = ? WHERE id = ?",
+                (status, message, json.dumps(result, ensure_ascii=False) if result is not None else None,
+                 time.time(), job_id)
+            )
+            self._conn.commit()
+            # 완료된 작업은 저장된 결과로 보여주므로 실시간 상태는 버림
+            self._live.pop(job_id, None)
+
+    def _write_progress(self, job_id, progress, message):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET progress = ?, message = COALESCE(?, message), updated_at = ? WHERE id = ?",
+                (progress, message, time.time(), job_id)
+            )
+            self._conn.commit()
+
+    def _update_live(self, job_id, values):
+        with self._lock:
+            live = self._live.setdefault(job_id, {})
+            live.update({key: value for key, value in values.items() if value is not None})
+
+    def _append_live(self, job_id, key, value):
+        with self._lock:
+            self._live.setdefault(job_id, {}).setdefault(key, []).append(value)
+
+    def _row_to_job(self, row):
+        job = {
+            'id': row[0],
+            'owner': row[1],
+            'label': row[2],
+            'status': row[3],
+            'progress': row[4],
+            'message': row[5],
+            'result': json.loads(row[6]) if row[6] else None,
+            'created_at': row[7],
+            'updated_at': row[8]
+        }
+        live = self._live.get(job['id'])
+        # 실행 중인 작업은 메모리의 최신 진행 상황을 우선 사용
+        job['live'] = {key: list(value) if isinstance(value, list) else value for key, value in live.items()} if live else {}
+        if 'progress' in job['live']:
+            job['progress'] = job['live']['progress']
+        if job['live'].get('message'):
+            job['message'] = job['live']['message']
+        return job
+
+    def get(self, job_id):
+        """작업 하나의 상태와 결과 (없으면 None)"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, owner, label, status, progress, message, result, created_at, updated_at "
+                "FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+            return self._row_to_job(row) if row else None
+
+    def list_jobs(self, owner, limit=20):
+        """사용자의 최근 작업 목록 (최신순)"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, owner, label, status, progress, message, result, created_at, updated_at "
+                "FROM jobs WHERE owner = ? ORDER BY created_at DESC LIMIT ?", (owner, limit)
+            ).fetchall()
+            return [self._row_to_job(row) for row in rows]
+
+    def delete_finished(self, owner):
+        """사용자의 끝난 작업 기록을 삭제"""
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM jobs WHERE owner = ? AND status NOT IN (?, ?)", (owner, *ACTIVE_STATUSES)
+            )
+            self._conn.commit()
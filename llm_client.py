@@ -0,0 +1,194 @@
+import copy
+import threading
+
+from instrumentation import trace_span
+from llm_cache import make_cache_key
+from rate_limit import call_with_backoff, holding_slot
+from token_budget import estimate_tokens
+
+# openai와 requests는 불러오는 데 수백 ms가 걸리므로 실제로 요청을 보낼 때 처음 불러옴
+# (화면을 처음 그릴 때는 필요 없음)
+
+# keep-alive 세션이 호스트별로 유지할 연결 수 (동시 요청 수 상한과 맞춤)
+CONNECTION_POOL_SIZE = 32
+
+_session_lock = threading.Lock()
+_keep_alive_session = None
+
+
+def retry_exceptions():
+    """상태 코드가 없어도 다시 시도할 OpenAI 오류 (연결 끊김, 시간 초과)"""
+    import openai
+    return (openai.error.APIConnectionError, openai.error.Timeout)
+
+
+def create_keep_alive_session(pool_size=CONNECTION_POOL_SIZE):
+    """모든 작업 스레드가 공유하는 OpenAI 요청 세션 생성
+
+    openai 0.28은 스레드마다 세션을 만들고 180초마다 닫으므로, 짧게 사는 작업 스레드마다 TLS 연결을
+    새로 맺게 됨. 이 세션은 닫기 요청을 무시해 연결 풀을 계속 재사용함
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    class KeepAliveSession(requests.Session):
+        def close(self):
+            pass
+
+    session = KeepAliveSession()
+    session.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=2))
+    return session
+
+
+def install_keep_alive_session():
+    """openai 모듈이 공유 keep-alive 세션을 쓰도록 설정 (여러 번 호출해도 한 번만 적용)"""
+    global _keep_alive_session
+    import openai
+    with _session_lock:
+        if _keep_alive_session is None:
+            _keep_alive_session = create_keep_alive_session()
+        openai.requestssession = _keep_alive_session
+        return _keep_alive_session
+
+
+def build_messages(system_prompt, user_prompt):
+    """시스템/사용자 프롬프트로 ChatCompletion 메시지 목록 생성"""
+    return [{
+        "role": "system",
+        "content": system_prompt
+    }, {
+        "role": "user",
+        "content": user_prompt
+    }]
+
+
+def record_usage(span, usage):
+    """응답의 usage(토큰 사용량)를 기록 구간 속성에 저장"""
+    if usage:
+        span['prompt_tokens'] = usage.get('prompt_tokens', 0)
+        span['completion_tokens'] = usage.get('completion_tokens', 0)
+
+
+class LLMClient:
+    """ChatCompletion 호출을 감싸 응답 캐시와 요청 속도 제한을 적용하는 클라이언트
+
+    api_key는 호출마다 전달하므로 사용자별 키가 openai 모듈 전역 설정을 바꾸지 않음.
+    admit(토큰 추정치)를 넘기면 API를 호출할 때마다 먼저 공유 할당량의 공정 대기열을 통과함
+    (FairScheduler.for_user)
+    """
+
+    def __init__(self, model, cache=None, limiter=None, create_completion=None, trace=None, controller=None,
+                 api_key=None, admit=None):
+        self.model = model
+        self.api_key = api_key
+        self.cache = cache
+        self.limiter = limiter
+        self.admit = admit
+        # 동시 호출 수를 할당량에 맞춰 조절하는 AdaptiveRateController (여러 클라이언트가 공유 가능)
+        self.controller = controller
+        # 테스트/벤치마크에서 가짜 API를 주입할 수 있도록 호출 함수를 교체 가능하게 둠
+        if create_completion is None:
+            import openai
+            install_keep_alive_session()
+            create_completion = openai.ChatCompletion.create
+        self.create_completion = create_completion
+        self.trace = trace
+
+    def with_trace(self, trace):
+        """캐시와 속도 제한기는 공유하고 호출 기록만 trace에 남기는 복사본"""
+        client = copy.copy(self)
+        client.trace = trace
+        return client
+
+    def _lookup(self, system_prompt, user_prompt, max_tokens, temperature):
+        """(캐시 키, 캐시된 응답) 반환 - 캐시를 쓰지 않으면 (None, None)"""
+        if self.cache is None:
+            return None, None
+        cache_key = make_cache_key(self.model, system_prompt, user_prompt, temperature, max_tokens)
+        return cache_key, self.cache.get(cache_key)
+
+    def _create(self, span, hold_slot=False, **params):
+        """429/5xx 오류는 백오프 후 재시도하며 API 호출 (재시도 횟수는 span에 기록)
+
+        hold_slot이면 동시 실행 자리를 반환하지 않으므로 호출한 쪽이 holding_slot(self.controller)으로 반환해야 함
+        """
+        def create():
+            # 캐시에 없을 때만 실제 API 호출 속도를 제한
+            if self.limiter is not None:
+                self.limiter.acquire()
+            if self.api_key:
+                params['api_key'] = self.api_key
+            return self.create_completion(model=self.model, **params)
+
+        def count_retry(attempt, error, delay):
+            span['retries'] = attempt
+
+        # OpenAI가 분당 토큰 한도에 계산하는 양(입력 + 최대 출력 토큰)만큼 공유 예산을 씀
+        tokens = 0
+        if self.admit is not None:
+            tokens = sum(estimate_tokens(message['content']) for message in params['messages'])
+            tokens += params['max_tokens']
+
+        def wait_turn():
+            span['queue_wait'] = span.get('queue_wait', 0.0) + self.admit(tokens)
+
+        return call_with_backoff(create, self.controller, retry_exceptions(), on_retry=count_retry,
+                                 admit=wait_turn if self.admit is not None else None, hold_slot=hold_slot)
+
+    def complete(self, system_prompt, user_prompt, max_tokens, temperature=0.7):
+        """시스템/사용자 프롬프트로 응답 텍스트를 생성 (캐시에 있으면 API 호출 없이 반환)"""
+        with trace_span(self.trace, 'openai.complete', max_tokens=max_tokens) as span:
+            cache_key, cached = self._lookup(system_prompt, user_prompt, max_tokens, temperature)
+            if cached is not None:
+                span['cached'] = True
+                return cached
+
+            response = self._create(
+                span,
+                messages=build_messages(system_prompt, user_prompt),
+                max_tokens=max_tokens,
+                temperature=temperature
+            )
+            content = response.choices[0].message.content
+            record_usage(span, response.get('usage'))
+
+            if cache_key is not None:
+                self.cache.set(cache_key, content)
+            return content
+
+    def stream(self, system_prompt, user_prompt, max_tokens, temperature=0.7):
+        """응답을 생성되는 대로 조각(str) 단위로 반환하는 제너레이터 (캐시 적중 시 한 번에 반환)"""
+        with trace_span(self.trace, 'openai.stream', max_tokens=max_tokens) as span:
+            cache_key, cached = self._lookup(system_prompt, user_prompt, max_tokens, temperature)
+            if cached is not None:
+                span['cached'] = True
+                yield cached
+                return
+
+            # 응답 조각을 받기 시작하기 전의 오류만 재시도
+            response = self._create(
+                span,
+                hold_slot=True,
+                messages=build_messages(system_prompt, user_prompt),
+                max_tokens=max_tokens,
+                temperature=temperature,
+                stream=True,
+                # 마지막 조각으로 토큰 사용량을 받음
+                stream_options={'include_usage': True}
+            )
+
+            # 응답을 다 받을 때까지 동시 실행 자리를 차지하고, 도중의 요청 한도 초과도 제어기에 알림
+            chunks = []
+            with holding_slot(self.controller):
+                for chunk in response:
+                    record_usage(span, chunk.get('usage'))
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta.get('content')
+                    if delta:
+                        chunks.append(delta)
+                        yield delta
+
+            # 끝까지 받은 응답만 캐시에 저장
+            if cache_key is not None:
+                self.cache.set(cache_key, ''.join(chunks))
@@ -0,0 +1,194 @@
+import struct
+from array import array
+
+# 문단 속성 중 값이 없음을 나타내는 번호 (스타일, 탭)
+_MISSING = -1
+
+# 문단 하나가 _fields 배열에서 차지하는 칸
+# (full_text에서의 위치, 텍스트 길이, 시작 인덱스, 끝 인덱스, 시작 줄 번호, 스타일 번호, 탭 번호)
+_OFFSET, _LENGTH, _START, _END, _LINE, _STYLE, _TAB = range(7)
+_STRIDE = 7
+
+# 정수 값을 그대로 돌려주는 키와 그 칸
+_INT_FIELDS = {'start': _START, 'end': _END, 'line': _LINE}
+
+# array('i')와 같은 형식의 바이트로 묶어 한 번에 추가 (array.extend(튜플)보다 빠름)
+_pack_fields = struct.Struct(f'{_STRIDE}i').pack
+_pack_int = struct.Struct('i').pack
+
+
+class Paragraph:
+    """ParagraphStore의 문단 하나를 가리키는 읽기 전용 보기
+
+    이전 dict 문단과 같은 키('text', 'start', 'end', 'style', 'line', 'tab', 'feedback')와 표 셀 문단의
+    'table_end'(가장 바깥 표의 끝 인덱스)로 읽을 수 있고,
+    text는 문서 전체 텍스트에서 필요할 때 잘라 냄. 여러 문단의 같은 키를 읽을 때는 ParagraphStore.values가 빠름
+    """
+
+    __slots__ = ('_store', '_idx')
+
+    KEYS = ('text', 'start', 'end', 'style', 'line', 'tab', 'feedback', 'table_end')
+
+    def __init__(self, store, idx):
+        self._store = store
+        self._idx = idx
+
+    def __getitem__(self, key):
+        value = self._store.field(self._idx, key)
+        if value is None and key == 'feedback':
+            raise KeyError(key)
+        return value
+
+    def get(self, key, default=None):
+        try:
+            value = self._store.field(self._idx, key)
+        except KeyError:
+            return default
+        return default if value is None else value
+
+    def keys(self):
+        return [key for key in self.KEYS if self.get(key) is not None]
+
+    def __repr__(self):
+        return f"Paragraph({dict((key, self[key]) for key in self.keys())!r})"
+
+
+class ParagraphStore:
+    """문단 위치와 스타일을 배열에, 문단 텍스트를 하나의 전체 텍스트에 보관하는 문단 목록
+
+    문단마다 dict와 문자열을 만드는 대신 (텍스트 위치, 길이, 시작/끝 인덱스, 줄 번호, 스타일, 탭)을
+    4바이트 정수 배열 하나에 문단당 7칸씩 이어서 보관해 큰 문서의 메모리 사용량을 줄임.
+    문단은 줄바꿈 하나로 이어 붙여 full_text가 되며, line_index[i]는 full_text의 i번째 줄이 속한 문단 인덱스
+    """
+
+    def __init__(self):
+        self._fields = array('i')
+        self.line_index = array('i')
+        # 첨삭이 달린 문단은 일부이므로 {문단 인덱스: (시작, 끝)}으로 따로 보관
+        self.feedback_ranges = {}
+        # 표 셀 안의 문단도 일부이므로 {문단 인덱스: 가장 바깥 표의 끝 인덱스}로 따로 보관
+        self.table_ends = {}
+        # 스타일 이름과 탭 ID는 종류가 적으므로 목록에 한 번씩만 두고 배열에는 번호를 보관 (None은 _MISSING)
+        self._style_names = []
+        self._style_codes = {None: _MISSING}
+        self._tab_ids = []
+        self._tab_codes = {None: _MISSING}
+        # full_text를 처음 읽기 전까지 추가된 문단 텍스트
+        self._pieces = []
+        self._text = ''
+        self._size = 0
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, idx):
+        if idx < 0:
+            idx += self._count
+        if not 0 <= idx < self._count:
+            raise IndexError(idx)
+        return Paragraph(self, idx)
+
+    def __iter__(self):
+        return (Paragraph(self, idx) for idx in range(self._count))
+
+    @staticmethod
+    def _code(names, codes, value):
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(names)
+            names.append(value)
+        return code
+
+    def append(self, text, start, end, style=None, tab=None, table_end=None):
+        """문단 하나를 끝에 추가하고 인덱스를 반환 (표 셀 안의 문단이면 table_end에 표 끝 인덱스)"""
+        idx = self._count
+        offset = self._size + 1 if idx else 0
+        length = len(text)
+        style_code = self._style_codes.get(style)
+        if style_code is None:
+            style_code = self._code(self._style_names, self._style_codes, style)
+        tab_code = self._tab_codes.get(tab)
+        if tab_code is None:
+            tab_code = self._code(self._tab_ids, self._tab_codes, tab)
+
+        line_index = self.line_index
+        self._fields.frombytes(_pack_fields(offset, length, start, end, len(line_index), style_code, tab_code))
+        line_index.frombytes(_pack_int(idx) * (text.count('\n') + 1))
+        self._pieces.append(text)
+        if table_end is not None:
+            self.table_ends[idx] = table_end
+        self._size = offset + length
+        self._count = idx + 1
+        return idx
+
+    def append_paragraph(self, paragraph):
+        """다른 목록의 문단을 위치, 스타일, 탭, 표 끝, 첨삭 범위와 함께 끝에 추가 (줄 번호는 이 목록 기준으로 새로 매김)"""
+        idx = self.append(paragraph['text'], paragraph['start'], paragraph['end'],
+                          style=paragraph.get('style'), tab=paragraph.get('tab'), table_end=paragraph.get('table_end'))
+        feedback = paragraph.get('feedback')
+        if feedback is not None:
+            self.extend_feedback(idx, feedback['start'], feedback['end'])
+        return idx
+
+    def extend_feedback(self, idx, start, end):
+        """문단 바로 뒤의 첨삭 글자 범위를 기록 (이어지는 첨삭 문단이면 끝 위치만 늘림)"""
+        start = self.feedback_ranges.get(idx, (start, end))[0]
+        self.feedback_ranges[idx] = (start, end)
+
+    @property
+    def full_text(self):
+        """모든 문단을 줄바꿈으로 이어 붙인 전체 텍스트 (처음 읽을 때 한 번만 만듦)"""
+        if self._pieces:
+            joined = self._count > len(self._pieces)
+            self._text = '\n'.join([self._text] + self._pieces if joined else self._pieces)
+            self._pieces = []
+        return self._text
+
+    def field(self, idx, key):
+        """idx번째 문단의 key 값 (없는 값은 None)"""
+        base = idx * _STRIDE
+        slot = _INT_FIELDS.get(key)
+        if slot is not None:
+            return self._fields[base + slot]
+        if key == 'text':
+            text = self.full_text if self._pieces else self._text
+            offset = self._fields[base + _OFFSET]
+            return text[offset:offset + self._fields[base + _LENGTH]]
+        if key == 'style':
+            code = self._fields[base + _STYLE]
+            return self._style_names[code] if code != _MISSING else None
+        if key == 'tab':
+            code = self._fields[base + _TAB]
+            return self._tab_ids[code] if code != _MISSING else None
+        if key == 'feedback':
+            feedback_range = self.feedback_ranges.get(idx)
+            return {'start': feedback_range[0], 'end': feedback_range[1]} if feedback_range is not None else None
+        if key == 'table_end':
+            return self.table_ends.get(idx)
+        raise KeyError(key)
+
+    def values(self, key):
+        """모든 문단의 key 값 목록 (문단 보기를 하나씩 만들지 않고 배열에서 한 번에 읽음)"""
+        if key in _INT_FIELDS:
+            return self._fields[_INT_FIELDS[key]::_STRIDE].tolist()
+        if key == 'text':
+            text = self.full_text
+            return [text[offset:offset + length]
+                    for offset, length in zip(self._fields[_OFFSET::_STRIDE], self._fields[_LENGTH::_STRIDE])]
+        if key in ('style', 'tab'):
+            # 번호가 _MISSING(-1)이면 목록 끝에 덧붙인 None을 가리킴
+            names = (self._style_names if key == 'style' else self._tab_ids) + [None]
+            return [names[code] for code in self._fields[(_STYLE if key == 'style' else _TAB)::_STRIDE]]
+        if key == 'feedback':
+            return [self.field(idx, 'feedback') for idx in range(self._count)]
+        if key == 'table_end':
+            return [self.table_ends.get(idx) for idx in range(self._count)]
+        raise KeyError(key)
+
+
+def paragraph_values(paragraphs, key):
+    """문단 목록(ParagraphStore 또는 dict 문단 목록)에서 모든 문단의 key 값 목록"""
+    if isinstance(paragraphs, ParagraphStore):
+        return paragraphs.values(key)
+    return [paragraph.get(key) for paragraph in paragraphs]
@@ -0,0 +1,246 @@
+import contextlib
+import random
+import re
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+class RateLimiter:
+    """분당 요청 수(RPM)를 넘지 않도록 호출 간격을 조절하는 스레드 안전 제한기"""
+
+    def __init__(self, requests_per_minute):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute else 0.0
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def acquire(self):
+        """다음 호출 가능 시점까지 대기"""
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+# 재시도할 HTTP 상태 코드와 그중 요청 한도 초과로 보고 동시 실행 수를 줄일 코드
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+THROTTLE_STATUSES = {429, 503}
+
+MAX_RETRIES = 5
+BASE_BACKOFF_SECONDS = 1.0
+MAX_BACKOFF_SECONDS = 60.0
+
+_DURATION_PATTERN = re.compile(r'(\d+(?:\.\d+)?)(ms|s|m|h)')
+_DURATION_UNITS = {'ms': 0.001, 's': 1, 'm': 60, 'h': 3600}
+
+
+class AdaptiveRateController:
+    """동시 호출 수를 AIMD 방식으로 조절하는 스레드 안전 제어기
+
+    처음 429/503 응답을 받기 전까지는 성공할 때마다 1씩(한 바퀴에 두 배로) 빠르게 늘리고,
+    그 뒤로는 한 바퀴에 1씩 늘리며, 429/503 응답을 받으면 절반으로 줄임.
+    Retry-After를 받으면 그 시간 동안 모든 호출을 멈춤
+    """
+
+    def __init__(self, initial_limit=4, min_limit=1, max_limit=16, decrease_factor=0.5):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.decrease_factor = decrease_factor
+        self.limit = float(max(min_limit, min(initial_limit, max_limit)))
+        self.throttled = 0
+        self._slow_start = True
+        self._active = 0
+        self._paused_until = 0.0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        """동시 호출 한도 안에 자리가 나고 일시 정지가 끝날 때까지 대기"""
+        with self._condition:
+            while True:
+                wait = self._paused_until - time.monotonic()
+                if wait <= 0 and self._active < int(self.limit):
+                    self._active += 1
+                    return
+                self._condition.wait(timeout=wait if wait > 0 else None)
+
+    def release(self, outcome='success'):
+        """호출 결과('success', 'throttled', 'failed')에 따라 한도를 조정하고 자리를 반환"""
+        with self._condition:
+            self._active -= 1
+            if outcome == 'success':
+                self.limit = min(self.max_limit, self.limit + (1.0 if self._slow_start else 1.0 / self.limit))
+            elif outcome == 'throttled':
+                self.throttled += 1
+                self._slow_start = False
+                self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+            self._condition.notify_all()
+
+    def pause(self, seconds):
+        """seconds초 동안 새 호출을 시작하지 않음"""
+        with self._condition:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._condition.notify_all()
+
+    def stats(self):
+        with self._condition:
+            return {'limit': int(self.limit), 'active': self._active, 'throttled': self.throttled}
+
+
+def error_status(error):
+    """OpenAI 오류(http_status) 또는 Google API 오류(resp.status)의 HTTP 상태 코드"""
+    status = getattr(error, 'http_status', None)
+    if status is None:
+        status = getattr(getattr(error, 'resp', None), 'status', None)
+    try:
+        return int(status) if status is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_duration(value):
+    """'20', '1.5s', '6m0s', '250ms' 형식의 대기 시간을 초 단위로 변환 (알 수 없으면 None)"""
+    value = str(value).strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PATTERN.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+
+
+def retry_after_seconds(error):
+    """오류 응답 헤더(Retry-After, 요청 한도 초기화 시간)가 알려주는 대기 시간 (없으면 None)
+
+    x-ratelimit-reset-* 헤더는 한도 창 전체가 초기화되는 시간(예: "6m0s")이라 429 응답에서만 사용
+    """
+    headers = getattr(error, 'headers', None)
+    if headers is None:
+        # Google API 오류는 응답 헤더가 resp(dict)에 들어 있음
+        headers = getattr(error, 'resp', None)
+    if not headers:
+        return None
+
+    headers = {str(key).lower(): value for key, value in dict(headers).items()}
+    if 'retry-after-ms' in headers:
+        seconds = parse_duration(headers['retry-after-ms'])
+        return seconds / 1000 if seconds is not None else None
+    keys = ('retry-after',)
+    if error_status(error) == 429:
+        keys += ('x-ratelimit-reset-requests', 'x-ratelimit-reset-tokens')
+    for key in keys:
+        if key in headers:
+            seconds = parse_duration(headers[key])
+            if seconds is not None:
+                return seconds
+    return None
+
+
+def call_with_backoff(func, controller=None, retry_exceptions=(), max_retries=MAX_RETRIES,
+                      base_delay=BASE_BACKOFF_SECONDS, max_delay=MAX_BACKOFF_SECONDS, on_retry=None, admit=None,
+                      hold_slot=False):
+    """func()를 실행하고 429/5xx(및 retry_exceptions) 오류는 지터를 둔 지수 백오프로 재시도
+
+    controller가 있으면 호출마다 자리를 얻고 결과를 알려 동시 실행 수가 할당량을 따라가게 함.
+    admit()은 시도마다 controller의 자리를 얻기 전에 호출됨 (공유 할당량의 공정 대기열을 통과할 때까지 대기,
+    대기열에서 기다리는 동안 동시 실행 자리를 차지하지 않도록 먼저 호출).
+    on_retry(재시도 횟수, 오류, 대기 시간)는 재시도 직전에 호출됨.
+    hold_slot이면 성공한 호출의 자리를 반환하지 않음 (스트리밍 응답처럼 결과를 다 읽을 때까지 자리를 차지하는
+    호출은 holding_slot(controller) 안에서 읽어 끝날 때 반환)
+    """
+    attempt = 0
+    while True:
+        if admit is not None:
+            admit()
+        if controller is not None:
+            controller.acquire()
+        try:
+            result = func()
+        except Exception as e:
+            status = error_status(e)
+            if controller is not None:
+                controller.release('throttled' if status in THROTTLE_STATUSES else 'failed')
+            if attempt >= max_retries or not (status in RETRYABLE_STATUSES or isinstance(e, retry_exceptions)):
+                raise
+
+            delay = retry_after_seconds(e)
+            if delay is not None:
+                # 서버가 알려준 시간 동안은 다른 호출도 멈춤 (프로세스 전체가 오래 멈추지 않도록 max_delay까지만)
+                delay = min(delay, max_delay)
+                if controller is not None:
+                    controller.pause(delay)
+            else:
+                backoff = min(max_delay, base_delay * 2 ** attempt)
+                delay = backoff / 2 + random.uniform(0, backoff / 2)
+
+            attempt += 1
+            if on_retry is not None:
+                on_retry(attempt, e, delay)
+            time.sleep(delay)
+            continue
+
+        if controller is not None and not hold_slot:
+            controller.release('success')
+        return result
+
+
+@contextlib.contextmanager
+def holding_slot(controller):
+    """call_with_backoff(hold_slot=True)로 얻은 controller의 자리를 with 블록이 끝날 때 반환
+
+    블록 안에서 난 오류가 요청 한도 초과(429/503)이면 한도를 줄이고, 서버가 알려준 시간 동안
+    다른 호출도 멈춤 (MAX_BACKOFF_SECONDS까지). 호출한 쪽이 도중에 그만 읽어 블록을 빠져나가면 한도는 바꾸지 않음
+    """
+    if controller is None:
+        yield
+        return
+    outcome = 'failed'
+    try:
+        yield
+        outcome = 'success'
+    except Exception as e:
+        if error_status(e) in THROTTLE_STATUSES:
+            outcome = 'throttled'
+            delay = retry_after_seconds(e)
+            if delay is not None:
+                controller.pause(min(delay, MAX_BACKOFF_SECONDS))
+        raise
+    finally:
+        controller.release(outcome)
+
+
+def run_in_parallel(func, items, max_workers=4, limiter=None, on_tick=None, tick_interval=0.1):
+    """items 각각에 func를 병렬 실행하고 완료되는 순서대로 (인덱스, 결과, 오류)를 반환
+
+    on_tick을 넘기면 작업을 기다리는 동안 tick_interval초마다 호출한 스레드에서 실행됨
+    (다른 작업의 진행 상황을 화면에 그리는 용도)
+    """
+    def call(item):
+        if limiter is not None:
+            limiter.acquire()
+        return func(item)
+
+    items = list(items)
+    if not items:
+        return
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(items)))) as executor:
+        futures = {executor.submit(call, item): idx for idx, item in enumerate(items)}
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=tick_interval if on_tick else None,
+                                 return_when=FIRST_COMPLETED)
+            for future in done:
+                idx = futures[future]
+                try:
+                    yield idx, future.result(), None
+                except Exception as e:
+                    yield idx, None, e
+            if on_tick is not None:
+                on_tick()
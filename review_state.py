@@ -0,0 +1,109 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from google_docs import FEEDBACK_MARKER
+from llm_cache import CACHE_DIR
+
+# 전체 분석을 다시 하지 않고 재사용할 변경 비율 기준 (문서 내용의 20% 미만 변경)
+ANALYSIS_REUSE_THRESHOLD = 0.2
+
+# 줄 맨 앞의 첨삭 표시부터 "]"로 끝나는 줄까지 (닫히지 않은 표시는 그대로 둠)
+_FEEDBACK_BLOCK_PATTERN = re.compile(r'^[ \t]*' + re.escape(FEEDBACK_MARKER) + r'.*?\][ \t]*$', re.M | re.S)
+
+
+def stable_text(text):
+    """앱이 써 넣은 첨삭 블록과 공백, 빈 줄 차이를 뺀 비교용 텍스트 (첨삭을 쓴 뒤 다시 읽어도 같은 값)"""
+    # 대부분의 섹션에는 첨삭 표시가 없으므로 정규식 치환은 표시가 있을 때만 실행
+    if FEEDBACK_MARKER in text:
+        text = _FEEDBACK_BLOCK_PATTERN.sub('', text)
+    # 공백 문자열 단위로 나눠 한 칸 공백으로 다시 이음 (\s+ 치환 후 strip과 같은 결과)
+    return ' '.join(text.split())
+
+
+def section_fingerprint(section):
+    """첨삭과 공백 차이를 무시한 섹션 제목+내용의 지문(SHA-1)"""
+    normalized = stable_text(f"{section['title']}\n{section['content']}")
+    return hashlib.sha1(normalized.encode('utf-8')).hexdigest()
+
+
+def diff_sections(sections, previous_state):
+    """이전 검토 기록과 비교하여 새로 추가되거나 수정된 섹션과 변경 비율을 반환
+
+    수정된 섹션은 새 지문(추가)과 사라진 이전 지문(삭제) 양쪽에 나타나므로, 추가된 양과 삭제된 양 중
+    큰 쪽을 변경량으로 보아 한 번만 셈
+    """
+    previous = {fingerprint: length for fingerprint, length in previous_state['sections']}
+    current = set()
+    changed_sections = []
+    changed_chars = 0
+    total_chars = 0
+
+    for section in sections:
+        fingerprint = section_fingerprint(section)
+        length = len(section['content'])
+        current.add(fingerprint)
+        total_chars += length
+
+        if fingerprint not in previous:
+            changed_sections.append(section)
+            changed_chars += length
+
+    # 삭제된 섹션도 변경량에 포함
+    removed_chars = sum(length for fingerprint, length in previous.items() if fingerprint not in current)
+    change_ratio = max(changed_chars, removed_chars) / max(total_chars, 1)
+
+    return changed_sections, change_ratio
+
+
+class ReviewStateStore:
+    """문서별 마지막 검토 기록(리비전, 섹션 지문, 전체 분석)을 저장하는 SQLite 저장소"""
+
+    def __init__(self, path=None):
+        if path is None:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            path = os.path.join(CACHE_DIR, 'review_state.sqlite3')
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS reviews (
+                document_id TEXT PRIMARY KEY,
+                revision_id TEXT,
+                sections TEXT NOT NULL,
+                full_analysis TEXT,
+                updated_at REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+    def load(self, document_id):
+        """마지막 검토 기록을 반환 (없으면 None)"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT revision_id, sections, full_analysis FROM reviews WHERE document_id = ?",
+                (document_id,)
+            ).fetchone()
+
+        if row is None:
+            return None
+        return {
+            'revision_id': row[0],
+            'sections': json.loads(row[1]),
+            'full_analysis': row[2]
+        }
+
+    def save(self, document_id, revision_id, sections, full_analysis):
+        """이번 검토 결과를 문서의 최신 기록으로 저장"""
+        fingerprints = [[section_fingerprint(section), len(section['content'])] for section in sections]
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO reviews (document_id, revision_id, sections, full_analysis, updated_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (document_id, revision_id, json.dumps(fingerprints), full_analysis, time.time())
+            )
+            self._conn.commit()
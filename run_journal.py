@@ -0,0 +1,136 @@
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+from llm_cache import CACHE_DIR
+
+RUNNING = 'running'
+COMPLETE = 'complete'
+
+# 끝나지 않은 실행 기록을 보관하는 기간 (이보다 오래된 기록은 이어서 실행하지 않음)
+JOURNAL_TTL_SECONDS = 7 * 24 * 60 * 60
+
+
+class JournalRun:
+    """실행 하나의 체크포인트 (이전에 끝나지 않은 실행에서 이어받은 결과 포함)
+
+    feedbacks: 이미 생성된 {섹션 지문 또는 분석 키: 응답}, applied: 이미 문서에 삽입된 섹션 지문 집합
+    """
+
+    def __init__(self, journal, run_id, feedbacks, applied):
+        self._journal = journal
+        self.run_id = run_id
+        self.feedbacks = feedbacks
+        self.applied = applied
+
+    def record_feedback(self, fingerprint, feedback):
+        """생성한 섹션 피드백을 바로 기록"""
+        self.feedbacks[fingerprint] = feedback
+        self._journal._record_feedback(self.run_id, fingerprint, feedback)
+
+    def record_applied(self, fingerprints, revision_id):
+        """batchUpdate 하나가 적용된 직후 삽입된 섹션과 결과 리비전을 기록"""
+        self.applied.update(fingerprints)
+        self._journal._record_applied(self.run_id, fingerprints, revision_id)
+
+    def complete(self):
+        """실행이 끝까지 완료되었음을 기록 (같은 문서의 끝나지 않은 이전 실행도 함께 종료)"""
+        self._journal._complete(self.run_id)
+
+
+class RunJournal:
+    """문서 ID와 리비전별로 생성한 피드백과 적용한 삽입을 기록하는 SQLite 실행 기록
+
+    실행이 도중에 끊기면 다음 실행이 이미 생성한 피드백을 재사용하고 이미 삽입한 섹션은 건너뜀.
+    삽입된 첨삭 문단은 섹션 내용에서 제외되므로 섹션 지문은 쓰기 전후에 같게 유지됨
+    """
+
+    def __init__(self, path=None):
+        if path is None:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            path = os.path.join(CACHE_DIR, 'run_journal.sqlite3')
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS runs (
+                run_id TEXT PRIMARY KEY,
+                document_id TEXT NOT NULL,
+                base_revision TEXT,
+                last_revision TEXT,
+                status TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS runs_document ON runs (document_id, status);
+            CREATE TABLE IF NOT EXISTS entries (
+                run_id TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                feedback TEXT,
+                applied INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (run_id, fingerprint)
+            );
+        """)
+        self._conn.commit()
+
+    def begin(self, document_id, revision_id):
+        """새 실행을 시작하고, 같은 문서의 끝나지 않은 실행에서 생성/삽입한 결과를 이어받음"""
+        run_id = uuid.uuid4().hex[:12]
+        now = time.time()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT e.fingerprint, e.feedback, e.applied FROM entries e JOIN runs r ON e.run_id = r.run_id "
+                "WHERE r.document_id = ? AND r.status = ? AND r.updated_at > ? ORDER BY r.updated_at",
+                (document_id, RUNNING, now - JOURNAL_TTL_SECONDS)
+            ).fetchall()
+            self._conn.execute(
+                "INSERT INTO runs (run_id, document_id, base_revision, last_revision, status, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (run_id, document_id, revision_id, revision_id, RUNNING, now, now)
+            )
+            self._conn.commit()
+
+        feedbacks = {fingerprint: feedback for fingerprint, feedback, _ in rows if feedback}
+        applied = {fingerprint for fingerprint, _, is_applied in rows if is_applied}
+        return JournalRun(self, run_id, feedbacks, applied)
+
+    def _record_feedback(self, run_id, fingerprint, feedback):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO entries (run_id, fingerprint, feedback) VALUES (?, ?, ?) "
+                "ON CONFLICT (run_id, fingerprint) DO UPDATE SET feedback = excluded.feedback",
+                (run_id, fingerprint, feedback)
+            )
+            self._conn.execute("UPDATE runs SET updated_at = ? WHERE run_id = ?", (time.time(), run_id))
+            self._conn.commit()
+
+    def _record_applied(self, run_id, fingerprints, revision_id):
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO entries (run_id, fingerprint, applied) VALUES (?, ?, 1) "
+                "ON CONFLICT (run_id, fingerprint) DO UPDATE SET applied = 1",
+                [(run_id, fingerprint) for fingerprint in fingerprints]
+            )
+            self._conn.execute(
+                "UPDATE runs SET last_revision = ?, updated_at = ? WHERE run_id = ?",
+                (revision_id, time.time(), run_id)
+            )
+            self._conn.commit()
+
+    def _complete(self, run_id):
+        with self._lock:
+            document_id = self._conn.execute(
+                "SELECT document_id FROM runs WHERE run_id = ?", (run_id,)
+            ).fetchone()[0]
+            self._conn.execute(
+                "UPDATE runs SET status = ?, updated_at = ? WHERE document_id = ? AND status = ?",
+                (COMPLETE, time.time(), document_id, RUNNING)
+            )
+            # 완료된 실행의 섹션별 기록은 더 이상 필요 없음
+            self._conn.execute(
+                "DELETE FROM entries WHERE run_id IN (SELECT run_id FROM runs WHERE document_id = ? AND status = ?)",
+                (document_id, COMPLETE)
+            )
+            self._conn.commit()
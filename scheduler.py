@@ -0,0 +1,170 @@
+import functools
+import itertools
+import threading
+import time
+from collections import deque
+
+# 공유 키/서비스 계정의 기본 전역 한도 (계정 등급에 맞게 secrets에서 조정)
+DEFAULT_OPENAI_RPM = 500
+DEFAULT_OPENAI_TPM = 200_000
+DEFAULT_DOCS_RPM = 300
+
+# 한 번에 몰아 쓸 수 있는 예산 (몇 초 분량) - 분당 한도를 한꺼번에 쓰면 곧바로 429가 나므로 작게 둠
+BURST_SECONDS = 10
+
+# 최근 사용량을 집계하는 구간(초)
+USAGE_WINDOW_SECONDS = 60
+
+
+class TokenBucket:
+    """분당 한도를 초마다 조금씩 채워지는 버킷으로 관리 (최대 burst_seconds 분량까지 모아 둠)
+
+    버킷 용량보다 큰 요청은 버킷이 가득 찼을 때 통과시키고 모자란 만큼은 다음 요청이 기다림
+    """
+
+    def __init__(self, per_minute, burst_seconds=BURST_SECONDS):
+        self.rate = per_minute / 60.0
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self.level = self.capacity
+        self._updated = time.monotonic()
+
+    def refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, cost):
+        """cost만큼 쓸 수 있을 때까지 남은 시간(초)"""
+        shortage = min(cost, self.capacity) - self.level
+        return shortage / self.rate if shortage > 0 else 0.0
+
+    def drain_time(self, cost):
+        """지금 남은 양으로 시작해 cost를 모두 쓸 때까지 걸리는 시간(초)"""
+        shortage = cost - self.level
+        return shortage / self.rate if shortage > 0 else 0.0
+
+    def take(self, cost):
+        self.level -= cost
+
+
+class FairScheduler:
+    """여러 세션이 공유하는 API 할당량을 사용자별 공정 대기열로 나누어 쓰는 스레드 안전 스케줄러
+
+    요청은 사용자별 대기열에 들어가고, 전역 분당 요청 수(RPM)와 토큰 수(TPM) 예산이 남을 때
+    시작 시각 공정 대기(start-time fair queuing) 순서로 한 건씩 통과함. 사용자의 순번은 통과시킨
+    토큰 양만큼 뒤로 밀리므로, 긴 문서를 요청한 사용자가 있어도 다른 사용자의 요청이 번갈아 통과함
+    """
+
+    def __init__(self, requests_per_minute, tokens_per_minute=None, burst_seconds=BURST_SECONDS):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._requests = TokenBucket(requests_per_minute, burst_seconds)
+        self._tokens = TokenBucket(tokens_per_minute, burst_seconds) if tokens_per_minute else None
+        self._condition = threading.Condition()
+        self._queues = {}
+        self._finish_tags = {}
+        self._virtual_time = 0.0
+        self._sequence = itertools.count()
+        self._usage = deque()
+
+    def for_user(self, user):
+        """user의 요청을 대기열에 넣고 통과할 때까지 기다리는 함수 admit(tokens=0)"""
+        return functools.partial(self.acquire, user)
+
+    def acquire(self, user, tokens=0):
+        """user의 차례가 되고 전역 예산이 남을 때까지 대기하고 기다린 시간(초)을 반환
+
+        tokens: 요청이 쓸 토큰 추정치 (입력 + 최대 출력 토큰, OpenAI가 한도를 계산하는 방식과 같음)
+        """
+        started = time.monotonic()
+        with self._condition:
+            ticket = self._enqueue(user, tokens)
+            while not ticket['admitted']:
+                wait = self._dispatch()
+                if ticket['admitted']:
+                    break
+                self._condition.wait(timeout=wait)
+        return time.monotonic() - started
+
+    def _enqueue(self, user, tokens):
+        # 쉬고 있던 사용자는 현재 순번부터 시작하므로, 쉬는 동안 쌓인 몫으로 다른 사용자를 앞지르지 않음
+        cost = max(tokens, 1) if self._tokens is not None else 1
+        start = max(self._virtual_time, self._finish_tags.get(user, 0.0))
+        self._finish_tags[user] = start + cost
+        ticket = {'user': user, 'tokens': tokens, 'start': start, 'seq': next(self._sequence), 'admitted': False}
+        self._queues.setdefault(user, deque()).append(ticket)
+        return ticket
+
+    def _dispatch(self):
+        """예산이 허락하는 만큼 순번이 가장 빠른 요청을 통과시키고, 다음 요청까지 기다릴 시간을 반환"""
+        now = time.monotonic()
+        self._requests.refill(now)
+        if self._tokens is not None:
+            self._tokens.refill(now)
+
+        while self._queues:
+            queue = min(self._queues.values(), key=lambda q: (q[0]['start'], q[0]['seq']))
+            ticket = queue[0]
+            wait = self._requests.wait_time(1)
+            if self._tokens is not None:
+                wait = max(wait, self._tokens.wait_time(ticket['tokens']))
+            if wait > 0:
+                return wait
+
+            self._requests.take(1)
+            if self._tokens is not None:
+                self._tokens.take(ticket['tokens'])
+            self._virtual_time = ticket['start']
+            self._usage.append((now, ticket['tokens']))
+            queue.popleft()
+            if not queue:
+                del self._queues[ticket['user']]
+            ticket['admitted'] = True
+            self._condition.notify_all()
+
+        # 대기열이 비면 순번 기록도 필요 없음 (다음 요청부터 새로 시작)
+        self._finish_tags.clear()
+        self._virtual_time = 0.0
+        return None
+
+    def status(self, user=None):
+        """대기 상태 요약 (사이드바 표시용)
+
+        queued: 전체 대기 요청 수, users: 대기 중인 사용자 수, recent_requests / recent_tokens: 최근 1분 사용량.
+        user를 넘기면 waiting(그 사용자의 대기 요청 수), position(앞선 요청 수, 대기 중이 아니면 None),
+        expected_wait(첫 요청이 통과할 때까지의 예상 시간, 초)도 포함
+        """
+        with self._condition:
+            now = time.monotonic()
+            self._requests.refill(now)
+            if self._tokens is not None:
+                self._tokens.refill(now)
+            while self._usage and self._usage[0][0] < now - USAGE_WINDOW_SECONDS:
+                self._usage.popleft()
+
+            tickets = [ticket for queue in self._queues.values() for ticket in queue]
+            status = {
+                'queued': len(tickets),
+                'users': len(self._queues),
+                'recent_requests': len(self._usage),
+                'recent_tokens': sum(tokens for _, tokens in self._usage),
+                'requests_per_minute': self.requests_per_minute,
+                'tokens_per_minute': self.tokens_per_minute
+            }
+            if user is None:
+                return status
+
+            own = self._queues.get(user)
+            status['waiting'] = len(own) if own else 0
+            status['position'] = None
+            status['expected_wait'] = 0.0
+            if own:
+                first = (own[0]['start'], own[0]['seq'])
+                ahead = [ticket for ticket in tickets if (ticket['start'], ticket['seq']) < first]
+                status['position'] = len(ahead)
+                # 앞선 요청과 자기 첫 요청을 모두 통과시키는 데 필요한 예산이 채워지는 시간
+                expected_wait = self._requests.drain_time(len(ahead) + 1)
+                if self._tokens is not None:
+                    expected_wait = max(expected_wait, self._tokens.drain_time(
+                        sum(ticket['tokens'] for ticket in ahead) + own[0]['tokens']))
+                status['expected_wait'] = expected_wait
+            return status
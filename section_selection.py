@@ -0,0 +1,138 @@
+import math
+import re
+import statistics
+
+# 첨삭할 섹션을 고를 때 쓰는 로컬 신호의 가중치 (합이 1)
+SCORE_WEIGHTS = {
+    'length': 0.35,
+    'sentence_variance': 0.2,
+    'repetition': 0.2,
+    'heading': 0.25,
+}
+
+# 이 길이(글자 수)에서 길이 점수가 최대가 됨 (로그 척도, 그 이상은 차이를 두지 않음)
+LENGTH_SATURATION = 2000
+
+# 문장 길이 변동계수, 반복 단어 비율이 이 값 이상이면 해당 점수가 최대
+SENTENCE_VARIANCE_SATURATION = 1.0
+REPETITION_SATURATION = 0.5
+
+# 제목 수준별 중요도 (스타일이 없는 문서는 None)
+HEADING_LEVEL_WEIGHTS = {0: 1.0, 1: 1.0, 2: 0.8, 3: 0.6}
+DEEP_HEADING_WEIGHT = 0.5
+UNKNOWN_HEADING_WEIGHT = 0.7
+
+# 제목에 들어 있으면 가장 중요한 섹션으로 보는 단어 (글의 주장과 결론이 모이는 섹션)
+KEY_HEADING_WORDS = ('서론', '결론', '요약', '논의', '결과', '고찰', '제언', '초록',
+                     'abstract', 'introduction', 'conclusion', 'discussion', 'summary')
+
+# 같은 장(chapter)에서 섹션을 하나 더 고를 때마다 점수에 곱하는 값 (문서 전체에 고르게 첨삭)
+CHAPTER_DECAY = 0.6
+
+# 섹션 요청 하나의 예상 소요 시간 = 기본 지연 + 출력 토큰 / 생성 속도 (gpt-4o-mini 기준)
+BASE_CALL_SECONDS = 1.0
+OUTPUT_TOKENS_PER_SECOND = 80
+
+BUDGET_KINDS = ('calls', 'tokens', 'seconds')
+
+_SENTENCE_PATTERN = re.compile(r'(?<=[.!?。])\s+|\n+')
+_WORD_PATTERN = re.compile(r'\w{2,}')
+_CHAPTER_PATTERN = re.compile(r'^\s*\[?(\d+|[IVX]+)[.)\]]')
+_SPLIT_SUFFIX_PATTERN = re.compile(r' \((?:전반부|후반부)\)$')
+
+
+def sentence_variance(text):
+    """문장 길이의 변동계수 (너무 길거나 짧은 문장이 섞일수록 큼, 문장이 하나면 0)"""
+    lengths = [len(sentence) for sentence in _SENTENCE_PATTERN.split(text) if sentence.strip()]
+    if len(lengths) < 2:
+        return 0.0
+    return statistics.pstdev(lengths) / statistics.mean(lengths)
+
+
+def repetition_ratio(text):
+    """같은 단어가 되풀이된 비율 (0이면 모든 단어가 서로 다름)"""
+    words = _WORD_PATTERN.findall(text.lower())
+    if not words:
+        return 0.0
+    return 1.0 - len(set(words)) / len(words)
+
+
+def heading_importance(section):
+    """제목 수준과 제목 단어로 본 섹션 중요도 (0~1)"""
+    title = section['title'].lower()
+    if any(word in title for word in KEY_HEADING_WORDS):
+        return 1.0
+    level = section.get('level')
+    if level is None:
+        return UNKNOWN_HEADING_WEIGHT
+    return HEADING_LEVEL_WEIGHTS.get(level, DEEP_HEADING_WEIGHT)
+
+
+def score_section(section):
+    """API 호출 없이 계산한 섹션의 첨삭 우선순위 점수 (0~1)"""
+    content = section['content']
+    signals = {
+        'length': min(1.0, math.log1p(len(content.strip())) / math.log1p(LENGTH_SATURATION)),
+        'sentence_variance': min(1.0, sentence_variance(content) / SENTENCE_VARIANCE_SATURATION),
+        'repetition': min(1.0, repetition_ratio(content) / REPETITION_SATURATION),
+        'heading': heading_importance(section),
+    }
+    return sum(SCORE_WEIGHTS[name] * value for name, value in signals.items())
+
+
+def chapter_keys(sections):
+    """섹션별 장(chapter) 구분 값 - 번호 제목("3.", "3.2")은 첫 번호, 가장 높은 제목 수준은 제목 자체
+
+    하위 제목과 나뉜 섹션("(전반부)", "(후반부)")은 앞 섹션과 같은 장으로 봄
+    """
+    top_level = min((s['level'] for s in sections if s.get('level') is not None), default=None)
+    keys = []
+    current = None
+    for section in sections:
+        title = _SPLIT_SUFFIX_PATTERN.sub('', section['title'])
+        match = _CHAPTER_PATTERN.match(title)
+        if match:
+            current = match.group(1)
+        elif current is None or section.get('level') is None or section['level'] <= top_level:
+            current = title
+        keys.append(current)
+    return keys
+
+
+def estimate_call_seconds(output_tokens, max_workers=1):
+    """섹션 요청 하나가 전체 소요 시간에 더하는 예상 시간 (max_workers개를 동시에 요청)"""
+    return (BASE_CALL_SECONDS + output_tokens / OUTPUT_TOKENS_PER_SECOND) / max(1, max_workers)
+
+
+def select_within_budget(sections, budget, request_tokens, output_tokens, max_workers=1):
+    """점수 대비 비용이 큰 섹션부터 예산 안에서 골라 문서 순서대로 반환
+
+    budget: {'calls': 요청 수, 'tokens': 입력 + 출력 토큰, 'seconds': 예상 소요 시간} 중 하나 이상 (없는 항목은 제한 없음).
+    request_tokens(섹션)는 요청 하나의 입력 + 최대 출력 토큰, output_tokens는 요청 하나의 최대 출력 토큰.
+    같은 장에서 섹션을 더 고를수록 점수를 줄여 앞부분 장에만 몰리지 않도록 함
+    """
+    limits = {kind: budget[kind] for kind in BUDGET_KINDS if budget.get(kind)}
+    seconds = estimate_call_seconds(output_tokens, max_workers)
+    candidates = []
+    for idx, (section, chapter) in enumerate(zip(sections, chapter_keys(sections))):
+        cost = {'calls': 1, 'tokens': request_tokens(section), 'seconds': seconds}
+        # 예산 항목별로 한도 대비 비율을 더한 값을 비용으로 씀 (제한이 없으면 요청 수 기준)
+        weight = sum(cost[kind] / limit for kind, limit in limits.items()) if limits else 1.0
+        candidates.append({'idx': idx, 'score': score_section(section), 'chapter': chapter,
+                           'cost': cost, 'weight': weight})
+
+    spent = dict.fromkeys(BUDGET_KINDS, 0)
+    chapter_counts = {}
+    selected = []
+    while candidates:
+        best = max(candidates, key=lambda c: c['score'] * CHAPTER_DECAY ** chapter_counts.get(c['chapter'], 0)
+                   / c['weight'])
+        candidates.remove(best)
+        if any(spent[kind] + best['cost'][kind] > limit for kind, limit in limits.items()):
+            continue
+        for kind in BUDGET_KINDS:
+            spent[kind] += best['cost'][kind]
+        chapter_counts[best['chapter']] = chapter_counts.get(best['chapter'], 0) + 1
+        selected.append(best['idx'])
+
+    return [sections[idx] for idx in sorted(selected)], spent
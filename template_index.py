@@ -0,0 +1,173 @@
+import hashlib
+import random
+import re
+
+from document_structure import HEADING_STYLES, is_title_line
+from google_docs import ParsedDocumentCache, get_document_content
+from paragraph_store import ParagraphStore
+
+# 문단을 나눌 문자 n-gram 길이 (한국어는 띄어쓰기 단위가 길어 문자 단위가 변화에 덜 민감함)
+SHINGLE_SIZE = 5
+
+# MinHash 순열 수와 LSH 밴드 수 (밴드당 4행 → 유사도 약 0.5 이상이면 후보)
+NUM_PERMUTATIONS = 64
+LSH_BANDS = 16
+
+# 후보 중 추정 Jaccard 유사도가 이 값 이상이면 템플릿 문단으로 판단
+SIMILARITY_THRESHOLD = 0.8
+
+# MinHash 해시 함수 (a * x + b) mod p 의 소수와 계수 생성 시드 (프로세스가 달라도 같은 값)
+_MERSENNE_PRIME = (1 << 61) - 1
+_PERMUTATION_SEED = 20240601
+
+_WHITESPACE_PATTERN = re.compile(r'\s+')
+
+
+def normalize_text(text):
+    """공백 차이를 무시하도록 연속 공백을 하나로 줄인 문단 텍스트"""
+    return _WHITESPACE_PATTERN.sub(' ', text).strip()
+
+
+def stable_hash(text):
+    """실행마다 달라지는 hash() 대신 쓰는 64비트 해시"""
+    return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def shingles(text, size=SHINGLE_SIZE):
+    """정규화한 텍스트의 문자 n-gram 해시 집합"""
+    normalized = normalize_text(text)
+    if len(normalized) <= size:
+        return {stable_hash(normalized)}
+    return {stable_hash(normalized[i:i + size]) for i in range(len(normalized) - size + 1)}
+
+
+def _permutations(count):
+    rng = random.Random(_PERMUTATION_SEED)
+    return [(rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME)) for _ in range(count)]
+
+
+_PERMUTATIONS = _permutations(NUM_PERMUTATIONS)
+
+
+def minhash_signature(shingle_set):
+    """n-gram 해시 집합의 MinHash 서명"""
+    return tuple(min((a * value + b) % _MERSENNE_PRIME for value in shingle_set) for a, b in _PERMUTATIONS)
+
+
+def is_heading_paragraph(paragraph):
+    """문서 구조를 정하는 제목 문단인지 확인 (템플릿과 같아도 섹션 구분을 위해 남김)"""
+    return paragraph.get('style') in HEADING_STYLES or is_title_line(paragraph['text'].strip())
+
+
+class TemplateIndex:
+    """기준(템플릿) 문서의 문단 지문과 MinHash LSH 색인
+
+    학생 제출물의 문단이 템플릿 문단과 같거나 거의 같으면(안내문, 문항 설명 등) 템플릿으로 판단
+    """
+
+    def __init__(self, threshold=SIMILARITY_THRESHOLD, bands=LSH_BANDS):
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = NUM_PERMUTATIONS // bands
+        self._exact = set()
+        self._shingles = set()
+        self._signatures = []
+        self._buckets = {}
+
+    def __len__(self):
+        return len(self._exact)
+
+    @classmethod
+    def from_paragraphs(cls, content_with_positions, **kwargs):
+        """parse_document의 문단 목록으로 색인 생성 (제목 문단은 제외)"""
+        index = cls(**kwargs)
+        for paragraph in content_with_positions:
+            if not is_heading_paragraph(paragraph):
+                index.add(paragraph['text'])
+        return index
+
+    def _bands(self, signature):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows]
+
+    def add(self, text):
+        """템플릿 문단 하나를 색인에 추가"""
+        normalized = normalize_text(text)
+        if not normalized or stable_hash(normalized) in self._exact:
+            return
+        self._exact.add(stable_hash(normalized))
+
+        shingle_set = shingles(normalized)
+        self._shingles.update(shingle_set)
+        signature = minhash_signature(shingle_set)
+        position = len(self._signatures)
+        self._signatures.append(signature)
+        for key in self._bands(signature):
+            self._buckets.setdefault(key, []).append(position)
+
+    def similarity(self, text):
+        """색인된 템플릿 문단과의 최대 추정 Jaccard 유사도 (같은 문단이면 1.0)"""
+        normalized = normalize_text(text)
+        if not normalized:
+            return 0.0
+        if stable_hash(normalized) in self._exact:
+            return 1.0
+
+        # 템플릿 전체와 겹치는 n-gram 비율은 어떤 템플릿 문단과의 Jaccard 유사도보다 크거나 같으므로,
+        # 이 비율이 기준보다 낮은 문단(대부분의 작성 내용)은 MinHash 계산 없이 바로 제외
+        shingle_set = shingles(normalized)
+        overlap = len(shingle_set & self._shingles) / len(shingle_set)
+        if overlap < self.threshold:
+            return overlap
+
+        signature = minhash_signature(shingle_set)
+        candidates = set()
+        for key in self._bands(signature):
+            candidates.update(self._buckets.get(key, ()))
+
+        best = 0.0
+        for position in candidates:
+            agreement = sum(1 for x, y in zip(signature, self._signatures[position]) if x == y)
+            best = max(best, agreement / len(signature))
+        return best
+
+    def matches(self, text):
+        """문단이 템플릿 문단과 같거나 거의 같은지 확인"""
+        return self.similarity(text) >= self.threshold
+
+
+def strip_template_paragraphs(content_with_positions, template):
+    """템플릿과 같은 본문 문단을 뺀 (문단 목록, 전체 텍스트, 줄 번호 → 문단 인덱스, 제외한 문단 수) 반환
+
+    제목 문단은 템플릿과 같아도 남겨 섹션 구분을 유지하고, 문서 위치(start, end)는 그대로 두어
+    첨삭이 학생이 쓴 마지막 문단 뒤에 삽입되도록 함
+    """
+    paragraphs = ParagraphStore()
+    removed = 0
+
+    for paragraph in content_with_positions:
+        if not is_heading_paragraph(paragraph) and template.matches(paragraph['text']):
+            removed += 1
+            continue
+        paragraphs.append_paragraph(paragraph)
+
+    return paragraphs, paragraphs.full_text, paragraphs.line_index, removed
+
+
+# 템플릿 문서별(문서 ID, 리비전 ID) 색인 (여러 제출물에서 한 번 만든 색인을 재사용)
+template_cache = ParsedDocumentCache()
+
+
+def load_template(service, document_id, on_error=None, trace=None, admit=None):
+    """템플릿 문서를 문서와 같은 파서로 읽어 TemplateIndex를 반환 (실패하면 None)"""
+    _, content_with_positions, _, revision_id, _ = get_document_content(service, document_id, on_error=on_error,
+                                                                        trace=trace, admit=admit)
+    if not content_with_positions:
+        return None
+
+    template = template_cache.get(document_id, revision_id)
+    if template is None:
+        template = TemplateIndex.from_paragraphs(content_with_positions)
+        if revision_id:
+            template_cache.set(document_id, revision_id, template)
+    return template
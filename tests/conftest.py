@@ -0,0 +1,20 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 저장소 루트의 모듈과 benchmarks/fakes.py의 가짜 Docs / OpenAI 서비스를 가져올 수 있도록 경로 추가
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+
+@pytest.fixture(autouse=True)
+def clear_document_cache():
+    """테스트마다 같은 문서 ID와 리비전을 쓰므로 이전 테스트의 파싱 결과를 재사용하지 않도록 비움"""
+    import google_docs
+
+    google_docs.document_cache.clear()
+    yield
+    google_docs.document_cache.clear()
@@ -0,0 +1,116 @@
+import pytest
+
+import google_docs
+from fakes import FakeChatCompletion, FakeDocsService, document_text, make_document
+from feedback_pipeline import run_document_feedback
+from google_docs import FEEDBACK_MARKER
+from instrumentation import FIRST_TOKEN_SPAN, RunTrace
+from llm_client import LLMClient
+from review_state import ReviewStateStore
+from run_journal import RunJournal
+
+
+@pytest.fixture
+def completion():
+    return FakeChatCompletion(latency=0.0, tokens_per_second=1e9, completion_tokens=5)
+
+
+def run(docs_service, completion, review_store, **kwargs):
+    llm_client = LLMClient('gpt-4o-mini', create_completion=completion)
+    return run_document_feedback(docs_service, llm_client, 'doc', '연구 보고서', '종합적 피드백',
+                                 review_store=review_store, **kwargs)
+
+
+@pytest.mark.parametrize('use_heading_styles', [True, False])
+def test_rerun_on_unchanged_document_adds_nothing(tmp_path, completion, use_heading_styles):
+    documents = {'doc': make_document(2, 5)}
+    docs_service = FakeDocsService(documents)
+    review_store = ReviewStateStore(str(tmp_path / 'review_state.sqlite3'))
+
+    first = run(docs_service, completion, review_store, use_heading_styles=use_heading_styles)
+    assert first['status'] == 'ok' and first['feedback_added'] > 0
+    calls = completion.calls
+
+    for _ in range(2):
+        again = run(docs_service, completion, review_store, use_heading_styles=use_heading_styles)
+        assert again['status'] == 'unchanged'
+        assert again['changed_sections'] == 0
+        assert again['change_ratio'] == 0.0
+        assert again['feedback_added'] == 0
+
+    assert completion.calls == calls
+    assert document_text(documents['doc']).count(FEEDBACK_MARKER) == first['feedback_added']
+
+
+def test_resume_after_interrupted_write_reuses_analysis(tmp_path, completion, monkeypatch):
+    documents = {'doc': make_document(6, 3)}
+    docs_service = FakeDocsService(documents)
+    journal = RunJournal(str(tmp_path / 'journal.sqlite3'))
+    # batchUpdate 하나에 삽입 하나씩 보내고 두 번째 batch에서 연결이 끊긴 상황
+    monkeypatch.setattr(google_docs, 'MAX_INSERTIONS_PER_BATCH', 1)
+    batch_update = docs_service.batchUpdate
+
+    def flaky_batch_update(documentId, body):
+        if docs_service.batch_calls >= 2:
+            raise RuntimeError('network down')
+        return batch_update(documentId, body)
+
+    monkeypatch.setattr(docs_service, 'batchUpdate', flaky_batch_update)
+    first = run(docs_service, completion, None, journal=journal)
+    assert first['status'] == 'error' and first['feedback_added'] == 2
+    calls = completion.calls
+
+    monkeypatch.setattr(docs_service, 'batchUpdate', batch_update)
+    resumed = run(docs_service, completion, None, journal=journal)
+
+    assert resumed['status'] == 'ok'
+    assert resumed['already_inserted'] == 2
+    assert resumed['feedback_added'] == first['reviewed_sections'] - 2
+    # 섹션 피드백과 전체 분석 모두 실행 기록에서 재사용
+    assert completion.calls == calls
+    assert document_text(documents['doc']).count(FEEDBACK_MARKER) == first['reviewed_sections']
+
+
+def test_resume_after_lost_batch_response_does_not_duplicate(tmp_path, completion, monkeypatch):
+    documents = {'doc': make_document(6, 3)}
+    docs_service = FakeDocsService(documents)
+    journal = RunJournal(str(tmp_path / 'journal.sqlite3'))
+    monkeypatch.setattr(google_docs, 'MAX_INSERTIONS_PER_BATCH', 1)
+    batch_update = docs_service.batchUpdate
+
+    class LostResponse:
+        """문서에는 적용되지만 응답을 받기 전에 시간 초과가 나는 요청"""
+
+        def __init__(self, request):
+            self._request = request
+
+        def execute(self, *args, **kwargs):
+            self._request.execute()
+            raise TimeoutError('response lost')
+
+    def flaky_batch_update(documentId, body):
+        request = batch_update(documentId, body)
+        return LostResponse(request) if docs_service.batch_calls == 1 else request
+
+    monkeypatch.setattr(docs_service, 'batchUpdate', flaky_batch_update)
+    first = run(docs_service, completion, None, journal=journal)
+    assert first['status'] == 'error' and first['feedback_added'] == 1
+    assert document_text(documents['doc']).count(FEEDBACK_MARKER) == 2
+
+    monkeypatch.setattr(docs_service, 'batchUpdate', batch_update)
+    resumed = run(docs_service, completion, None, journal=journal)
+
+    assert resumed['status'] == 'ok'
+    assert resumed['already_inserted'] == 2
+    assert document_text(documents['doc']).count(FEEDBACK_MARKER) == first['reviewed_sections']
+
+
+def test_streamed_analysis_records_time_to_first_token_in_trace(completion):
+    docs_service = FakeDocsService({'doc': make_document(2, 3)})
+    trace = RunTrace()
+    result = run(docs_service, completion, None, trace=trace, stream_analysis=True)
+
+    assert result['status'] == 'ok' and result['time_to_first_token'] is not None
+    spans = [span for span in trace.spans if span['name'] == FIRST_TOKEN_SPAN]
+    assert len(spans) == 1
+    assert trace.totals()['time_to_first_token_s'] == spans[0]['duration']
@@ -0,0 +1,175 @@
+import copy
+
+import pytest
+
+import google_docs
+from document_structure import analyze_document_sections
+from fakes import FakeDocsService, apply_document_requests, document_text, make_document, make_tabbed_document
+from feedback_pipeline import plan_insertions
+from google_docs import (FEEDBACK_MARKER, build_feedback_requests, get_document_content, insert_feedbacks_to_doc,
+                         parse_document, plan_feedback_batches)
+
+
+def write_feedback(document, sections, content_with_positions, line_index, feedback='좋습니다.', replace=False):
+    """섹션마다 첨삭을 계획해 batch 순서대로 문서에 적용하고 삽입 목록을 반환"""
+    insertions, _ = plan_insertions(sections, [feedback] * len(sections), content_with_positions, line_index,
+                                    replace_existing=replace)
+    for batch in plan_feedback_batches(insertions):
+        apply_document_requests(document, [request for _, requests in batch for request in requests])
+    return insertions
+
+
+def test_plan_feedback_batches_applies_later_indices_first():
+    insertions = [{'index': index, 'feedback': f'피드백 {index}'} for index in (10, 300, 42)]
+    batches = plan_feedback_batches(insertions)
+
+    assert [insertion['index'] for batch in batches for insertion, _ in batch] == [300, 42, 10]
+
+
+def test_plan_feedback_batches_orders_within_each_tab():
+    insertions = [{'index': 5, 'feedback': 'a', 'tab_id': 't.0'}, {'index': 50, 'feedback': 'b', 'tab_id': 't.1'},
+                  {'index': 70, 'feedback': 'c', 'tab_id': 't.0'}, {'index': 8, 'feedback': 'd', 'tab_id': 't.1'}]
+    order = [(insertion['tab_id'], insertion['index'])
+             for batch in plan_feedback_batches(insertions) for insertion, _ in batch]
+
+    for tab_id in ('t.0', 't.1'):
+        indices = [index for tab, index in order if tab == tab_id]
+        assert indices == sorted(indices, reverse=True)
+
+
+def test_plan_feedback_batches_respects_count_and_payload_limits(monkeypatch):
+    insertions = [{'index': index, 'feedback': '가' * 100} for index in range(1, 8)]
+
+    monkeypatch.setattr(google_docs, 'MAX_INSERTIONS_PER_BATCH', 3)
+    assert [len(batch) for batch in plan_feedback_batches(insertions)] == [3, 3, 1]
+
+    monkeypatch.setattr(google_docs, 'MAX_INSERTIONS_PER_BATCH', 200)
+    size = len(str(build_feedback_requests(insertions[0])).encode('utf-8'))
+    monkeypatch.setattr(google_docs, 'MAX_BATCH_PAYLOAD_BYTES', size * 2)
+    assert all(len(batch) <= 2 for batch in plan_feedback_batches(insertions))
+
+
+def test_parse_document_is_unchanged_by_inserted_feedback():
+    document = make_document(3, 4)
+    _, content_with_positions, full_text, _, line_index = parse_document(document)
+    sections = analyze_document_sections(content_with_positions, full_text)
+    write_feedback(document, sections, content_with_positions, line_index)
+
+    _, new_content, new_full_text, _, new_line_index = parse_document(document)
+
+    assert new_full_text == full_text
+    assert list(new_line_index) == list(line_index)
+    assert [para['text'] for para in new_content] == [para['text'] for para in content_with_positions]
+    assert analyze_document_sections(new_content, new_full_text) == sections
+
+
+def test_inserted_feedback_lands_after_each_section():
+    document = make_document(3, 4)
+    _, content_with_positions, full_text, _, line_index = parse_document(document)
+    sections = analyze_document_sections(content_with_positions, full_text)
+    write_feedback(document, sections, content_with_positions, line_index)
+
+    _, new_content, new_full_text, _, new_line_index = parse_document(document)
+    text = document_text(document)
+    for section in analyze_document_sections(new_content, new_full_text):
+        para = new_content[new_line_index[section['end_line']]]
+        feedback = para['feedback']
+        assert text[feedback['start']:feedback['end']] == f'{FEEDBACK_MARKER} 좋습니다.]'
+        # 섹션 마지막 문단 바로 다음 문단이 첨삭
+        assert feedback['start'] == para['end']
+
+
+def test_replace_rewrites_existing_feedback_in_place():
+    document = make_document(3, 4)
+    # 교체 옵션 없이 두 번 실행해 첨삭이 두 개씩 쌓인 문서
+    for feedback in ('첫 번째', '두 번째'):
+        parsed = parse_document(document)
+        sections = analyze_document_sections(parsed[1], parsed[2])
+        write_feedback(document, sections, parsed[1], parsed[4], feedback=feedback)
+    assert document_text(document).count(FEEDBACK_MARKER) == 2 * len(sections)
+
+    parsed = parse_document(document)
+    sections = analyze_document_sections(parsed[1], parsed[2])
+    insertions = write_feedback(document, sections, parsed[1], parsed[4], feedback='새 첨삭', replace=True)
+    assert all(insertion.get('replace') for insertion in insertions)
+
+    _, new_content, new_full_text, _, _ = parse_document(document)
+    text = document_text(document)
+    assert new_full_text == parsed[2]
+    assert text.count(FEEDBACK_MARKER) == len(sections)
+    assert text.count('[첨삭: 새 첨삭]') == len(sections)
+
+
+def test_feedback_is_written_to_the_section_tab():
+    document = make_tabbed_document(2, 2, 3)
+    _, content_with_positions, full_text, _, line_index = parse_document(document)
+    sections = analyze_document_sections(content_with_positions, full_text)
+    last_tab_sections = [s for s in sections
+                         if content_with_positions[line_index[s['end_line']]]['tab'] == 't.1']
+    write_feedback(document, last_tab_sections, content_with_positions, line_index)
+
+    assert FEEDBACK_MARKER not in document_text(document, 't.0')
+    assert document_text(document, 't.1').count(FEEDBACK_MARKER) == len(last_tab_sections)
+    assert parse_document(document)[2] == full_text
+
+
+def test_get_document_content_after_write_has_no_changes():
+    documents = {'doc': make_document(2, 5)}
+    service = FakeDocsService(copy.deepcopy(documents))
+    _, content_with_positions, full_text, revision_id, line_index = get_document_content(service, 'doc')
+    sections = analyze_document_sections(content_with_positions, full_text)
+    insertions, _ = plan_insertions(sections, ['좋습니다.'] * len(sections), content_with_positions, line_index)
+
+    inserted, new_revision_id = insert_feedbacks_to_doc(service, 'doc', insertions, revision_id)
+    assert inserted == len(sections)
+    assert new_revision_id != revision_id
+
+    _, new_content, new_full_text, _, _ = get_document_content(service, 'doc')
+    assert new_full_text == full_text
+    assert sum(1 for para in new_content if para.get('feedback')) == len(sections)
+
+
+@pytest.mark.parametrize('text', ['[첨삭: 직접 쓴 메모]', '일반 문단'])
+def test_user_paragraphs_stay_in_content(text):
+    document = make_document(1, 2)
+    _, content_with_positions, _, _, _ = parse_document(document)
+    index = content_with_positions[-1]['end'] - 1
+    apply_document_requests(document, [{'insertText': {'location': {'index': index}, 'text': '\n' + text}}])
+
+    _, new_content, _, _, _ = parse_document(document)
+    assert new_content[-1]['text'] == text + '\n'
+    assert new_content[-2].get('feedback') is None
+
+
+def test_feedback_for_section_ending_in_table_goes_after_the_table():
+    documents = {'doc': make_document(6, 2, table_cells=3)}
+    service = FakeDocsService(documents)
+    _, content_with_positions, full_text, revision_id, line_index = get_document_content(service, 'doc')
+    sections = analyze_document_sections(content_with_positions, full_text)
+    insertions, _ = plan_insertions(sections, ['표 뒤'] * len(sections), content_with_positions, line_index)
+    assert all(insertion.get('after_table') for insertion in insertions)
+
+    inserted, _ = insert_feedbacks_to_doc(service, 'doc', insertions, revision_id)
+    assert inserted == len(sections)
+
+    # 표마다 바로 다음 문단이 본문 스타일의 첨삭이고, 그 뒤의 제목 스타일은 그대로 유지
+    content = documents['doc']['body']['content']
+    for position, element in enumerate(content):
+        if 'table' in element:
+            following = content[position + 1]
+            texts = ''.join(run['textRun']['content'] for run in following['paragraph']['elements'])
+            assert following['startIndex'] == element['endIndex']
+            assert texts == f'{FEEDBACK_MARKER} 표 뒤]\n'
+            assert following['paragraph']['paragraphStyle']['namedStyleType'] == 'NORMAL_TEXT'
+
+    _, new_content, new_full_text, new_revision_id, new_line_index = get_document_content(service, 'doc')
+    assert new_full_text == full_text
+    assert analyze_document_sections(new_content, new_full_text) == sections
+
+    # 다시 실행해 교체해도 표 뒤의 첨삭 하나만 바뀜
+    insertions, _ = plan_insertions(sections, ['새 첨삭'] * len(sections), new_content, new_line_index,
+                                    replace_existing=True)
+    inserted, _ = insert_feedbacks_to_doc(service, 'doc', insertions, new_revision_id)
+    text = document_text(documents['doc'])
+    assert inserted == len(sections)
+    assert text.count(FEEDBACK_MARKER) == len(sections) and text.count('[첨삭: 새 첨삭]') == len(sections)
@@ -0,0 +1,15 @@
+from jobs import JobManager
+
+
+def test_session_owner_is_created_server_side_and_resumed_with_a_rotating_token(tmp_path):
+    manager = JobManager(str(tmp_path / 'jobs.sqlite3'))
+    owner, token = manager.create_session()
+
+    resumed_owner, new_token = manager.resume_session(token)
+    assert resumed_owner == owner and new_token != token
+
+    # 한 번 쓴 토큰과 사용자 ID, 모르는 토큰으로는 다시 연결할 수 없음
+    assert manager.resume_session(token) is None
+    assert manager.resume_session(owner) is None
+    assert manager.resume_session('guess') is None
+    assert manager.resume_session(new_token)[0] == owner
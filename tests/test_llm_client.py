@@ -0,0 +1,53 @@
+import time
+
+import pytest
+from openai.error import RateLimitError
+
+from fakes import FakeChatCompletion
+from llm_client import LLMClient
+from rate_limit import AdaptiveRateController
+
+
+def stream_client(completion, controller):
+    return LLMClient('gpt-4o-mini', create_completion=completion, controller=controller)
+
+
+def test_stream_holds_the_controller_slot_until_consumed():
+    controller = AdaptiveRateController(initial_limit=2)
+    completion = FakeChatCompletion(latency=0.0, tokens_per_second=1e9, completion_tokens=3)
+    chunks = stream_client(completion, controller).stream('system', 'user', max_tokens=10)
+
+    next(chunks)
+    assert controller.stats()['active'] == 1
+
+    rest = list(chunks)
+    assert rest and controller.stats()['active'] == 0
+
+
+def test_stream_closed_early_releases_the_slot():
+    controller = AdaptiveRateController(initial_limit=2)
+    completion = FakeChatCompletion(latency=0.0, tokens_per_second=1e9, completion_tokens=3)
+    chunks = stream_client(completion, controller).stream('system', 'user', max_tokens=10)
+
+    next(chunks)
+    chunks.close()
+    assert controller.stats() == {'limit': 2, 'active': 0, 'throttled': 0}
+
+
+def test_rate_limit_in_the_middle_of_a_stream_reaches_the_controller():
+    controller = AdaptiveRateController(initial_limit=4)
+    completion = FakeChatCompletion(latency=0.0, tokens_per_second=1e9, completion_tokens=3)
+
+    def create_completion(**kwargs):
+        def chunks():
+            yield from list(completion(**kwargs))[:1]
+            raise RateLimitError("Rate limit reached", http_status=429, headers={'retry-after': '2'})
+        return chunks()
+
+    started = time.monotonic()
+    with pytest.raises(RateLimitError):
+        list(stream_client(create_completion, controller).stream('system', 'user', max_tokens=10))
+
+    stats = controller.stats()
+    assert stats['active'] == 0 and stats['throttled'] == 1 and stats['limit'] == 2
+    assert controller._paused_until >= started + 2
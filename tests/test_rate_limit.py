@@ -0,0 +1,73 @@
+import time
+
+import pytest
+
+import rate_limit
+from rate_limit import AdaptiveRateController, call_with_backoff, parse_duration, retry_after_seconds
+
+
+class ApiError(Exception):
+    def __init__(self, status, headers=None):
+        super().__init__(f"HTTP {status}")
+        self.http_status = status
+        self.headers = headers or {}
+
+
+def failing_once(error):
+    calls = []
+
+    def func():
+        calls.append(time.monotonic())
+        if len(calls) == 1:
+            raise error
+        return 'ok'
+    return func
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    recorded = []
+    monkeypatch.setattr(rate_limit.time, 'sleep', recorded.append)
+    return recorded
+
+
+@pytest.mark.parametrize('value, seconds', [('20', 20.0), ('1.5s', 1.5), ('6m0s', 360.0), ('250ms', 0.25),
+                                            ('soon', None)])
+def test_parse_duration(value, seconds):
+    assert parse_duration(value) == seconds
+
+
+def test_reset_headers_are_only_used_for_429():
+    headers = {'x-ratelimit-reset-requests': '6m0s'}
+
+    assert retry_after_seconds(ApiError(429, headers)) == 360.0
+    assert retry_after_seconds(ApiError(503, headers)) is None
+    assert retry_after_seconds(ApiError(503, {'Retry-After': '2'})) == 2.0
+    assert retry_after_seconds(ApiError(429, {'retry-after-ms': '1500'})) == 1.5
+
+
+@pytest.mark.parametrize('error', [ApiError(429, {'retry-after': '3600'}),
+                                   ApiError(429, {'x-ratelimit-reset-tokens': '6m0s'})])
+def test_shared_pause_is_capped_at_max_delay(sleeps, error):
+    controller = AdaptiveRateController()
+
+    started = time.monotonic()
+
+    assert call_with_backoff(failing_once(error), controller, max_delay=0.05) == 'ok'
+    assert sleeps == [0.05]
+    assert controller._paused_until <= started + 0.1
+
+
+def test_server_error_reset_header_does_not_pause_other_calls(sleeps):
+    controller = AdaptiveRateController()
+    error = ApiError(500, {'x-ratelimit-reset-requests': '6m0s'})
+
+    assert call_with_backoff(failing_once(error), controller, base_delay=1.0) == 'ok'
+    assert len(sleeps) == 1 and sleeps[0] <= 1.0
+    assert controller._paused_until == 0.0
+
+
+def test_non_retryable_errors_are_raised(sleeps):
+    with pytest.raises(ApiError):
+        call_with_backoff(failing_once(ApiError(400)), AdaptiveRateController())
+    assert sleeps == []
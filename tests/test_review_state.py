@@ -0,0 +1,62 @@
+from review_state import ANALYSIS_REUSE_THRESHOLD, ReviewStateStore, diff_sections, section_fingerprint, stable_text
+
+
+def make_sections(count, length=200):
+    return [{'title': f'{n + 1}. 제목', 'content': f'섹션 {n} 내용 ' + '가' * length} for n in range(count)]
+
+
+def state_of(sections):
+    return {'sections': [[section_fingerprint(section), len(section['content'])] for section in sections]}
+
+
+def test_unchanged_sections_have_no_diff():
+    sections = make_sections(8)
+
+    assert diff_sections(sections, state_of(sections)) == ([], 0.0)
+
+
+def test_modified_section_is_counted_once():
+    sections = make_sections(8)
+    previous = state_of(sections)
+    sections[3] = dict(sections[3], content=sections[3]['content'] + ' 수정')
+
+    changed, ratio = diff_sections(sections, previous)
+
+    assert changed == [sections[3]]
+    assert ratio < ANALYSIS_REUSE_THRESHOLD
+    assert abs(ratio - len(sections[3]['content']) / sum(len(s['content']) for s in sections)) < 1e-9
+
+
+def test_added_and_removed_sections_count_as_changes():
+    sections = make_sections(4)
+    previous = state_of(sections)
+
+    changed, ratio = diff_sections(sections + make_sections(5)[4:], previous)
+    assert len(changed) == 1 and ratio > 0
+
+    changed, ratio = diff_sections(sections[:2], previous)
+    assert changed == [] and ratio == 1.0
+
+
+def test_fingerprint_ignores_feedback_blocks_and_blank_lines():
+    section = {'title': '1. 서론', 'content': '첫 문단입니다.\n\n둘째 문단입니다.'}
+    written = {'title': '1. 서론', 'content': '첫 문단입니다.\n[첨삭: 좋습니다.\n여러 줄 첨삭]\n\n\n둘째 문단입니다.\n'}
+
+    assert section_fingerprint(written) == section_fingerprint(section)
+
+
+def test_stable_text_keeps_unclosed_marker_and_inline_text():
+    assert stable_text('[첨삭: 닫히지 않은 메모\n본문') == '[첨삭: 닫히지 않은 메모 본문'
+    assert stable_text('본문 안의 [첨삭: 인용] 표현') == '본문 안의 [첨삭: 인용] 표현'
+
+
+def test_store_round_trip(tmp_path):
+    store = ReviewStateStore(str(tmp_path / 'review_state.sqlite3'))
+    sections = make_sections(3)
+    store.save('doc', 'rev-1', sections, '분석')
+
+    state = store.load('doc')
+    assert state['revision_id'] == 'rev-1'
+    assert state['full_analysis'] == '분석'
+    assert diff_sections(sections, state) == ([], 0.0)
+    assert store.load('other') is None
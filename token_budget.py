@@ -0,0 +1,104 @@
+# tiktoken이 없을 때 사용할 추정치: 영문/숫자는 약 4자당 1토큰, 한글 등은 약 1자당 1토큰
+ASCII_CHARS_PER_TOKEN = 4
+
+_encoding = None
+_encoding_loaded = False
+
+
+def _get_encoding():
+    """tiktoken 인코딩 (설치되어 있지 않으면 None) - 시작 시간을 줄이기 위해 처음 토큰을 셀 때 불러옴"""
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding('o200k_base')
+        except ImportError:  # tiktoken이 없으면 문자 종류 기반 추정치 사용
+            _encoding = None
+        _encoding_loaded = True
+    return _encoding
+
+
+def estimate_tokens(text):
+    """텍스트의 토큰 수 추정 (tiktoken이 설치되어 있으면 정확한 값)"""
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+
+    ascii_chars = sum(1 for ch in text if ch < '\x80')
+    return (ascii_chars + ASCII_CHARS_PER_TOKEN - 1) // ASCII_CHARS_PER_TOKEN + (len(text) - ascii_chars)
+
+
+def truncate_to_tokens(text, budget):
+    """토큰 예산을 넘지 않도록 텍스트 뒷부분을 잘라냄 (잘리지 않았으면 원문 그대로)"""
+    tokens = estimate_tokens(text)
+    if tokens <= budget:
+        return text
+
+    # 토큰 비율로 자를 위치를 잡은 뒤 예산 안에 들어올 때까지 줄임
+    cut = int(len(text) * budget / tokens)
+    while cut > 0 and estimate_tokens(text[:cut]) > budget:
+        cut = int(cut * 0.9)
+    return text[:cut]
+
+
+def _split_to_budget(text, budget):
+    """예산보다 긴 텍스트를 문단 경계(없으면 글자 수)로 나눔"""
+    pieces = []
+    current = []
+    current_tokens = 0
+
+    for paragraph in text.split('\n\n'):
+        tokens = estimate_tokens(paragraph)
+
+        # 문단 하나가 예산보다 크면 글자 수로 잘라서 넣음
+        while tokens > budget:
+            head = truncate_to_tokens(paragraph, budget) or paragraph[:1]
+            if current:
+                pieces.append('\n\n'.join(current))
+                current, current_tokens = [], 0
+            pieces.append(head)
+            paragraph = paragraph[len(head):]
+            tokens = estimate_tokens(paragraph)
+
+        if current and current_tokens + tokens > budget:
+            pieces.append('\n\n'.join(current))
+            current, current_tokens = [], 0
+        current.append(paragraph)
+        current_tokens += tokens
+
+    if current:
+        pieces.append('\n\n'.join(current))
+    return pieces
+
+
+def chunk_sections(sections, budget):
+    """섹션 경계를 따라 섹션들을 토큰 예산 크기의 청크(문자열)로 묶음
+
+    예산보다 큰 섹션은 문단 단위로 나누어 여러 청크에 담음
+    """
+    chunks = []
+    current = []
+    current_tokens = 0
+
+    for section in sections:
+        block = f"[{section['title']}]\n{section['content'].strip()}"
+        tokens = estimate_tokens(block)
+
+        if tokens > budget:
+            if current:
+                chunks.append('\n\n'.join(current))
+                current, current_tokens = [], 0
+            chunks.extend(_split_to_budget(block, budget))
+            continue
+
+        if current and current_tokens + tokens > budget:
+            chunks.append('\n\n'.join(current))
+            current, current_tokens = [], 0
+        current.append(block)
+        current_tokens += tokens
+
+    if current:
+        chunks.append('\n\n'.join(current))
+    return chunks